@@ -66,6 +66,34 @@ CREATE UNIQUE INDEX IF NOT EXISTS ux_species ON Species (species_name, variant_n
 
 -- Evolutions stored in json
 
+-- Evolution family index, derived from the evolution trees
+CREATE TABLE IF NOT EXISTS EvolutionFamily (
+  species_name TEXT NOT NULL,
+  variant_name TEXT NOT NULL,
+  family_id INT NOT NULL,
+  position INT NOT NULL, -- Order of the pokemon in the evolution tree
+  depth INT NOT NULL,
+  root_species TEXT NOT NULL,
+  root_variant TEXT NOT NULL,
+  methods TEXT NOT NULL, -- JSON list of the methods of the incoming evolution
+
+  PRIMARY KEY (species_name, variant_name)
+);
+
+CREATE INDEX IF NOT EXISTS ix_evolution_family ON EvolutionFamily (family_id, position);
+
+CREATE TABLE IF NOT EXISTS EvolutionLineage (
+  ancestor_species TEXT NOT NULL,
+  ancestor_variant TEXT NOT NULL,
+  descendant_species TEXT NOT NULL,
+  descendant_variant TEXT NOT NULL,
+  distance INT NOT NULL,
+
+  PRIMARY KEY (ancestor_species, ancestor_variant, descendant_species, descendant_variant)
+);
+
+CREATE INDEX IF NOT EXISTS ix_evolution_descendant ON EvolutionLineage (descendant_species, descendant_variant);
+
 -- Ability Table
 CREATE TABLE IF NOT EXISTS Ability (
   ability_id INTEGER PRIMARY KEY AUTOINCREMENT,
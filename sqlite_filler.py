@@ -1,22 +1,29 @@
-import json
 import sqlite3
+from concurrent.futures import Future, wait
+from pathlib import Path
 from pprint import pprint
+from typing import Dict, Iterable, List, Tuple
 
 from loguru import logger
-from networkx.readwrite.json_graph import adjacency_data, tree_data
 
+from src.data.ability import Ability
+from src.data.evolution_family import EvolutionIndex
 from src.data.species import *
+from src.databases.jsondb import EvolutionLines, write_evolution_lines
 from src.gather_files import populate_cache
-from src.scraper.ability import scrape_abilities
-from src.scraper.evolutions.evolution_graph import scrape_evolution_trees
+from src.scraper.ability import (
+    iter_enriched_abilities,
+    prefetch_abilities_in_background,
+    scrape_listed_abilities,
+)
+from src.scraper.evolutions.evolution_graph import scrape_evolution_forest
 from src.scraper.pmove import *
 from src.scraper.scrape import create_species, generate_all_pokemon, scrape_pokedex
 
+EVOLUTIONS = Path("evolutions.jsonl")
 
-def fill_ability_sql(conn: sqlite3.Connection):
-    logger.info("Starting to scrape abilities")
-    abilities = scrape_abilities()
 
+def write_abilities_sql(conn: sqlite3.Connection, abilities: Iterable[Ability]):
     for idx, ability in enumerate(abilities):
         try:
             ability.write_to_sql(conn.cursor())
@@ -26,18 +33,59 @@ def fill_ability_sql(conn: sqlite3.Connection):
     conn.commit()
 
 
-def fill_moves_sql(conn: sqlite3.Connection):
-    logger.info("Starting to scrape moves")
-    moves = scrape_moves()
+def fill_ability_sql(
+    conn: sqlite3.Connection,
+) -> Tuple[Dict[str, Ability], "Future[List[Path]]"]:
+    """Writes the abilities of the ability list right away, so that pokemon can
+    refer to them, and starts fetching their pages in the background"""
+    logger.info("Starting to scrape abilities")
+    populate_cache()
+    abilities = scrape_listed_abilities()
+    write_abilities_sql(conn, abilities.values())
+    return abilities, prefetch_abilities_in_background(abilities)
+
 
+def fill_ability_details_sql(
+    conn: sqlite3.Connection,
+    abilities: Dict[str, Ability],
+    pages: "Future[List[Path]]",
+):
+    """Writes each ability again as soon as its page has been parsed"""
+    logger.info("Waiting for the ability pages")
+    pages.result()
+    write_abilities_sql(conn, iter_enriched_abilities(abilities))
+
+
+def write_moves_sql(conn: sqlite3.Connection, moves: Iterable[PMove]):
     for idx, move in enumerate(moves):
         try:
             move.write_to_sql(conn.cursor())
         except Exception as e:
-            logger.error(f"Failed to write the ability: {move.name}")
+            logger.error(f"Failed to write the move: {move.name}")
     conn.commit()
 
 
+def fill_moves_sql(
+    conn: sqlite3.Connection,
+) -> Tuple[Dict[str, PMove], "Future[List[Path]]"]:
+    """Writes the moves of the move list right away and starts fetching the
+    move pages for their details in the background"""
+    logger.info("Starting to scrape moves")
+    populate_cache()
+    moves = scrape_listed_moves()
+    write_moves_sql(conn, moves.values())
+    return moves, prefetch_moves_in_background(moves)
+
+
+def fill_move_details_sql(
+    conn: sqlite3.Connection, moves: Dict[str, PMove], pages: "Future[List[Path]]"
+):
+    """Writes each move again as soon as its page has been parsed"""
+    logger.info("Waiting for the move pages")
+    pages.result()
+    write_moves_sql(conn, iter_enriched_moves(moves))
+
+
 def fill_pokemon_sql(conn: sqlite3.Connection):
     logger.info("Starting to scrape pokemon")
     species, variants, typing, stats, urls = scrape_pokedex()
@@ -52,17 +100,22 @@ def fill_pokemon_sql(conn: sqlite3.Connection):
     conn.commit()
 
 
-def write_evolution_trees():
+def write_evolution_trees() -> Path:
+    """Streams the evolution trees into a JSON Lines file, one family per line"""
     logger.info("Starting to scrape evolution chains")
     species, variants, typing, stats, urls = scrape_pokedex()
-    graphs = scrape_evolution_trees(list(zip(species, variants)))
-    trees = []
-    for tree in graphs:
-        sources = [n for n, d in tree.in_degree() if d == 0]
-        trees.append(tree_data(tree, sources[0]))
+    forest = scrape_evolution_forest(list(zip(species, variants)))
+    families = write_evolution_lines(EVOLUTIONS, forest.iter_trees())
+    logger.info(f"Wrote {families} evolution families to {EVOLUTIONS}")
+    return EVOLUTIONS
+
 
-    with open("evolutions.json", "w") as f:
-        f.write(str.encode(json.dumps(trees)).decode("unicode-escape"))
+def fill_evolution_index_sql(conn: sqlite3.Connection, trees: Iterable[Dict]):
+    """Stores the family of every pokemon next to the evolution trees"""
+    index = EvolutionIndex.from_trees(trees)
+    index.write_to_sql(conn.cursor())
+    conn.commit()
+    logger.info(f"Indexed {len(index.families)} evolution families")
 
 
 if __name__ == "__main__":
@@ -71,7 +124,12 @@ if __name__ == "__main__":
     with open("sql/pokemon_tables.sql", "r") as f:
         conn.cursor().executescript(f.read())
 
-    fill_ability_sql(conn)
-    fill_moves_sql(conn)
+    abilities, ability_pages = fill_ability_sql(conn)
+    moves, move_pages = fill_moves_sql(conn)
     fill_pokemon_sql(conn)
-    write_evolution_trees()
+    # The detail pages are parsed in forked pools, which is only safe once no
+    # prefetch thread holds a lock of the page store, the cache or the logger
+    wait([ability_pages, move_pages])
+    fill_ability_details_sql(conn, abilities, ability_pages)
+    fill_move_details_sql(conn, moves, move_pages)
+    fill_evolution_index_sql(conn, EvolutionLines(write_evolution_trees()))
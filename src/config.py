@@ -1,7 +1,7 @@
 """Basic configuration information abour various resources"""
 
 from pathlib import Path
-from typing import Dict, Final
+from typing import Dict, Final, Optional
 
 from bson.codec_options import CodecOptions
 
@@ -13,6 +13,24 @@ POKEMONDB_DIR: Final[Path] = (CACHE_DIR / "pokemondb").absolute()
 SPECIES_POKEDB_DIR: Final[Path] = (POKEMONDB_DIR / "pokedex").absolute()
 MOVE_POKEDB_DIR: Final[Path] = (POKEMONDB_DIR / "move").absolute()
 ABILITY_POKEDB_DIR: Final[Path] = (POKEMONDB_DIR / "ability").absolute()
+BLOB_DIR: Final[Path] = (CACHE_DIR / "blobs").absolute()
+
+# Backend of the page cache: "blob" for compressed content addressed storage or
+# "file" for one plain html file per page
+PAGE_STORE: Final[str] = "blob"
+# Parser for species pages: "soup" (BeautifulSoup) or "lxml" (precompiled XPath)
+SPECIES_PARSER: Final[str] = "soup"
+# Extracted species pages kept per worker. The variants of a species are
+# scraped one after another, so only the most recent few are ever reused.
+SPECIES_RECORD_CACHE_SIZE: Final[int] = 8
+
+# Bytes the cached pages may occupy before the least recently used are evicted
+CACHE_BUDGET: Final[int] = 512 * 1024 * 1024
+# Reads buffered, and seconds waited at most, before access times are saved
+TOUCH_BATCH_SIZE: Final[int] = 256
+TOUCH_FLUSH_INTERVAL: Final[float] = 5.0
+RESOURCE_DB: Final[Path] = (CACHE_DIR / "resources.sqlite3").absolute()
+JOURNAL_DB: Final[Path] = (CACHE_DIR / "journal.sqlite3").absolute()
 
 # NationalDex: Final[Path] = CACHE_DIR / "NationalDex.html"
 # FormDifferences: Final[Path] = CACHE_DIR / "FormDifferences.html"
@@ -39,4 +57,26 @@ URLS: Final[Dict[Path, str]] = {
     MOVES_LIST: "https://pokemondb.net/move/all",
 }
 
+# Politeness limits for the fetcher in requests per second. Hosts are matched by suffix
+DEFAULT_RATE_LIMIT: Final[float] = 0.333
+HOST_RATE_LIMITS: Final[Dict[str, float]] = {
+    "pokemondb.net": DEFAULT_RATE_LIMIT,
+    "bulbapedia.bulbagarden.net": 1.0,
+}
+FETCH_CONCURRENCY: Final[int] = 8
+# Detail pages fetched and parsed per batch of a background enrichment pass
+ENRICH_BATCH_SIZE: Final[int] = 64
+# Worker processes parsing detail pages, None for one per CPU
+PARSE_PROCESSES: Final[Optional[int]] = None
+# Token bucket state shared by every process fetching into the cache
+RATE_LIMIT_DIR: Final[Path] = (CACHE_DIR / "ratelimits").absolute()
+
+# Retry budget for transient HTTP failures (429, 5xx, dropped connections)
+FETCH_RETRIES: Final[int] = 5
+FETCH_BACKOFF_BASE: Final[float] = 1.0
+FETCH_BACKOFF_CAP: Final[float] = 60.0
+FETCH_TIMEOUT: Final[float] = 30.0
+# Bytes read from the network at a time while streaming a page into the cache
+STREAM_CHUNK_SIZE: Final[int] = 1 << 16
+
 CODEC_OPTIONS: Final[CodecOptions] = CodecOptions(type_registry=TYPE_REGISTRY)
@@ -0,0 +1,213 @@
+"""Index of the evolution family of every pokemon, built once from the
+evolution trees so that lookups do not have to walk them"""
+
+import json
+from dataclasses import dataclass
+from sqlite3 import Cursor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.data.typing import PokeId
+from src.utils.general import add_slots
+
+# (pokemon, the pokemon it evolves from, methods of that evolution) in preorder
+FamilyRow = Tuple[PokeId, Optional[PokeId], Tuple[str, ...]]
+
+
+@add_slots
+@dataclass
+class FamilyEntry:
+    """Where a pokemon sits in its evolution family. The ancestors start at the
+    root, and the descendants are in the order of the evolution tree."""
+
+    family_id: int
+    depth: int
+    root: PokeId
+    ancestors: Tuple[PokeId, ...]
+    descendants: Tuple[PokeId, ...]
+    methods: Tuple[str, ...]
+
+    @property
+    def parent(self) -> Optional[PokeId]:
+        return self.ancestors[-1] if self.ancestors else None
+
+
+def _flatten(tree: Dict[str, Any]) -> List[FamilyRow]:
+    """Lists the pokemon of a tree in the tree_data format in preorder"""
+    rows: List[FamilyRow] = []
+    stack: List[Tuple[Dict[str, Any], Optional[PokeId]]] = [(tree, None)]
+
+    while stack:
+        node, parent = stack.pop()
+        poke = tuple(node["id"])
+        rows.append((poke, parent, tuple(node.get("methods", ()))))  # type: ignore
+        for child in reversed(node.get("children", ())):
+            stack.append((child, poke))  # type: ignore
+
+    return rows
+
+
+class EvolutionIndex:
+    """The family id, depth, root, ancestors, descendants and the methods of
+    the incoming evolution of every pokemon in an evolution tree
+
+    >>> index = EvolutionIndex.from_trees([
+    ...     {"id": ["Oddish", "Oddish"], "children": [
+    ...         {"id": ["Gloom", "Gloom"], "methods": ["(Level 21)"], "children": [
+    ...             {"id": ["Vileplume", "Vileplume"], "methods": ["(use Leaf Stone)"]},
+    ...             {"id": ["Bellossom", "Bellossom"], "methods": ["(use Sun Stone)"]},
+    ...         ]},
+    ...     ]},
+    ... ])
+    >>> index.root_of(("Bellossom", "Bellossom"))
+    ('Oddish', 'Oddish')
+    >>> index[("Gloom", "Gloom")].descendants
+    (('Vileplume', 'Vileplume'), ('Bellossom', 'Bellossom'))
+    >>> index.is_ancestor(("Oddish", "Oddish"), ("Vileplume", "Vileplume"))
+    True
+    >>> index.same_family(("Gloom", "Gloom"), ("Pichu", "Pichu"))
+    False
+    """
+
+    def __init__(self, families: Iterable[Iterable[FamilyRow]] = ()):
+        self.entries: Dict[PokeId, FamilyEntry] = {}
+        self.families: List[Tuple[PokeId, ...]] = []
+
+        for rows in families:
+            self._add_family(list(rows))
+
+    def _add_family(self, rows: List[FamilyRow]):
+        """Adds the pokemon of one family, given in preorder. A pokemon has a
+        single place in the index, so one reached twice is rejected."""
+        family_id = len(self.families)
+        descendants: Dict[PokeId, List[PokeId]] = {}
+
+        for poke, parent, methods in rows:
+            if poke in self.entries:
+                raise ValueError(
+                    f"{poke} is in the evolution trees twice, below "
+                    f"{self.entries[poke].parent} and {parent}"
+                )
+            ancestors: Tuple[PokeId, ...] = ()
+            if parent is not None:
+                ancestors = self.entries[parent].ancestors + (parent,)
+            for ancestor in ancestors:
+                descendants[ancestor].append(poke)
+            descendants[poke] = []
+
+            self.entries[poke] = FamilyEntry(
+                family_id=family_id,
+                depth=len(ancestors),
+                root=ancestors[0] if ancestors else poke,
+                ancestors=ancestors,
+                descendants=(),
+                methods=methods,
+            )
+
+        for poke, below in descendants.items():
+            self.entries[poke].descendants = tuple(below)
+        self.families.append(tuple(poke for poke, _, _ in rows))
+
+    @classmethod
+    def from_trees(cls, trees: Iterable[Dict[str, Any]]) -> "EvolutionIndex":
+        """Builds the index from trees in the format of networkx's tree_data"""
+        return cls(_flatten(tree) for tree in trees)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, poke: PokeId) -> bool:
+        return poke in self.entries
+
+    def __getitem__(self, poke: PokeId) -> FamilyEntry:
+        return self.entries[poke]
+
+    def get(self, poke: PokeId) -> Optional[FamilyEntry]:
+        return self.entries.get(poke)
+
+    def family(self, poke: PokeId) -> Tuple[PokeId, ...]:
+        """Every pokemon in the family of the pokemon, starting at the root"""
+        return self.families[self.entries[poke].family_id]
+
+    def root_of(self, poke: PokeId) -> PokeId:
+        return self.entries[poke].root
+
+    def same_family(self, first: PokeId, second: PokeId) -> bool:
+        if first not in self.entries or second not in self.entries:
+            return False
+        return self.entries[first].family_id == self.entries[second].family_id
+
+    def is_ancestor(self, ancestor: PokeId, poke: PokeId) -> bool:
+        """Determines if the pokemon evolves, possibly indirectly, from ancestor"""
+        entry = self.entries.get(poke)
+        return entry is not None and ancestor in entry.ancestors
+
+    def write_to_sql(self, cursor: Cursor):
+        """Replaces the stored index. Every pokemon gets a row in EvolutionFamily,
+        and every (ancestor, descendant) pair a row in EvolutionLineage."""
+        cursor.execute("DELETE FROM EvolutionLineage")
+        cursor.execute("DELETE FROM EvolutionFamily")
+
+        rows = []
+        for family in self.families:
+            for position, poke in enumerate(family):
+                entry = self.entries[poke]
+                methods = json.dumps(entry.methods, ensure_ascii=False)
+                rows.append(
+                    (
+                        *poke,
+                        entry.family_id,
+                        position,
+                        entry.depth,
+                        *entry.root,
+                        methods,
+                    )
+                )
+        cursor.executemany(
+            """INSERT INTO EvolutionFamily (
+                species_name, variant_name, family_id, position, depth,
+                root_species, root_variant, methods
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows,
+        )
+        cursor.executemany(
+            """INSERT INTO EvolutionLineage (
+                ancestor_species, ancestor_variant,
+                descendant_species, descendant_variant, distance
+            ) VALUES (?, ?, ?, ?, ?)""",
+            (
+                (*ancestor, *poke, entry.depth - depth)
+                for poke, entry in self.entries.items()
+                for depth, ancestor in enumerate(entry.ancestors)
+            ),
+        )
+
+    @classmethod
+    def read_from_sql(cls, cursor: Cursor) -> "EvolutionIndex":
+        """Loads the index written by write_to_sql"""
+        cursor.execute(
+            """SELECT family.species_name, family.variant_name, family.family_id,
+                lineage.ancestor_species, lineage.ancestor_variant, family.methods
+            FROM EvolutionFamily AS family
+            LEFT JOIN EvolutionLineage AS lineage
+                ON lineage.descendant_species = family.species_name
+                AND lineage.descendant_variant = family.variant_name
+                AND lineage.distance = 1
+            ORDER BY family.family_id, family.position"""
+        )
+
+        families: Dict[int, List[FamilyRow]] = {}
+        for (
+            species,
+            variant,
+            family_id,
+            parent_species,
+            parent_variant,
+            methods,
+        ) in cursor.fetchall():
+            parent = (
+                None if parent_species is None else (parent_species, parent_variant)
+            )
+            families.setdefault(family_id, []).append(
+                ((species, variant), parent, tuple(json.loads(methods)))
+            )
+        return cls(families.values())
@@ -43,9 +43,17 @@ class Evolution:
     numeric_reqr: int = -1
     species_reqr: SpeciesId = ""
     location_reqr: str = ""
+    move_reqr: MoveId = ""
+    time_reqr: str = ""
+    # The region the evolution happens in, or "outside <region>"
+    region_reqr: str = ""
+    # The games the evolution is limited to
+    game_reqr: str = ""
 
     evolution_form: SpeciesId = ""
     variant_form: VariantId = ""
+    # The method as listed on pokemondb, which keeps the conditions not parsed
+    description: str = ""
 
     def _asdict(self) -> Dict:
         return asdict(self)
@@ -96,7 +104,9 @@ class TrainingComponent:
 
     leveling_rate: LevelingRate = LevelingRate.INVALID
     base_exp_yield: Optional[int] = None
-    effort_points: Optional[EffortValues] = EffortValues(0, 0, 0, 0, 0, 0)
+    effort_points: Optional[EffortValues] = field(
+        default_factory=lambda: EffortValues(0, 0, 0, 0, 0, 0)
+    )
     # Bounded int in [0, 255]
     catch_rate: Optional[int] = None
     # Bounded int in [0, 255]
@@ -255,7 +265,7 @@ class Species:
 
     types: List[PType] = field(default_factory=lambda: [PType.INVALID, PType.INVALID])
 
-    base_stats: BaseStats = BaseStats(0, 0, 0, 0, 0, 0)
+    base_stats: BaseStats = field(default_factory=lambda: BaseStats(0, 0, 0, 0, 0, 0))
 
     dex_entry: DexEntryComponent = field(default_factory=lambda: DexEntryComponent())
     training_info: TrainingComponent = field(
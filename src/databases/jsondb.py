@@ -0,0 +1,77 @@
+"""Stores the evolution trees as JSON Lines, one family per line. An index of
+where every line starts lets a single family be read by seeking instead of
+parsing the whole file."""
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.data.typing import PokeId
+
+
+def index_path(path: Path) -> Path:
+    """The offset index written next to a JSON Lines file"""
+    return path.with_name(path.name + ".index")
+
+
+def _family_members(tree: Dict[str, Any]) -> Iterator[PokeId]:
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        yield tuple(node["id"])  # type: ignore
+        stack.extend(reversed(node.get("children", ())))
+
+
+def write_evolution_lines(path: Path, trees: Iterable[Dict[str, Any]]) -> int:
+    """Writes every tree as it arrives, along with the offset of each family and
+    the family of each pokemon
+
+    :returns: The number of families written
+    """
+    offsets: List[int] = []
+    members: List[List[Any]] = []
+
+    with open(path, "wb") as f:
+        for family, tree in enumerate(trees):
+            offsets.append(f.tell())
+            f.write(json.dumps(tree, ensure_ascii=False).encode("utf-8") + b"\n")
+            members.extend([*poke, family] for poke in _family_members(tree))
+
+    index = {"offsets": offsets, "pokemon": members}
+    index_path(path).write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+    return len(offsets)
+
+
+class EvolutionLines:
+    """Reads the families written by write_evolution_lines. Only the index is
+    loaded up front, and a family is parsed when it is asked for."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        index = json.loads(index_path(path).read_text(encoding="utf-8"))
+        self.offsets: List[int] = index["offsets"]
+        self.families: Dict[PokeId, int] = {
+            (species, variant): family for species, variant, family in index["pokemon"]
+        }
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, poke: PokeId) -> bool:
+        return poke in self.families
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Streams every family in the order they were written"""
+        with open(self.path, "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def read_family(self, family: int) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[family])
+            return json.loads(f.readline())
+
+    def family_of(self, poke: PokeId) -> Optional[Dict[str, Any]]:
+        """The tree of the family containing the pokemon, if it evolves at all"""
+        family = self.families.get(poke)
+        return None if family is None else self.read_family(family)
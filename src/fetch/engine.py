@@ -0,0 +1,95 @@
+"""Asynchronous fetch engine for filling the cache concurrently.
+
+The blocking download itself is supplied by the caller and runs on a thread
+pool. The engine only decides when each download may start: at most
+`concurrency` downloads are in flight and every download first takes a token
+from the bucket of its host."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from loguru import logger
+
+from src.config import FETCH_CONCURRENCY
+from src.fetch.limiter import HostLimiter
+
+Url = Union[str, bytes]
+FetchJob = Tuple[Path, Url]
+Downloader = Callable[[Path, Url], None]
+ResultCallback = Callable[[FetchJob, Optional[BaseException]], None]
+
+
+class AsyncFetcher:
+    """Runs downloads concurrently while honoring per-host rate limits"""
+
+    def __init__(
+        self,
+        download: Downloader,
+        concurrency: int = FETCH_CONCURRENCY,
+        limiter: Optional[HostLimiter] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError(f"Concurrency must be at least 1, not {concurrency}")
+
+        self.download = download
+        self.concurrency = concurrency
+        self.limiter = limiter if limiter is not None else HostLimiter()
+
+    async def _fetch_one(
+        self,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+        job: FetchJob,
+        on_result: Optional[ResultCallback],
+    ) -> None:
+        file, url = job
+        async with semaphore:
+            await self.limiter.bucket(url).acquire()
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(executor, self.download, file, url)
+            except Exception as err:
+                if on_result is not None:
+                    on_result(job, err)
+                raise
+
+        if on_result is not None:
+            on_result(job, None)
+
+    async def _fetch_all(
+        self, jobs: Sequence[FetchJob], on_result: Optional[ResultCallback]
+    ) -> List[Optional[BaseException]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            tasks = [
+                self._fetch_one(semaphore, executor, job, on_result) for job in jobs
+            ]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+    def fetch_all(
+        self, jobs: Iterable[FetchJob], on_result: Optional[ResultCallback] = None
+    ) -> Dict[Path, BaseException]:
+        """Downloads every (file, url) job. A failing download does not cancel
+        the others.
+
+        :param on_result: Called on the event loop thread as each job finishes,
+            with the exception it raised or None
+        :returns: The exception raised for each file that could not be fetched
+        """
+        jobs = list(jobs)
+        if not jobs:
+            return {}
+
+        logger.debug(f"Fetching {len(jobs)} urls with concurrency {self.concurrency}")
+        results = asyncio.run(self._fetch_all(jobs, on_result))
+
+        failures: Dict[Path, BaseException] = {}
+        for (file, url), err in zip(jobs, results):
+            if isinstance(err, Exception):
+                logger.error(f"Failed to fetch {str(url)} into {file}: {err}")
+                failures[file] = err
+
+        return failures
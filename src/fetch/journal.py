@@ -0,0 +1,236 @@
+"""Crawl journal recording the state of every url of a named crawl, so that an
+interrupted crawl can be resumed without replanning it and failed urls can be
+retried on their own."""
+
+import enum
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+
+from src.config import JOURNAL_DB
+
+
+class CrawlState(enum.Enum):
+    """State of a single url in a crawl"""
+
+    INVALID = -1
+    Pending = 0
+    Done = 1
+    Failed = 2
+    RetryAfter = 3
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+
+@dataclass
+class CrawlProgress:
+    """Snapshot of how far along a crawl is
+
+    >>> str(CrawlProgress("moves", total=10, done=4, failed=1, pending=5, eta=90))
+    'moves: 4/10 done, 1 failed, 5 pending, ETA 1m30s'
+    >>> str(CrawlProgress("moves", total=10, done=10, failed=0, pending=0))
+    'moves: 10/10 done, 0 failed, 0 pending'
+    """
+
+    crawl: str
+    total: int = 0
+    done: int = 0
+    failed: int = 0
+    pending: int = 0
+    eta: Optional[float] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.failed + self.pending
+
+    @property
+    def finished(self) -> bool:
+        return self.remaining == 0
+
+    def __str__(self) -> str:
+        text = (
+            f"{self.crawl}: {self.done}/{self.total} done, "
+            f"{self.failed} failed, {self.pending} pending"
+        )
+        if self.eta is not None and self.remaining:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f", ETA {minutes}m{seconds:02d}s"
+        return text
+
+
+def retry_after(err: BaseException) -> Optional[float]:
+    """Seconds an HTTP error asked the client to wait before trying again"""
+    response = getattr(err, "response", None)
+    if not isinstance(err, requests.HTTPError) or response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CrawlJournal:
+    """Stores the url states of crawls in an sqlite table. Each crawl is
+    identified by a name such as "moves" or "species"."""
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS CrawlUrl (
+        crawl TEXT NOT NULL,
+        url TEXT NOT NULL,
+        path TEXT NOT NULL,
+        state TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        retry_at REAL,
+        error TEXT,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (crawl, url)
+    );
+    CREATE INDEX IF NOT EXISTS CrawlUrlState ON CrawlUrl (crawl, state);"""
+
+    def __init__(self, crawl: str, db_path: Path = JOURNAL_DB):
+        self.crawl = crawl
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Journal connection. Worker processes each open their own."""
+        if self._conn is None or self._pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.db_path), timeout=30, check_same_thread=False
+            )
+            self._conn.executescript(CrawlJournal.SCHEMA)
+            self._pid = os.getpid()
+        return self._conn
+
+    def plan(self, jobs: Iterable[Tuple[Path, str]], restart: bool = False) -> None:
+        """Adds the (file, url) jobs to the crawl as pending. Urls already in the
+        journal keep their state unless the crawl is restarted."""
+        verb = "INSERT OR REPLACE" if restart else "INSERT OR IGNORE"
+        now = time.time()
+        rows = [
+            (self.crawl, str(url), str(file), CrawlState.Pending.name, now)
+            for file, url in jobs
+        ]
+        with self._lock:
+            self.conn.executemany(
+                f"{verb} INTO CrawlUrl (crawl, url, path, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.conn.commit()
+
+    def mark_done(self, *urls: str) -> None:
+        """Records that the urls were fetched"""
+        now = time.time()
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE CrawlUrl SET state = ?, error = NULL, retry_at = NULL, "
+                "attempts = attempts + 1, updated_at = ? WHERE crawl = ? AND url = ?",
+                [(CrawlState.Done.name, now, self.crawl, url) for url in urls],
+            )
+            self.conn.commit()
+
+    def mark_failed(self, url: str, err: BaseException) -> None:
+        """Records that fetching the url failed. If the server said when to try
+        again, the url is held back until then."""
+        now = time.time()
+        delay = retry_after(err)
+        state = CrawlState.Failed if delay is None else CrawlState.RetryAfter
+        retry_at = None if delay is None else now + delay
+
+        with self._lock:
+            self.conn.execute(
+                "UPDATE CrawlUrl SET state = ?, error = ?, retry_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE crawl = ? AND url = ?",
+                (state.name, repr(err), retry_at, now, self.crawl, url),
+            )
+            self.conn.commit()
+
+    def record(self, job: Tuple[Path, str], err: Optional[BaseException]) -> None:
+        """Records the outcome of a fetch. Matches the fetcher's result callback."""
+        if err is None:
+            self.mark_done(str(job[1]))
+        else:
+            self.mark_failed(str(job[1]), err)
+
+    def remaining(self, only_failed: bool = False) -> List[Tuple[Path, str]]:
+        """Jobs that still need to be fetched. Failed urls are included, and urls
+        waiting on a Retry-After only once their wait is over."""
+        states = [CrawlState.Failed.name]
+        if not only_failed:
+            states.append(CrawlState.Pending.name)
+
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, url FROM CrawlUrl WHERE crawl = ? AND "
+                f"(state IN ({', '.join('?' * len(states))}) "
+                "OR (state = ? AND retry_at <= ?)) ORDER BY rowid",
+                (self.crawl, *states, CrawlState.RetryAfter.name, time.time()),
+            ).fetchall()
+        return [(Path(path), url) for path, url in rows]
+
+    def state(self, url: str) -> CrawlState:
+        """State of a single url of the crawl"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT state FROM CrawlUrl WHERE crawl = ? AND url = ?",
+                (self.crawl, url),
+            ).fetchone()
+        return CrawlState[row[0]] if row is not None else CrawlState.INVALID
+
+    def progress(self, since: Optional[float] = None) -> CrawlProgress:
+        """Counts the urls in each state. The time left is estimated from the
+        rate at which urls were completed after `since`, which defaults to
+        the first completion."""
+        with self._lock:
+            counts = dict(
+                self.conn.execute(
+                    "SELECT state, COUNT(*) FROM CrawlUrl WHERE crawl = ? "
+                    "GROUP BY state",
+                    (self.crawl,),
+                ).fetchall()
+            )
+            recent, first, last = self.conn.execute(
+                "SELECT COUNT(*), MIN(updated_at), MAX(updated_at) FROM CrawlUrl "
+                "WHERE crawl = ? AND state = ? AND updated_at >= ?",
+                (self.crawl, CrawlState.Done.name, since or 0.0),
+            ).fetchone()
+
+        done = counts.get(CrawlState.Done.name, 0)
+        failed = counts.get(CrawlState.Failed.name, 0) + counts.get(
+            CrawlState.RetryAfter.name, 0
+        )
+        pending = counts.get(CrawlState.Pending.name, 0)
+
+        eta = None
+        start = since if since is not None else first
+        if recent and last is not None and last > start:
+            eta = (pending + failed) * (last - start) / recent
+
+        return CrawlProgress(
+            self.crawl,
+            total=done + failed + pending,
+            done=done,
+            failed=failed,
+            pending=pending,
+            eta=eta,
+        )
+
+    def clear(self) -> None:
+        """Forgets the crawl entirely"""
+        with self._lock:
+            self.conn.execute("DELETE FROM CrawlUrl WHERE crawl = ?", (self.crawl,))
+            self.conn.commit()
@@ -0,0 +1,171 @@
+"""Token buckets for keeping requests to each host under a politeness limit"""
+
+import asyncio
+import fcntl
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from src.config import DEFAULT_RATE_LIMIT, HOST_RATE_LIMITS
+
+
+class TokenBucket:
+    """A token bucket that refills at `rate` tokens per second up to `capacity`.
+
+    Tokens are reserved rather than waited for, so the balance may go negative
+    when many callers queue up at once. Each caller is told how long to wait
+    before its reserved token becomes valid, which keeps the bucket free of any
+    event loop and lets it be shared between consecutive `asyncio.run` calls.
+
+    >>> bucket = TokenBucket(2.0, capacity=2.0)
+    >>> bucket.reserve()
+    0.0
+    >>> bucket.reserve()
+    0.0
+    >>> 0.45 < bucket.reserve() <= 0.5
+    True
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, not {rate}")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self, tokens: float, last: float, now: float) -> Tuple[float, float]:
+        """Refills a balance last updated at `last` up to `now` and takes one
+        token from it. Returns the new balance and the wait for the token. A
+        clock that went back in time refills nothing."""
+        elapsed = max(0.0, now - last)
+        tokens = min(self.capacity, tokens + elapsed * self.rate) - 1.0
+        return tokens, max(0.0, -tokens / self.rate)
+
+    def reserve(self) -> float:
+        """Takes a token and returns the number of seconds until it may be used"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens, wait = self._take(self._tokens, self._last, now)
+            self._last = now
+            return wait
+
+    def wait(self) -> None:
+        """Blocks the current thread until a token is available"""
+        time.sleep(self.reserve())
+
+    async def acquire(self) -> None:
+        """Suspends the current task until a token is available"""
+        await asyncio.sleep(self.reserve())
+
+
+class SharedTokenBucket(TokenBucket):
+    """A token bucket whose balance lives in a file, so that every process
+    using the same file draws from one bucket. Updates are serialized with an
+    exclusive lock on the file. The file holds wall clock time, since the
+    monotonic clock of different processes or boots need not agree.
+
+    >>> import tempfile
+    >>> state = Path(tempfile.mkdtemp()) / "pokemondb.net.bucket"
+    >>> first = SharedTokenBucket(state, 2.0)
+    >>> second = SharedTokenBucket(state, 2.0)
+    >>> first.reserve()
+    0.0
+    >>> 0.45 < second.reserve() <= 0.5
+    True
+    """
+
+    STATE = struct.Struct("dd")
+
+    def __init__(self, path: Path, rate: float, capacity: float = 1.0):
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def reserve(self) -> float:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._lock, os.fdopen(descriptor, "r+b") as state:
+            fcntl.flock(state, fcntl.LOCK_EX)
+            try:
+                raw = state.read(SharedTokenBucket.STATE.size)
+                now = time.time()
+                if len(raw) == SharedTokenBucket.STATE.size:
+                    tokens, last = SharedTokenBucket.STATE.unpack(raw)
+                else:
+                    tokens, last = self.capacity, now
+
+                tokens, wait = self._take(tokens, last, now)
+                state.seek(0)
+                state.write(SharedTokenBucket.STATE.pack(tokens, now))
+                state.flush()
+                return wait
+            finally:
+                fcntl.flock(state, fcntl.LOCK_UN)
+
+
+def host_of(url: Union[str, bytes]) -> str:
+    """Extracts the host name of a url
+
+    >>> host_of("https://pokemondb.net/pokedex/bulbasaur")
+    'pokemondb.net'
+    >>> host_of(b"https://bulbapedia.bulbagarden.net/wiki/Eevee")
+    'bulbapedia.bulbagarden.net'
+    """
+    if isinstance(url, bytes):
+        url = url.decode("utf-8")
+    return urlsplit(url).hostname or ""
+
+
+class HostLimiter:
+    """Hands out one token bucket per configured host. Hosts are matched by
+    suffix, so www.pokemondb.net shares the bucket of pokemondb.net. Unknown
+    hosts each receive their own bucket with the default rate.
+
+    If `state_dir` is given the buckets are SharedTokenBuckets kept in that
+    directory, so all worker processes together stay under each host's rate.
+
+    >>> limiter = HostLimiter({"pokemondb.net": 2.0}, default_rate=0.5)
+    >>> limiter.bucket("https://pokemondb.net/move/all").rate
+    2.0
+    >>> limiter.bucket("https://www.pokemondb.net/ability").rate
+    2.0
+    >>> limiter.bucket("https://example.com").rate
+    0.5
+    """
+
+    def __init__(
+        self,
+        rates: Mapping[str, float] = HOST_RATE_LIMITS,
+        default_rate: float = DEFAULT_RATE_LIMIT,
+        state_dir: Optional[Path] = None,
+    ):
+        self.default_rate = default_rate
+        self.state_dir = state_dir
+        self._buckets: Dict[str, TokenBucket] = {
+            host: self._create(host, rate) for host, rate in rates.items()
+        }
+        self._lock = threading.Lock()
+
+    def _create(self, host: str, rate: float) -> TokenBucket:
+        if self.state_dir is None:
+            return TokenBucket(rate)
+        return SharedTokenBucket(self.state_dir / f"{host}.bucket", rate)
+
+    def bucket(self, url: Union[str, bytes]) -> TokenBucket:
+        """Finds the bucket that governs the host of the url"""
+        host = host_of(url)
+
+        for known, bucket in self._buckets.items():
+            if host == known or host.endswith("." + known):
+                return bucket
+
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = self._create(host, self.default_rate)
+            return self._buckets[host]
@@ -0,0 +1,93 @@
+"""Metadata for cached pages, recording where each page came from and the
+validators the server sent, so that refreshes can ask the server whether the
+page has changed at all. FilePageStore keeps it in a json sidecar next to the
+page, while BlobPageStore keeps it in its index."""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from loguru import logger
+
+SIDECAR_SUFFIX = ".meta.json"
+
+
+@dataclass
+class PageMetadata:
+    """Validators, fetch time and content checksum of a single cached page"""
+
+    url: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+    sha256: Optional[str] = None
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers that turn a GET into a conditional GET
+
+        >>> PageMetadata("u", etag='"abc"', last_modified="Mon").conditional_headers()
+        {'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon'}
+        >>> PageMetadata("u").conditional_headers()
+        {}
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def touched(self) -> PageMetadata:
+        """Copy of the metadata with the fetch time set to now"""
+        return dataclasses.replace(self, fetched_at=time.time())
+
+    @classmethod
+    def from_response(
+        cls, url: str, response: requests.Response, sha256: Optional[str] = None
+    ) -> PageMetadata:
+        return cls(
+            url=url,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+            sha256=sha256,
+        )
+
+    def _asdict(self) -> Dict[str, Any]:
+        """Converts the class to a dict"""
+        return dataclasses.asdict(self)
+
+
+def metadata_path(file: Path) -> Path:
+    """Location of the sidecar of a cached file
+
+    >>> metadata_path(Path("cache/pokedex/bulbasaur.html")).name
+    'bulbasaur.html.meta.json'
+    """
+    return file.with_name(file.name + SIDECAR_SUFFIX)
+
+
+def load_metadata(file: Path) -> Optional[PageMetadata]:
+    """Reads the sidecar of a cached file if there is a valid one"""
+    sidecar = metadata_path(file)
+
+    if not sidecar.exists():
+        return None
+
+    try:
+        return PageMetadata(**json.loads(sidecar.read_text()))
+    except (ValueError, TypeError) as err:
+        logger.warning(f"Ignoring unreadable metadata {sidecar}: {err}")
+        return None
+
+
+def save_metadata(file: Path, metadata: PageMetadata) -> None:
+    """Writes the sidecar of a cached file"""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    metadata_path(file).write_text(json.dumps(metadata._asdict()))
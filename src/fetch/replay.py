@@ -0,0 +1,324 @@
+"""Offline record and replay of the HTTP traffic of the fetch path.
+
+While recording, every response fetched through the shared session is saved
+into a ReplayArchive. While replaying, the shared session sends every request
+to a local ReplayServer that answers from the archive instead of the live
+site. The server can add latency and inject errors, so the concurrency,
+retry and rate limit behaviour of the fetch path can be benchmarked without
+network access and with the same results on every run.
+
+>>> import tempfile
+>>> archive = ReplayArchive(Path(tempfile.mkdtemp()))
+>>> archive.add("https://pokemondb.net/move/absorb", 200, {}, b"<h1>Absorb</h1>")
+>>> with replaying(archive) as server:
+...     get_session().get("https://pokemondb.net/move/absorb").text
+'<h1>Absorb</h1>'
+"""
+
+import contextlib
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from src.config import FETCH_CONCURRENCY
+from src.fetch.session import create_session, get_session, set_session
+
+# Response headers worth keeping in the archive
+ARCHIVED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+@dataclass
+class ArchivedResponse:
+    """A recorded response. The body is stored in its own file."""
+
+    status: int
+    headers: Dict[str, str]
+    body: str
+
+
+class ReplayArchive:
+    """Directory of recorded responses. The index is a json line per recorded
+    response with its url, status, headers and body file. Responses are
+    appended as they are recorded, and a url recorded twice is answered by its
+    last line."""
+
+    INDEX = "index.jsonl"
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._index: Dict[str, ArchivedResponse] = {}
+
+        index = directory / ReplayArchive.INDEX
+        if not index.exists():
+            return
+
+        damaged = False
+        with open(index, encoding="utf-8") as lines:
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    damaged = True
+                    continue
+                url = entry.pop("url")
+                self._index[url] = ArchivedResponse(**entry)
+
+        if damaged:
+            # A crash cut a line short, which later lines must not be appended to
+            logger.warning(f"Rewriting {index} without its damaged lines")
+            self.compact()
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _line(self, url: str, response: ArchivedResponse) -> str:
+        return json.dumps({"url": url, **vars(response)}) + "\n"
+
+    def add(self, url: str, status: int, headers: Dict[str, str], body: bytes):
+        """Stores a response for the url, replacing any earlier one"""
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest() + ".body"
+        kept = {key: headers[key] for key in ARCHIVED_HEADERS if key in headers}
+        response = ArchivedResponse(status, kept, name)
+
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / name).write_bytes(body)
+            self._index[url] = response
+            with open(self.directory / ReplayArchive.INDEX, "a", encoding="utf-8") as f:
+                f.write(self._line(url, response))
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        return self._index.get(url)
+
+    def body(self, response: ArchivedResponse) -> bytes:
+        return (self.directory / response.body).read_bytes()
+
+    def compact(self) -> None:
+        """Rewrites the index without the lines of replaced responses"""
+        with self._lock:
+            lines = [self._line(url, entry) for url, entry in self._index.items()]
+            tmp = self.directory / (ReplayArchive.INDEX + ".tmp")
+            tmp.write_text("".join(lines), encoding="utf-8")
+            tmp.replace(self.directory / ReplayArchive.INDEX)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Transport adapter that saves every successful response into an archive"""
+
+    def __init__(self, archive: ReplayArchive, **kwargs):
+        super().__init__(**kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        response = super().send(request, **kwargs)
+        if response.status_code < 300:
+            self.archive.add(
+                request.url, response.status_code, response.headers, response.content
+            )
+        return response
+
+
+class RedirectAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to the replay server. The
+    original url is kept in the path, so that the server knows what to serve.
+
+    >>> adapter = RedirectAdapter("http://127.0.0.1:80")
+    >>> adapter.local_url("https://pokemondb.net/move/all")
+    'http://127.0.0.1:80/https%3A%2F%2Fpokemondb.net%2Fmove%2Fall'
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+
+    def local_url(self, url: str) -> str:
+        return f"{self.base_url}/{quote(url, safe='')}"
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        request.url = self.local_url(request.url)
+        return super().send(request, **kwargs)
+
+
+@dataclass
+class ReplayStats:
+    """Counters of what the replay server did"""
+
+    requests: int = 0
+    served: int = 0
+    not_modified: int = 0
+    injected_errors: int = 0
+    misses: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+
+class ReplayServer:
+    """Local HTTP server answering requests from a ReplayArchive.
+
+    :param latency: Seconds every response is delayed by
+    :param jitter: Extra random delay of up to this many seconds
+    :param error_rate: Chance that a request is answered with error_status
+    :param error_status: Status used for injected errors
+    :param retry_after: Retry-After header sent with injected errors, if any
+    :param seed: Seed of the random source for jitter and errors
+    """
+
+    def __init__(
+        self,
+        archive: ReplayArchive,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        retry_after: Optional[float] = None,
+        seed: int = 0,
+    ):
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.stats = ReplayStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f"Replaying {len(self.archive)} responses at {self.base_url}")
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def draw(self) -> Tuple[float, bool]:
+        """Draws the delay and whether to inject an error for one request"""
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+
+    def count(self, counter: str, delta: int = 1) -> None:
+        """Adds to one of the counters in the stats"""
+        with self._lock:
+            value = getattr(self.stats, counter) + delta
+            setattr(self.stats, counter, value)
+            if counter == "in_flight":
+                self.stats.peak_in_flight = max(self.stats.peak_in_flight, value)
+
+    def _handler_class(self):
+        server = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            """Serves one archived response"""
+
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                logger.trace(format % args)
+
+            def _reply(self, status: int, headers: Dict[str, str], body: bytes):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                server.count("requests")
+                server.count("in_flight")
+                try:
+                    self._answer()
+                finally:
+                    server.count("in_flight", -1)
+
+            def _answer(self):
+                delay, fail = server.draw()
+                time.sleep(delay)
+
+                if fail:
+                    headers = {}
+                    if server.retry_after is not None:
+                        headers["Retry-After"] = str(server.retry_after)
+                    server.count("injected_errors")
+                    return self._reply(server.error_status, headers, b"")
+
+                response = server.archive.get(unquote(self.path[1:]))
+                if response is None:
+                    server.count("misses")
+                    return self._reply(404, {}, b"")
+
+                etag = response.headers.get("ETag")
+                if etag is not None and self.headers.get("If-None-Match") == etag:
+                    server.count("not_modified")
+                    return self._reply(304, {"ETag": etag}, b"")
+
+                server.count("served")
+                body = server.archive.body(response)
+                return self._reply(response.status, response.headers, body)
+
+        return ReplayHandler
+
+
+@contextlib.contextmanager
+def recording(archive: ReplayArchive) -> Iterator[ReplayArchive]:
+    """Saves every response fetched through the shared session into the archive"""
+    session = create_session()
+    adapter = RecordingAdapter(archive, pool_maxsize=FETCH_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    previous = set_session(session)
+    try:
+        yield archive
+    finally:
+        set_session(previous)
+        session.close()
+
+
+@contextlib.contextmanager
+def replaying(archive: ReplayArchive, **server_options) -> Iterator[ReplayServer]:
+    """Answers every request of the shared session from the archive. Accepts
+    the options of ReplayServer."""
+    server = ReplayServer(archive, **server_options)
+    server.start()
+
+    session = requests.Session()
+    adapter = RedirectAdapter(server.base_url, pool_maxsize=FETCH_CONCURRENCY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    previous = set_session(session)
+    try:
+        yield server
+    finally:
+        set_session(previous)
+        session.close()
+        server.stop()
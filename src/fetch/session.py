@@ -0,0 +1,122 @@
+"""Shared HTTP session with connection pooling and retries for transient errors"""
+
+import random
+import time
+from typing import Dict, FrozenSet, Optional, Union
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+from src.config import (
+    FETCH_BACKOFF_BASE,
+    FETCH_BACKOFF_CAP,
+    FETCH_CONCURRENCY,
+    FETCH_RETRIES,
+    FETCH_TIMEOUT,
+)
+from src.fetch.limiter import HostLimiter
+
+RETRY_STATUSES: FrozenSet[int] = frozenset({429, 500, 502, 503, 504})
+
+_SESSION: Optional[requests.Session] = None
+
+
+def create_session(pool_size: int = FETCH_CONCURRENCY) -> requests.Session:
+    """Creates a keep-alive session whose pool can hold a connection for every
+    concurrent fetch"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """The session shared by every fetch in this process"""
+    global _SESSION  # pylint: disable=global-statement
+    if _SESSION is None:
+        _SESSION = create_session()
+    return _SESSION
+
+
+def set_session(session: Optional[requests.Session]) -> Optional[requests.Session]:
+    """Replaces the shared session, for example with one that records or
+    replays traffic. Passing None makes the next fetch create a fresh one.
+
+    :returns: The session that was shared before
+    """
+    global _SESSION  # pylint: disable=global-statement
+    previous, _SESSION = _SESSION, session
+    return previous
+
+
+def backoff_delay(
+    attempt: int, base: float = FETCH_BACKOFF_BASE, cap: float = FETCH_BACKOFF_CAP
+) -> float:
+    """Exponential backoff with full jitter for the given (0-indexed) attempt
+
+    >>> all(0 <= backoff_delay(3, base=1.0, cap=60.0) <= 8.0 for _ in range(100))
+    True
+    >>> all(backoff_delay(30, base=1.0, cap=60.0) <= 60.0 for _ in range(100))
+    True
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    """Seconds the server asked us to wait, if it gave a number"""
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def get_with_retry(
+    url: Union[str, bytes],
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = FETCH_RETRIES,
+    session: Optional[requests.Session] = None,
+    stream: bool = False,
+    limiter: Optional[HostLimiter] = None,
+) -> requests.Response:
+    """GETs the url through the shared session. Responses with a status in
+    RETRY_STATUSES and connection errors are retried up to `retries` times.
+    Once the budget is spent the last response is returned, or the last
+    connection error is raised.
+
+    :param stream: Leave the body unread so that it can be consumed in chunks
+    :param limiter: Every retry waits for a token of the host, like the first
+        request did, so that retries count against the host's rate limit
+    """
+    session = session if session is not None else get_session()
+
+    for attempt in range(retries + 1):
+        if attempt > 0 and limiter is not None:
+            limiter.bucket(url).wait()
+        try:
+            response = session.get(
+                url, headers=headers, timeout=FETCH_TIMEOUT, stream=stream
+            )
+        except (requests.ConnectionError, requests.Timeout) as err:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                f"{err.__class__.__name__} for {str(url)}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == retries:
+            return response
+
+        response.close()
+        delay = max(backoff_delay(attempt), _retry_after(response) or 0.0)
+        logger.warning(
+            f"Recieved {response.status_code} from {str(url)}, retrying in {delay:.1f}s"
+        )
+        time.sleep(delay)
+
+    raise AssertionError("unreachable")
@@ -0,0 +1,425 @@
+"""Storage backends for cached pages.
+
+Pages are always addressed by the path they would have in the plain file
+cache (for example SPECIES_POKEDB_DIR / "bulbasaur.html"), so callers do not
+need to know which backend is in use. FilePageStore keeps that layout as is.
+BlobPageStore gzips every page into a blob named after the sha256 of its
+content, so identical pages are only stored once, and keeps an sqlite index
+that maps each page path and url to its blob along with the validators the
+server sent for it.
+
+Both backends stream pages into a temporary file, fsync it and only then
+rename it into place, so a crash mid-write never leaves a truncated page
+behind that would later be mistaken for a cache hit. Every write returns the
+sha256 of the page content, which verify passes can check pages against."""
+
+import gzip
+import hashlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+from loguru import logger
+
+from src.config import BLOB_DIR, CACHE_DIR, PAGE_STORE
+from src.fetch.metadata import (
+    PageMetadata,
+    load_metadata,
+    metadata_path,
+    save_metadata,
+)
+
+# Errors raised when reading a page whose stored bytes are damaged
+CORRUPTION_ERRORS = (OSError, EOFError, zlib.error)
+
+
+def _spool(
+    directory: Path, chunks: Iterable[bytes], compress: bool = False
+) -> Tuple[Path, str]:
+    """Streams the chunks into a temporary file inside the directory and syncs
+    it to disk. The file is removed again if writing fails.
+
+    :param compress: Gzip the chunks on their way to disk
+    :returns: The temporary file and the sha256 of the uncompressed chunks
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    digest = hashlib.sha256()
+    descriptor, name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+
+    try:
+        with os.fdopen(descriptor, "wb") as raw:
+            out = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else raw
+            for chunk in chunks:
+                digest.update(chunk)
+                out.write(chunk)
+            if compress:
+                out.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+    except BaseException:
+        os.unlink(name)
+        raise
+
+    return Path(name), digest.hexdigest()
+
+
+class PageStore(ABC):
+    """Common interface of the page cache backends"""
+
+    @abstractmethod
+    def exists(self, file: Path) -> bool:
+        """Determines if the page is cached"""
+
+    @abstractmethod
+    def read_bytes(self, file: Path) -> bytes:
+        """Reads the raw content of a cached page"""
+
+    @abstractmethod
+    def write_stream(self, file: Path, url: str, chunks: Iterable[bytes]) -> str:
+        """Atomically stores the page fetched from url as it is downloaded
+
+        :returns: The sha256 of the page content
+        """
+
+    @abstractmethod
+    def delete(self, file: Path) -> None:
+        """Removes the page from the cache if it is present"""
+
+    @abstractmethod
+    def pages(self, directory: Path) -> Iterator[Path]:
+        """Lists the cached pages directly inside the directory"""
+
+    @abstractmethod
+    def stored_size(self, file: Path) -> int:
+        """Bytes the page occupies on disk"""
+
+    def content_key(self, file: Path) -> str:
+        """Identifies the bytes on disk behind the page. Pages with the same key
+        share their storage."""
+        return str(file.absolute())
+
+    def write(self, file: Path, url: str, content: bytes) -> str:
+        """Atomically stores the content of the page fetched from url
+
+        :returns: The sha256 of the content
+        """
+        return self.write_stream(file, url, [content])
+
+    def read_text(self, file: Path) -> str:
+        """Reads the decoded content of a cached page"""
+        return self.read_bytes(file).decode("utf-8")
+
+    def open(self, file: Path) -> BinaryIO:
+        """Opens the content of a cached page for reading in chunks"""
+        return io.BytesIO(self.read_bytes(file))
+
+    def checksum(self, file: Path) -> str:
+        """Hashes the content of the page as it is stored right now"""
+        return hashlib.sha256(self.read_bytes(file)).hexdigest()
+
+    def expected_checksum(self, file: Path) -> Optional[str]:
+        """The sha256 the page had when it was written, if the store knows it"""
+        metadata = self.load_metadata(file)
+        return metadata.sha256 if metadata is not None else None
+
+    def load_metadata(self, file: Path) -> Optional[PageMetadata]:
+        """The url and validators the page was fetched with, kept in a sidecar"""
+        return load_metadata(file)
+
+    def save_metadata(self, file: Path, metadata: PageMetadata) -> None:
+        """Records the url and validators the page was fetched with"""
+        save_metadata(file, metadata)
+
+
+class FilePageStore(PageStore):
+    """Stores each page uncompressed at its own path"""
+
+    def exists(self, file: Path) -> bool:
+        return file.exists()
+
+    def read_bytes(self, file: Path) -> bytes:
+        return file.read_bytes()
+
+    def open(self, file: Path) -> BinaryIO:
+        return open(file, "rb")
+
+    def write_stream(self, file: Path, url: str, chunks: Iterable[bytes]) -> str:
+        tmp, digest = _spool(file.parent, chunks)
+        os.replace(tmp, file)
+        return digest
+
+    def delete(self, file: Path) -> None:
+        if file.exists():
+            file.unlink()
+
+    def pages(self, directory: Path) -> Iterator[Path]:
+        return iter(sorted(directory.glob("*.html")))
+
+    def stored_size(self, file: Path) -> int:
+        return file.stat().st_size
+
+
+class BlobPageStore(PageStore):
+    """Stores pages as gzipped, content addressed blobs.
+
+    Plain files left over from FilePageStore are moved into the store the
+    first time they are looked up, along with their sidecar. Files without a
+    sidecar get their url from url_of."""
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS Page (
+        path TEXT PRIMARY KEY,
+        url TEXT,
+        digest TEXT NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS PageUrl ON Page (url);
+    CREATE INDEX IF NOT EXISTS PageDigest ON Page (digest);"""
+
+    # Columns added to indexes created before the validators were stored
+    VALIDATOR_COLUMNS = (
+        ("etag", "TEXT"),
+        ("last_modified", "TEXT"),
+        ("fetched_at", "REAL"),
+    )
+
+    def __init__(
+        self,
+        blob_dir: Path = BLOB_DIR,
+        root: Path = CACHE_DIR,
+        url_of: Callable[[Path], Optional[str]] = lambda file: None,
+    ):
+        self.blob_dir = blob_dir
+        self.root = root
+        self.url_of = url_of
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Index connection. Worker processes each open their own."""
+        if self._conn is None or self._pid != os.getpid():
+            self.blob_dir.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.blob_dir / "index.sqlite3"),
+                timeout=30,
+                check_same_thread=False,
+            )
+            self._conn.executescript(BlobPageStore.SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(Page)")}
+            for column, kind in BlobPageStore.VALIDATOR_COLUMNS:
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE Page ADD COLUMN {column} {kind}")
+            self._pid = os.getpid()
+        return self._conn
+
+    def _key(self, file: Path) -> str:
+        try:
+            return file.absolute().relative_to(self.root.absolute()).as_posix()
+        except ValueError:
+            return file.absolute().as_posix()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / (digest + ".gz")
+
+    def _lookup(self, file: Path) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM Page WHERE path = ?", (self._key(file),)
+            ).fetchone()
+
+        if row is not None:
+            return row[0]
+
+        if file.is_file():
+            try:
+                self._migrate(file)
+            except FileNotFoundError:
+                logger.debug(f"{file} was moved into the blob store meanwhile")
+            return self._lookup(file)
+
+        return None
+
+    def _migrate(self, file: Path) -> None:
+        """Moves a plain file into the store. The file is removed before its
+        sidecar, so a concurrent move that finds no sidecar finds no file."""
+        logger.debug(f"Moving {file} into the blob store")
+        legacy = load_metadata(file)
+        url = legacy.url if legacy is not None and legacy.url else None
+        self.write(file, url or self.url_of(file) or "", file.read_bytes())
+        if legacy is not None:
+            self.save_metadata(file, legacy)
+        file.unlink(missing_ok=True)
+        metadata_path(file).unlink(missing_ok=True)
+
+    def _release(self, digest: str) -> None:
+        """Deletes the blob if no page refers to it anymore. Expects the lock."""
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM Page WHERE digest = ?", (digest,)
+        ).fetchone()
+        blob = self._blob_path(digest)
+        if count == 0 and blob.exists():
+            blob.unlink()
+
+    def exists(self, file: Path) -> bool:
+        return self._lookup(file) is not None
+
+    def read_bytes(self, file: Path) -> bytes:
+        digest = self._lookup(file)
+        if digest is None:
+            raise FileNotFoundError(f"{file} is not in the page store")
+        return gzip.decompress(self._blob_path(digest).read_bytes())
+
+    def open(self, file: Path) -> BinaryIO:
+        digest = self._lookup(file)
+        if digest is None:
+            raise FileNotFoundError(f"{file} is not in the page store")
+        return gzip.open(self._blob_path(digest), "rb")  # type: ignore
+
+    def checksum(self, file: Path) -> str:
+        digest = self._lookup(file)
+        if digest is None:
+            raise FileNotFoundError(f"{file} is not in the page store")
+
+        content = hashlib.sha256()
+        with gzip.open(self._blob_path(digest), "rb") as blob:
+            for chunk in iter(lambda: blob.read(1 << 16), b""):
+                content.update(chunk)
+        return content.hexdigest()
+
+    def expected_checksum(self, file: Path) -> Optional[str]:
+        # Blobs are named after the sha256 of their content
+        return self._lookup(file)
+
+    def load_metadata(self, file: Path) -> Optional[PageMetadata]:
+        if self._lookup(file) is None:
+            return None
+        with self._lock:
+            url, etag, last_modified, fetched_at, digest = self.conn.execute(
+                "SELECT url, etag, last_modified, fetched_at, digest FROM Page "
+                "WHERE path = ?",
+                (self._key(file),),
+            ).fetchone()
+        return PageMetadata(url or "", etag, last_modified, fetched_at or 0.0, digest)
+
+    def save_metadata(self, file: Path, metadata: PageMetadata) -> None:
+        """Stores the validators in the index. The checksum is always the digest
+        of the blob, so it is not stored separately."""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE Page SET url = COALESCE(?, url), etag = ?, last_modified = ?, "
+                "fetched_at = ? WHERE path = ?",
+                (
+                    metadata.url or None,
+                    metadata.etag,
+                    metadata.last_modified,
+                    metadata.fetched_at,
+                    self._key(file),
+                ),
+            )
+            self.conn.commit()
+
+    def stored_size(self, file: Path) -> int:
+        digest = self._lookup(file)
+        if digest is None:
+            raise FileNotFoundError(f"{file} is not in the page store")
+        return self._blob_path(digest).stat().st_size
+
+    def content_key(self, file: Path) -> str:
+        # Identical pages share a single blob
+        digest = self._lookup(file)
+        return digest if digest is not None else super().content_key(file)
+
+    def read_url(self, url: str) -> bytes:
+        """Reads the content that was fetched from the url"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM Page WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"{url} is not in the page store")
+        return gzip.decompress(self._blob_path(row[0]).read_bytes())
+
+    def write_stream(self, file: Path, url: str, chunks: Iterable[bytes]) -> str:
+        tmp, digest = _spool(self.blob_dir, chunks, compress=True)
+        blob = self._blob_path(digest)
+        key = self._key(file)
+
+        # Under the lock so a concurrent release cannot delete the blob
+        # between the check and the insert
+        with self._lock:
+            if blob.exists():
+                os.unlink(tmp)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp, blob)
+
+            previous = self.conn.execute(
+                "SELECT digest FROM Page WHERE path = ?", (key,)
+            ).fetchone()
+            # A new page starts without validators until they are saved
+            self.conn.execute(
+                "INSERT OR REPLACE INTO Page (path, url, digest) VALUES (?, ?, ?)",
+                (key, url or None, digest),
+            )
+            self.conn.commit()
+            if previous is not None and previous[0] != digest:
+                self._release(previous[0])
+
+        return digest
+
+    def delete(self, file: Path) -> None:
+        key = self._key(file)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT digest FROM Page WHERE path = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return
+            self.conn.execute("DELETE FROM Page WHERE path = ?", (key,))
+            self.conn.commit()
+            self._release(row[0])
+
+    def pages(self, directory: Path) -> Iterator[Path]:
+        prefix = self._key(directory).rstrip("/") + "/"
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path FROM Page WHERE substr(path, 1, ?) = ? ORDER BY path",
+                (len(prefix), prefix),
+            ).fetchall()
+        files = {self._file(key) for (key,) in rows if "/" not in key[len(prefix) :]}
+        legacy = set(directory.glob("*.html"))
+        return iter(sorted(files | legacy))
+
+    def _file(self, key: str) -> Path:
+        path = Path(key)
+        return path if path.is_absolute() else self.root / path
+
+    def usage(self) -> Tuple[int, int]:
+        """Returns the number of indexed pages and the bytes used by all blobs"""
+        with self._lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM Page").fetchone()
+        size = sum(blob.stat().st_size for blob in self.blob_dir.glob("*/*.gz"))
+        return count, size
+
+
+def get_page_store(
+    kind: str = PAGE_STORE, url_of: Callable[[Path], Optional[str]] = lambda file: None
+) -> PageStore:
+    """Creates the page store selected by the config
+
+    :param url_of: Derives the url of a page cached without one
+    """
+    if kind == "file":
+        return FilePageStore()
+    if kind == "blob":
+        return BlobPageStore(url_of=url_of)
+    raise ValueError(f"Unknown page store {kind}")
@@ -0,0 +1,253 @@
+"""Keeps track of the files in the cache, who owns them and when they were last
+used, so that the cache can be held to a size budget by evicting the least
+recently used pages."""
+
+import atexit
+import enum
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from src.config import (
+    ABILITY_POKEDB_DIR,
+    CACHE_BUDGET,
+    MOVE_POKEDB_DIR,
+    RESOURCE_DB,
+    SPECIES_POKEDB_DIR,
+    TOUCH_BATCH_SIZE,
+    TOUCH_FLUSH_INTERVAL,
+)
+from src.fetch.metadata import metadata_path
+from src.fetch.store import PageStore
+
+
+class Owner(enum.Enum):
+    """The scraper that a cached file belongs to"""
+
+    INVALID = -1
+    Species = 0
+    Move = 1
+    Ability = 2
+    ListPage = 3
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+
+def owner_of(file: Path) -> Owner:
+    """Determines the owner of a cached file from where it lives
+
+    >>> owner_of(SPECIES_POKEDB_DIR / "bulbasaur.html")
+    Species
+    >>> owner_of(MOVE_POKEDB_DIR.parent / "Moves.html")
+    ListPage
+    """
+    directories = {
+        SPECIES_POKEDB_DIR: Owner.Species,
+        MOVE_POKEDB_DIR: Owner.Move,
+        ABILITY_POKEDB_DIR: Owner.Ability,
+    }
+    return directories.get(file.absolute().parent, Owner.ListPage)
+
+
+@dataclass
+class Resource:
+    """A single tracked file"""
+
+    path: Path
+    size: int
+    last_access: float
+    owner: Owner
+    # Files with the same content key share their bytes on disk
+    content: str = ""
+
+
+class ResourceManager:
+    """Tracks cached pages in an sqlite table and evicts the least recently
+    used ones once their total size goes over the budget. List pages are the
+    starting point of every scrape and are never evicted.
+
+    Reads are frequent, so their access times are buffered and saved in a
+    single transaction once enough have piled up, once the buffer is old
+    enough, before the table is queried and when the interpreter exits."""
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS Resource (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        owner TEXT NOT NULL,
+        content TEXT
+    );
+    CREATE INDEX IF NOT EXISTS ResourceAccess ON Resource (last_access);"""
+
+    PINNED = frozenset({Owner.ListPage})
+
+    def __init__(
+        self, store: PageStore, budget: int = CACHE_BUDGET, db_path: Path = RESOURCE_DB
+    ):
+        self.store = store
+        self.budget = budget
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        # Access times of the files read since the last flush
+        self._touched: Dict[Path, float] = {}
+        self._flushed_at = time.monotonic()
+        atexit.register(self.flush)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Table connection. Worker processes each open their own."""
+        if self._conn is None or self._pid != os.getpid():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(
+                str(self.db_path), timeout=30, check_same_thread=False
+            )
+            self._conn.executescript(ResourceManager.SCHEMA)
+            columns = {
+                row[1] for row in self._conn.execute("PRAGMA table_info(Resource)")
+            }
+            if "content" not in columns:
+                self._conn.execute("ALTER TABLE Resource ADD COLUMN content TEXT")
+            self._pid = os.getpid()
+        return self._conn
+
+    def track(self, file: Path, owner: Optional[Owner] = None) -> None:
+        """Records a file that was just written to the cache"""
+        owner = owner if owner is not None else owner_of(file)
+        size = self.store.stored_size(file)
+        content = self.store.content_key(file)
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO Resource VALUES (?, ?, ?, ?, ?)",
+                (str(file.absolute()), size, time.time(), owner.name, content),
+            )
+            self.conn.commit()
+
+    def touch(self, file: Path) -> None:
+        """Marks a file as used just now. The access time is only buffered, so
+        a pool worker that is terminated loses at most one batch of them."""
+        with self._lock:
+            self._touched[file] = time.time()
+            due = (
+                len(self._touched) >= TOUCH_BATCH_SIZE
+                or time.monotonic() - self._flushed_at >= TOUCH_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Saves the buffered access times. Files that were read but never
+        tracked are tracked now."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+            if not touched:
+                return
+
+            untracked = []
+            for file, when in touched.items():
+                cursor = self.conn.execute(
+                    "UPDATE Resource SET last_access = ? WHERE path = ?",
+                    (when, str(file.absolute())),
+                )
+                if cursor.rowcount == 0:
+                    untracked.append(file)
+            self.conn.commit()
+
+        for file in untracked:
+            if self.store.exists(file):
+                self.track(file)
+
+    def forget(self, file: Path) -> None:
+        """Stops tracking a file without deleting it"""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM Resource WHERE path = ?", (str(file.absolute()),)
+            )
+            self.conn.commit()
+
+    def usage(self) -> int:
+        """Total bytes of all tracked files, counting shared content once"""
+        with self._lock:
+            (total,) = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT MAX(size) AS size "
+                "FROM Resource GROUP BY COALESCE(content, path))"
+            ).fetchone()
+        return total
+
+    def _shared(self, resource: Resource) -> bool:
+        """Determines if another tracked file still uses the content"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM Resource WHERE content = ? LIMIT 1",
+                (resource.content,),
+            ).fetchone()
+        return row is not None
+
+    def resources(self) -> List[Resource]:
+        """All tracked files from the least to the most recently used"""
+        self.flush()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT path, size, last_access, owner, COALESCE(content, path) "
+                "FROM Resource ORDER BY last_access"
+            ).fetchall()
+        return [
+            Resource(Path(path), size, last_access, Owner[owner], content)
+            for path, size, last_access, owner, content in rows
+        ]
+
+    def evict(self, file: Path) -> None:
+        """Deletes a file and its metadata from the cache"""
+        with self._lock:
+            self._touched.pop(file, None)
+        self.store.delete(file)
+        sidecar = metadata_path(file)
+        if sidecar.exists():
+            sidecar.unlink()
+        self.forget(file)
+
+    def enforce_budget(self) -> List[Path]:
+        """Evicts the least recently used files until the cache fits the budget
+
+        :returns: The evicted files
+        """
+        self.flush()
+        excess = self.usage() - self.budget
+        if excess <= 0:
+            return []
+
+        evicted = []
+        for resource in self.resources():
+            if excess <= 0:
+                break
+            if resource.owner in ResourceManager.PINNED:
+                continue
+            self.evict(resource.path)
+            evicted.append(resource.path)
+            if not self._shared(resource):
+                excess -= resource.size
+
+        logger.info(f"Evicted {len(evicted)} files to keep the cache under budget")
+        if excess > 0:
+            logger.warning(f"Cache is still {excess} bytes over budget")
+        return evicted
+
+    def rebuild(self, directories: Iterable[Path]) -> None:
+        """Tracks every page already cached in the directories. Useful after the
+        table was deleted or for caches filled before it existed."""
+        for directory in directories:
+            for file in self.store.pages(directory):
+                self.track(file)
@@ -1,9 +1,11 @@
 """Collects files from the config and stores them into the cache"""
 
-
+import argparse
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from time import sleep
-from typing import Union
+from typing import BinaryIO, Dict, Iterable, List, Optional, Union
 
 import requests
 from loguru import logger
@@ -12,79 +14,338 @@ from src.config import (
     ABILITY_POKEDB_DIR,
     BULBADEX_STUB,
     DBDEX_STUB,
+    FETCH_CONCURRENCY,
     MOVE_POKEDB_DIR,
     POKEMONDB_STUB,
+    RATE_LIMIT_DIR,
     SPECIES_POKEDB_DIR,
+    STREAM_CHUNK_SIZE,
     URLS,
 )
 from src.data.typing import SpeciesId
-from src.utils.general import normalize_unicode, rate_limited
+from src.fetch.engine import AsyncFetcher, FetchJob, ResultCallback
+from src.fetch.journal import CrawlJournal, CrawlProgress
+from src.fetch.limiter import HostLimiter
+from src.fetch.metadata import PageMetadata
+from src.fetch.session import get_with_retry
+from src.fetch.store import CORRUPTION_ERRORS, get_page_store
+from src.file_resource import ResourceManager
+from src.utils.general import normalize_unicode, unique
 
+# Number of finished urls between progress reports of a journaled crawl
+PROGRESS_INTERVAL = 50
 
-def request_pokeurl_pokemondb(relative_url: str) -> Path:
-    """Request a pokemon entry from PokemonDB"""
+_POKEMONDB_DIRS: Dict[Path, str] = {
+    SPECIES_POKEDB_DIR: "/pokedex/",
+    MOVE_POKEDB_DIR: "/move/",
+    ABILITY_POKEDB_DIR: "/ability/",
+}
+
+
+def _page_url(file: Path) -> Optional[str]:
+    """The url a cached page is fetched from, derived from where it lives"""
+    if file in URLS:
+        return URLS[file]
+    prefix = _POKEMONDB_DIRS.get(file.parent)
+    return None if prefix is None else POKEMONDB_STUB + prefix + file.stem
+
+
+_STORE = get_page_store(url_of=_page_url)
+_RESOURCES = ResourceManager(_STORE)
+
+
+def _pokemondb_job(relative_url: str, prefix: str, directory: Path) -> FetchJob:
+    """Maps a relative PokemonDB url of the form {prefix}{name} to its cache file"""
+    name = relative_url[len(prefix) :]
+    return (directory / (name + ".html")).absolute(), POKEMONDB_STUB + relative_url
+
+
+def _species_job(relative_url: str) -> FetchJob:
     if not relative_url.startswith("/pokedex/"):
         raise ValueError("Pokemon url not of the correct form")
+    return _pokemondb_job(relative_url, "/pokedex/", SPECIES_POKEDB_DIR)
 
-    species = relative_url[len("/pokedex/") :]
-    species_file: Path = (SPECIES_POKEDB_DIR / (species + ".html")).absolute()
-    request_url(species_file, POKEMONDB_STUB + relative_url)
-    return species_file
+
+def _move_job(relative_url: str) -> FetchJob:
+    if not relative_url.startswith("/move/"):
+        raise ValueError("Move url not of the correct form")
+    return _pokemondb_job(relative_url, "/move/", MOVE_POKEDB_DIR)
+
+
+def _ability_job(relative_url: str) -> FetchJob:
+    if not relative_url.startswith("/ability/"):
+        raise ValueError("Ability url not of the correct form")
+    return _pokemondb_job(relative_url, "/ability/", ABILITY_POKEDB_DIR)
+
+
+def request_pokeurl_pokemondb(relative_url: str) -> Path:
+    """Request a pokemon entry from PokemonDB"""
+    return request_urls([_species_job(relative_url)])[0]
 
 
 def request_moveurl_pokemondb(relative_url: str) -> Path:
     """Request a pokemon entry from PokemonDB.
     Move URL should be of the form /move/{move_name}"""
-
-    if not relative_url.startswith("/move/"):
-        raise ValueError("Move url not of the correct form")
-
-    move = relative_url[len("/move/") :]
-    move_file: Path = (MOVE_POKEDB_DIR / (move + ".html")).absolute()
-    request_url(move_file, POKEMONDB_STUB + relative_url)
-    return move_file
+    return request_urls([_move_job(relative_url)])[0]
 
 
 def request_abilityurl_pokemondb(relative_url: str) -> Path:
     """Request a pokemon entry from PokemonDB.
     Move URL should be of the form /move/{move_name}"""
+    return request_urls([_ability_job(relative_url)])[0]
 
-    if not relative_url.startswith("/ability/"):
-        raise ValueError("Ability url not of the correct form")
 
-    ability = relative_url[len("/ability/") :]
-    ability_file: Path = (ABILITY_POKEDB_DIR / (ability + ".html")).absolute()
-    request_url(ability_file, POKEMONDB_STUB + relative_url)
-    return ability_file
+def request_pokeurls_pokemondb(relative_urls: Iterable[str]) -> List[Path]:
+    """Concurrently requests many pokemon entries from PokemonDB. Pages that
+    still fail after retrying are logged and left out of the result."""
+    return request_urls(
+        [_species_job(url) for url in relative_urls],
+        skip_failures=True,
+        crawl="species",
+    )
+
+
+def request_moveurls_pokemondb(relative_urls: Iterable[str]) -> List[Path]:
+    """Concurrently requests many move entries from PokemonDB, leaving out
+    pages that could not be fetched"""
+    return request_urls(
+        [_move_job(url) for url in relative_urls], skip_failures=True, crawl="moves"
+    )
+
+
+def request_abilityurls_pokemondb(relative_urls: Iterable[str]) -> List[Path]:
+    """Concurrently requests many ability entries from PokemonDB, leaving out
+    pages that could not be fetched"""
+    return request_urls(
+        [_ability_job(url) for url in relative_urls],
+        skip_failures=True,
+        crawl="abilities",
+    )
+
+
+def prefetch_pokemondb(
+    species_urls: Iterable[str],
+    move_urls: Iterable[str] = (),
+    ability_urls: Iterable[str] = (),
+) -> List[Path]:
+    """Fetches species, move and ability pages from PokemonDB as one batch.
+    Urls shared by several entries, such as the species page of every variant,
+    are only requested once.
+
+    :returns: The unique files that are now cached
+    """
+    jobs = unique(
+        [_species_job(url) for url in species_urls]
+        + [_move_job(url) for url in move_urls]
+        + [_ability_job(url) for url in ability_urls]
+    )
+    return request_urls(jobs, skip_failures=True, crawl="frontier")
 
 
-@rate_limited(0.333)
 def _request_url(file: Path, url: Union[str, bytes]) -> None:
+    metadata = _STORE.load_metadata(file) if _STORE.exists(file) else None
+    headers = metadata.conditional_headers() if metadata is not None else {}
+
     logger.debug(f"Requesting {file.absolute()} from {str(url)}")
-    req = requests.get(url=url)
+    req = get_with_retry(url, headers=headers, stream=True, limiter=_FETCHER.limiter)
 
-    if not req.ok:
-        # TODO: Gracefully handle this case
-        logger.error(f"Recieved error {req.status_code} from {req.url}")
-        req.raise_for_status()
+    with contextlib.closing(req):
+        if req.status_code == requests.codes.not_modified and metadata is not None:
+            logger.debug(f"{file.absolute()} has not changed since the last fetch")
+            _STORE.save_metadata(file, metadata.touched())
+            return
+
+        if not req.ok:
+            # Transient errors have already been retried, so this one is final
+            logger.error(f"Recieved error {req.status_code} from {req.url}")
+            req.raise_for_status()
+
+        try:
+            # The page only appears in the cache once it was fully written
+            digest = _STORE.write_stream(
+                file, str(url), req.iter_content(STREAM_CHUNK_SIZE)
+            )
+            _STORE.save_metadata(
+                file, PageMetadata.from_response(str(url), req, digest)
+            )
+            _RESOURCES.track(file)
+        except NotADirectoryError:
+            logger.error(f"{file.absolute()} is not a valid filepath")
+
+
+_FETCHER = AsyncFetcher(_request_url, limiter=HostLimiter(state_dir=RATE_LIMIT_DIR))
 
-    try:
-        file.touch()
-        with file.open("w") as dest:
-            dest.writelines(req.text)
-    except NotADirectoryError:
-        logger.error(f"{file.absolute()} is not a valid filepath")
+
+def read_page(file: Path) -> str:
+    """Reads a cached page, whichever store backend holds it"""
+    _RESOURCES.touch(file)
+    return _STORE.read_text(file)
+
+
+def read_page_bytes(file: Path) -> bytes:
+    """Reads the raw bytes of a cached page"""
+    _RESOURCES.touch(file)
+    return _STORE.read_bytes(file)
+
+
+def open_page(file: Path) -> BinaryIO:
+    """Opens a cached page to be read in chunks instead of all at once"""
+    _RESOURCES.touch(file)
+    return _STORE.open(file)
 
 
 def request_url(file: Path, url: Union[str, bytes], refresh_cache=False) -> None:
-    """Fetches one url and stores the content in the cache"""
-    if not refresh_cache and file.exists():
-        logger.debug(f"Skipping {str(url)} since {file.absolute()} already exists")
-        return
+    """Fetches one url and stores the content in the cache. When refreshing a
+    file that has stored validators, the request is conditional and the local
+    file is kept if the server answers 304 Not Modified."""
+    request_urls([(file, url)], refresh_cache)
+
+
+def _progress_logger(journal: CrawlJournal) -> ResultCallback:
+    """Records each result in the journal and periodically logs the progress"""
+    completed = [0]
+    start = time.time()
+
+    def on_result(job: FetchJob, err: Optional[BaseException]) -> None:
+        journal.record(job, err)
+        completed[0] += 1
+        if completed[0] % PROGRESS_INTERVAL == 0:
+            logger.info(str(journal.progress(since=start)))
+
+    return on_result
+
+
+def request_urls(
+    jobs: Iterable[FetchJob],
+    refresh_cache=False,
+    skip_failures=False,
+    crawl: Optional[str] = None,
+) -> List[Path]:
+    """Fetches (file, url) pairs concurrently and stores the content in the cache.
+    Each host is only contacted as fast as its token bucket allows.
+
+    :param skip_failures: Leave pages that could not be fetched out of the result
+        instead of raising the first failure once every job has finished
+    :param crawl: Name under which the state of every url is journaled, so that
+        the crawl can be picked up again with resume_crawl
+    :returns: The files of the jobs in the order they were given
+    """
+    jobs = list(jobs)
+    pending: Dict[Path, FetchJob] = {}
+    cached: List[str] = []
+
+    for file, url in jobs:
+        if not refresh_cache and _STORE.exists(file):
+            logger.debug(f"Skipping {str(url)} since {file.absolute()} already exists")
+            _RESOURCES.touch(file)
+            cached.append(str(url))
+            continue
+        pending.setdefault(file, (file, url))
+
+    on_result = None
+    if crawl is not None:
+        journal = CrawlJournal(crawl)
+        journal.plan(((file, str(url)) for file, url in jobs), restart=refresh_cache)
+        journal.mark_done(*cached)
+        on_result = _progress_logger(journal)
+
+    failures = _FETCHER.fetch_all(pending.values(), on_result)
+    if pending:
+        _RESOURCES.enforce_budget()
+
+    if crawl is not None:
+        logger.info(str(journal.progress()))
+
+    if failures and not skip_failures:
+        raise next(iter(failures.values()))
+
+    if failures:
+        logger.warning(f"Skipping {len(failures)} pages that could not be fetched")
+
+    return [file for file, _ in jobs if file not in failures]
+
 
-    _request_url(file, url)
+def resume_crawl(crawl: str, only_failed=False) -> List[Path]:
+    """Fetches the urls of a journaled crawl that are not done yet
+
+    :param only_failed: Only retry urls that failed, not ones never attempted
+    :returns: The files that were fetched
+    """
+    journal = CrawlJournal(crawl)
+    jobs = journal.remaining(only_failed)
+    logger.info(f"Resuming {journal.progress()}")
+    return request_urls(jobs, skip_failures=True, crawl=crawl)
+
+
+def crawl_progress(crawl: str) -> CrawlProgress:
+    """Reports how far along a journaled crawl is"""
+    return CrawlJournal(crawl).progress()
+
+
+def _verify_page(file: Path) -> bool:
+    """Checks that a cached page still has the checksum it was written with.
+    Pages that were cached before checksums were recorded are assumed intact."""
+    expected = _STORE.expected_checksum(file)
+    if expected is None:
+        return True
+
+    try:
+        return _STORE.checksum(file) == expected
+    except CORRUPTION_ERRORS as err:
+        logger.debug(f"Could not read {file.absolute()}: {err}")
+        return False
+
+
+def verify_cache(workers: int = FETCH_CONCURRENCY) -> List[Path]:
+    """Re-hashes every cached page and evicts the ones that no longer match
+    their checksum, so that they are fetched again the next time they are
+    requested. Hashing and decompression release the GIL, so the pages are
+    checked by a pool of threads.
+
+    :returns: The evicted files
+    """
+    files = unique(
+        [file for file in URLS if _STORE.exists(file)]
+        + [file for directory in _POKEMONDB_DIRS for file in _STORE.pages(directory)]
+    )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        intact = list(executor.map(_verify_page, files))
+
+    corrupt = [file for file, ok in zip(files, intact) if not ok]
+    for file in corrupt:
+        logger.warning(f"Evicting corrupt page {file.absolute()}")
+        _RESOURCES.evict(file)
+
+    logger.info(f"Verified {len(files)} cached pages, evicted {len(corrupt)}")
+    return corrupt
+
+
+def refresh_pokemondb_cache() -> None:
+    """Revalidates every cached species, move and ability page. Only pages that
+    changed since they were fetched are transferred again."""
+    jobs: List[FetchJob] = []
+
+    for directory in _POKEMONDB_DIRS:
+        for file in _STORE.pages(directory):
+            metadata = _STORE.load_metadata(file)
+            url = metadata.url if metadata and metadata.url else _page_url(file)
+            jobs.append((file, url))
+
+    logger.info(f"Revalidating {len(jobs)} cached PokemonDB pages")
+    request_urls(jobs, refresh_cache=True, skip_failures=True, crawl="refresh")
 
 
 def populate_cache():
     """Fills the cache with all the items from the URLS defined in the config file"""
-    list(map(lambda kv: request_url(kv[0], kv[1]), URLS.items()))
+    request_urls(URLS.items(), skip_failures=True, crawl="lists")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintains the page cache")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("--workers", type=int, default=FETCH_CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        verify_cache(args.workers)
@@ -1,31 +1,41 @@
 """Fetches the ability list from pokemondb"""
 
 import re
+from concurrent.futures import Future
 from functools import cached_property
 from pathlib import Path
 from pprint import pprint
-from typing import Final, List
+from typing import Dict, Final, Iterator, List, Optional, Tuple
 
 import bs4
 from loguru import logger
+from lxml import etree
 
-from src.config import ABILITY_LIST
+from src.config import ABILITY_LIST, ENRICH_BATCH_SIZE, PARSE_PROCESSES
 from src.data.ability import Ability
-from src.gather_files import request_abilityurl_pokemondb
-from src.utils.general import chunk_list
+from src.gather_files import open_page, read_page, request_abilityurls_pokemondb
+from src.scraper.pokedex import classes_of, stream_table_rows
+from src.utils.general import chunk_list, imap_unordered, run_in_background
 
 # RE_MAX_PP = re.compile(r"\(max. (\d+)\)")
 # RE_GENERATION = re.compile(r"Generation (\d+)")
 
+# Fields of an Ability that are only listed on the page of the ability itself
+ABILITY_DETAIL_FIELDS: Final[Tuple[str, ...]] = ("effect", "description")
+
 
 class AbilityPage:
 
     ABILITY_NAME_SELECTOR: Final[str] = "h1"
     EFFECT_SELECTOR: Final[str] = "h2:contains('Effect')"
     ABILITY_DESCR_TABLE: Final[str] = "h2:contains('Game descriptions') + div > table"
+    # Everything that is read lives in the main content of the page
+    STRAINER: Final[bs4.SoupStrainer] = bs4.SoupStrainer("main")
 
     def __init__(self, html: Path):
-        self._soup = bs4.BeautifulSoup(html.read_text(), "lxml")
+        self._soup = bs4.BeautifulSoup(
+            read_page(html), "lxml", parse_only=AbilityPage.STRAINER
+        )
 
     @cached_property
     def ability_name(self) -> str:
@@ -62,18 +72,152 @@ class AbilityPage:
 
 
 def scrape_ability_urls() -> List[str]:
-    html = bs4.BeautifulSoup(ABILITY_LIST.read_text(), "lxml")
+    html = bs4.BeautifulSoup(read_page(ABILITY_LIST), "lxml")
     return [i["href"] for i in html.select("#abilities a")]
 
 
-def scrape_abilities() -> List[Ability]:
-    """Scrapes abilities"""
-    ability_urls = scrape_ability_urls()
+def _parse_ability_row(row: etree._Element) -> Optional[Tuple[str, Ability]]:
+    """Builds an ability from its row in the ability list. The short
+    description stands in for the game description, and the effect is left
+    for the ability page.
+
+    >>> row = etree.fromstring('''<tr>
+    ... <td><a class="ent-name" href="/ability/levitate">Levitate</a></td>
+    ... <td class="cell-num">37</td>
+    ... <td class="cell-med-text">Gives full immunity to all Ground-type moves.</td>
+    ... <td class="cell-num">3</td></tr>''')
+    >>> url, ability = _parse_ability_row(row)
+    >>> url, ability.ability_name, ability.effect
+    ('/ability/levitate', 'Levitate', '')
+    >>> ability.description
+    'Gives full immunity to all Ground-type moves.'
+    """
+    link = None
+    description = ""
+
+    for cell in row.iterchildren("td"):
+        if "cell-med-text" in classes_of(cell):
+            description = "".join(cell.itertext()).strip()
+        elif link is None:
+            link = next(
+                (a for a in cell.iterchildren("a") if "ent-name" in classes_of(a)),
+                None,
+            )
+
+    if link is None:
+        return None
+    name = "".join(link.itertext()).strip()
+    return link.get("href"), Ability(name, description=description)
+
+
+def scrape_listed_abilities() -> Dict[str, Ability]:
+    """Builds every ability from the ability list, keyed by the url of its page"""
+    abilities: Dict[str, Ability] = {}
+    with open_page(ABILITY_LIST) as page:
+        for row in stream_table_rows(page, "abilities"):
+            entry = _parse_ability_row(row)
+            if entry is not None:
+                abilities[entry[0]] = entry[1]
+    return abilities
 
-    files = [request_abilityurl_pokemondb(url) for url in ability_urls]
 
-    abilities = [AbilityPage(i).ability for i in files]
-    return abilities
+def read_ability_details(file: Path) -> Tuple[str, Optional[Dict[str, str]], str]:
+    """Parses the detail fields of an ability page. Runs in pool workers, so a
+    page that cannot be parsed is reported instead of raised.
+
+    :returns: The name of the page, its detail fields or None, and the error
+    """
+    try:
+        page = AbilityPage(file)
+        return (
+            file.stem,
+            {name: getattr(page, name) for name in ABILITY_DETAIL_FIELDS},
+            "",
+        )
+    except Exception as err:
+        return file.stem, None, f"{type(err).__name__}: {err}"
+
+
+def iter_enriched_abilities(
+    abilities: Dict[str, Ability],
+    batch_size: int = ENRICH_BATCH_SIZE,
+    processes: Optional[int] = PARSE_PROCESSES,
+) -> Iterator[Ability]:
+    """Fetches the pages of listed abilities a batch at a time and parses them
+    in a single process pool, yielding each ability as soon as its effect and game
+    description are merged. Abilities whose page could not be fetched or
+    parsed keep their listed fields and are not yielded."""
+    by_name = {url[len("/ability/") :]: ability for url, ability in abilities.items()}
+
+    def fetched_pages() -> Iterator[Path]:
+        for batch in chunk_list(list(abilities), batch_size):
+            yield from request_abilityurls_pokemondb(batch)
+
+    # One pool parses every batch, while the next batch is fetched on its feeder
+    enriched = 0
+    for name, details, error in imap_unordered(
+        read_ability_details, fetched_pages(), processes, chunksize=8
+    ):
+        if details is None:
+            logger.error(f"Could not read the effect of {name}: {error}")
+            continue
+        ability = by_name[name]
+        for field, value in details.items():
+            setattr(ability, field, value)
+        enriched += 1
+        if enriched % batch_size == 0:
+            logger.info(f"Enriched {enriched} of {len(abilities)} abilities")
+        yield ability
+    logger.info(f"Enriched {enriched} of {len(abilities)} abilities")
+
+
+def enrich_abilities(
+    abilities: Dict[str, Ability],
+    batch_size: int = ENRICH_BATCH_SIZE,
+    processes: Optional[int] = PARSE_PROCESSES,
+) -> List[Ability]:
+    """Merges the effect and game description of every listed ability whose
+    page could be read
+
+    :returns: The abilities that were enriched
+    """
+    return list(iter_enriched_abilities(abilities, batch_size, processes))
+
+
+def enrich_abilities_in_background(
+    abilities: Dict[str, Ability], batch_size: int = ENRICH_BATCH_SIZE
+) -> "Future[List[Ability]]":
+    """Enriches the abilities on a worker thread, so that the listed abilities
+    can be used while the ability pages are crawled. The pages are parsed on
+    that thread too, since forking a pool from a thread is not safe."""
+    return run_in_background(
+        enrich_abilities, abilities, batch_size, 1, name="abilities"
+    )
+
+
+def prefetch_abilities_in_background(
+    abilities: Dict[str, Ability],
+) -> "Future[List[Path]]":
+    """Fetches the pages of the abilities into the cache on a worker thread"""
+    return run_in_background(
+        request_abilityurls_pokemondb, list(abilities), name="abilities"
+    )
+
+
+def scrape_abilities(details: bool = False) -> List[Ability]:
+    """Scrapes every ability from the ability list alone, so they can be used
+    at once. Their effects are filled in later by enrich_abilities or
+    enrich_abilities_in_background.
+
+    :param details: Fetch the page of every ability for its effect and game
+        description before returning, instead of the short description of
+        the list
+    """
+    abilities = scrape_listed_abilities()
+    if details:
+        enrich_abilities(abilities)
+
+    return list(abilities.values())
 
 
 # Update database
@@ -0,0 +1,57 @@
+"""Times the evolution tokenizer on saved pages
+
+Run with `python -m src.scraper.evolutions.benchmark [page.html ...]`. Without
+arguments the cached EvolutionGraph.html is used.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import bs4
+from bs4.element import Tag
+
+from src.config import EVOLUTION_GRAPH
+from src.gather_files import read_page
+from src.scraper.evolutions.tokenizer import tokenize_list
+
+
+def _fragments(page: Path) -> List[List[Tag]]:
+    """The tag lists that get tokenized: every chain of a full evolution page,
+    or the children of the body for the small test pages"""
+    # Only the cached page lives in the page store, the others are plain files
+    text = read_page(page) if page == EVOLUTION_GRAPH else page.read_text("utf-8")
+    html = bs4.BeautifulSoup(text, "lxml")
+    chains = html.select("hr ~ div.infocard-list-evo")
+    if chains:
+        return [chain.find_all(recursive=False) for chain in chains]
+    return [html.body.find_all(recursive=False)]
+
+
+def benchmark_tokenizer(pages: Iterable[Path], repeat: int = 5) -> Dict[str, float]:
+    """Tokenizes each page `repeat` times and keeps the fastest run
+
+    :returns: Seconds per page, keyed by the file name
+    """
+    timings: Dict[str, float] = {}
+    for page in pages:
+        fragments = _fragments(page)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for fragment in fragments:
+                tokenize_list(fragment)
+            best = min(best, time.perf_counter() - start)
+        timings[page.name] = best
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the evolution tokenizer")
+    parser.add_argument("pages", nargs="*", type=Path, default=[EVOLUTION_GRAPH])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, seconds in benchmark_tokenizer(args.pages, args.repeat).items():
+        print(f"{name:32} {seconds * 1000:10.3f} ms")
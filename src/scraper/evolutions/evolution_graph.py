@@ -4,10 +4,11 @@ from functools import singledispatch
 from typing import Any, Dict, List, Optional, Set, Tuple
 
 import bs4
-import networkx as nx
 
 from src.config import EVOLUTION_GRAPH
 from src.data.typing import PokeId, SpeciesId, VariantId
+from src.gather_files import read_page
+from src.scraper.evolutions.forest import EvolutionForest
 from src.scraper.evolutions.tokenizer import (
     ComboToken,
     EvoChainToken,
@@ -16,8 +17,7 @@ from src.scraper.evolutions.tokenizer import (
     SplitToken,
     tokenize,
 )
-from src.utils.general import create_multimap, get_components, grouper_discard
-from src.utils.poke_helpers import add_missing_variants
+from src.utils.general import create_multimap, grouper_discard
 
 
 @singledispatch
@@ -103,28 +103,12 @@ def extract_edges(token: EvoChainToken, prev_pokes: Optional[List[PokeId]] = Non
     return edge_list
 
 
-def create_graph_from_chain(chain: EvoChainToken) -> nx.MultiDiGraph:
-    """Creates graph from evo-chain"""
-    # get vertices (all variants in chain in addition to the)
-    # get edge list
-    vertices = extract_vertices(chain)
-    edges = extract_edges(chain)
-
-    evo_graph = nx.MultiDiGraph()
-    evo_graph.add_nodes_from(vertices)
-
-    for prev, curr, evo in edges:
-        evo_graph.add_edge(prev[0], curr[0], method=evo)
-    return evo_graph
-
-
-def scrape_connections(
+def scrape_evolution_forest(
     variants_list: List[PokeId],
     with_missing_variants: bool = False,
-) -> List[nx.MultiDiGraph]:
-    """Scrapes connections from pokemondb's evolution webpage and
-    converts them into graphs to be used by networkx. To support
-    arbitrary directed multi-graphs, this scraper assumes that each
+) -> EvolutionForest:
+    """Scrapes connections from pokemondb's evolution webpage into a forest.
+    To support arbitrary directed multi-graphs, this scraper assumes that each
     'evolution chain' can be cyclic (no evolution has this structure
     as of SwSh). However each chain has an exit point (last pokemon in
     the chain) that can be used to connect further chains.
@@ -132,67 +116,42 @@ def scrape_connections(
     ## Params
 
     - variants_list: A list of (species, variant) pairs used to uniquely identify pokemon
-    - with_missing_variants: Includes variants that are not in any evolutionary chain into
-        the graph. A good example is Mega Venusaur, which is not an evolution of Ivysaur, but
-        would now be included in the graph.
-    - treeify: A post processing argument to convert the return evolutionary chains into a tree.
-        Note that this assumes that the input graphs are all (directed with parallel edges) trees,
-        which may not be true in the future.
+    - with_missing_variants: Groups variants that are not in any evolutionary chain with
+        the rest of their species. A good example is Mega Venusaur, which is not an
+        evolution of Ivysaur, but would now be included in its component. Like the
+        networkx version, every species of variants_list is grouped, so species such
+        as Rotom that never evolve also form a component of their variants. A species
+        with a single variant that does not evolve is only listed by
+        components(with_isolates=True).
     """
-    species, variants = zip(*variants_list)
-    geneology = create_multimap(species, variants)
+    # Interning the known pokemon first enforces an ordering on the components
+    forest = EvolutionForest(variants_list)
 
     # Get evolutionary chains
-    html = bs4.BeautifulSoup(EVOLUTION_GRAPH.read_text(), "lxml")
+    html = bs4.BeautifulSoup(read_page(EVOLUTION_GRAPH), "lxml")
     chain_selector = "hr ~ div.infocard-list-evo"
-    chains = html.select(chain_selector)
-
-    # Create a graph from each chain. Due to how this is formatted, pokemon like Eevee
-    # will appear in many chains, so these will later have to be unioned.
-    evo_chains = [tokenize(i) for i in chains]
-    raw_chains = [create_graph_from_chain(i) for i in evo_chains]
-
-    # Union graphs together (should be a forest)
-    complete = nx.MultiDiGraph()
-    complete.add_nodes_from(variants_list)  # This enforces an ordering on the nodes
-    complete = nx.compose(complete, nx.compose_all(raw_chains))  # Union all graphs
-
-    if not with_missing_variants:
-        complete.remove_nodes_from(list(nx.isolates(complete)))
 
-    # Isolate the nodes into their trees
-    comps = nx.connected_components(complete.to_undirected())
+    # Due to how this is formatted, pokemon like Eevee will appear in many
+    # chains, so these are unioned as they are added.
+    for chain in html.select(chain_selector):
+        token = tokenize(chain)
+        forest.add_chain(
+            ((prev[0], curr[0], evo) for prev, curr, evo in extract_edges(token)),
+            extract_vertices(token),
+        )
 
     if with_missing_variants:
         # Add implicit edges to group related, but disjoint chains
-        comps = [add_missing_variants(comp, geneology) for comp in comps]
-
-    # Get vertices of the grouped chains
-    grouped_verts = list(get_components(comps))
-
-    subgraphs = [nx.subgraph(complete, comp) for comp in grouped_verts]
-
-    return subgraphs
-
-
-def treeify(g: nx.MultiDiGraph) -> nx.DiGraph:
-    """Converts MultiDigraph (that is already a tree!) into a Tree Digraph.
-    This function does not check for the tree like structure. For compatability
-    with tree_data, we push the data to the nodes."""
-    tree = nx.DiGraph()
-
-    for u, v, data in g.edges.data("method"):
-        if not tree.has_edge(u, v):
-            tree.add_edge(u, v)
-            tree.nodes[v]["methods"] = []
-        tree.nodes[v]["methods"].append(data)
+        geneology = create_multimap(*zip(*variants_list))
+        for species, variants in geneology.items():
+            forest.group((species, variant) for variant in variants)
 
-    return tree
+    return forest
 
 
-def scrape_evolution_trees(variants_list: List[PokeId]) -> List[nx.DiGraph]:
-    subgraphs = scrape_connections(variants_list, with_missing_variants=False)
-    return [treeify(g) for g in subgraphs]
+def scrape_evolution_trees(variants_list: List[PokeId]) -> List[Dict[str, Any]]:
+    """Scrapes every evolution tree in the format of networkx's tree_data"""
+    return scrape_evolution_forest(variants_list).trees()
 
 
 # Test Cases:
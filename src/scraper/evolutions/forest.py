@@ -0,0 +1,144 @@
+"""Stores the evolution chains as a forest of integer indexed pokemon"""
+
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, Iterable, Iterator, List, Tuple
+
+from loguru import logger
+
+from src.data.typing import PokeId
+from src.utils.general import DisjointSet
+
+Edge = Tuple[PokeId, PokeId, str]
+
+
+class EvolutionForest:
+    """The union of every evolution chain. Pokemon are interned to integers in
+    the order they are first seen, and the evolutions are kept in adjacency
+    lists with the methods of every (pre evolution, evolution) pair.
+
+    >>> forest = EvolutionForest([("Oddish", "Oddish")])
+    >>> forest.add_chain([
+    ...     (("Oddish", "Oddish"), ("Gloom", "Gloom"), "(Level 21)"),
+    ...     (("Gloom", "Gloom"), ("Vileplume", "Vileplume"), "(use Leaf Stone)"),
+    ... ])
+    >>> forest.add_chain([
+    ...     (("Gloom", "Gloom"), ("Bellossom", "Bellossom"), "(use Sun Stone)"),
+    ... ], [("Shuckle", "Shuckle")])
+    >>> [[forest.pokes[i][1] for i in comp] for comp in forest.components()]
+    [['Oddish', 'Gloom', 'Vileplume', 'Bellossom']]
+    >>> forest.roots(forest.components()[0])
+    [0]
+    >>> forest.tree_data(0)["children"][0]["children"][1]
+    {'methods': ['(use Sun Stone)'], 'id': ('Bellossom', 'Bellossom')}
+    """
+
+    def __init__(self, pokes: Iterable[PokeId] = ()):
+        self.pokes: List[PokeId] = []
+        self.ids: Dict[PokeId, int] = {}
+        self.successors: List[List[int]] = []
+        self.predecessors: List[List[int]] = []
+        self.methods: Dict[Tuple[int, int], List[str]] = {}
+        self._sets = DisjointSet()
+
+        for poke in pokes:
+            self.intern(poke)
+
+    def __len__(self) -> int:
+        return len(self.pokes)
+
+    def intern(self, poke: PokeId) -> int:
+        """Gets the integer id of the pokemon, adding it when it is new"""
+        idx = self.ids.get(poke)
+        if idx is None:
+            idx = self.ids[poke] = self._sets.add()
+            self.pokes.append(poke)
+            self.successors.append([])
+            self.predecessors.append([])
+        return idx
+
+    def add_chain(self, edges: Iterable[Edge], vertices: Iterable[PokeId] = ()):
+        """Adds the evolutions of a single chain. A pair that evolves in several
+        ways has a method per way. When another chain lists the same pair, its
+        methods replace the stored ones position by position, since every chain
+        restates the full evolution."""
+        seen: DefaultDict[Tuple[int, int], int] = defaultdict(int)
+
+        for prev, curr, method in edges:
+            pair = (self.intern(prev), self.intern(curr))
+            position = seen[pair]
+            seen[pair] += 1
+
+            methods = self.methods.get(pair)
+            if methods is None:
+                methods = self.methods[pair] = []
+                self.successors[pair[0]].append(pair[1])
+                self.predecessors[pair[1]].append(pair[0])
+                self._sets.union(*pair)
+
+            if position < len(methods):
+                methods[position] = method
+            else:
+                methods.append(method)
+
+        for poke in vertices:
+            self.intern(poke)
+
+    def group(self, pokes: Iterable[PokeId]):
+        """Puts the given pokemon in the same component without an evolution"""
+        ids = [self.intern(poke) for poke in pokes]
+        for idx in ids[1:]:
+            self._sets.union(ids[0], idx)
+
+    def components(self, with_isolates: bool = False) -> List[List[int]]:
+        """The connected pokemon, ordered by the pokemon seen first"""
+        return [
+            comp
+            for comp in self._sets.groups()
+            if with_isolates
+            or len(comp) > 1
+            or self.successors[comp[0]]
+            or self.predecessors[comp[0]]
+        ]
+
+    def roots(self, component: Iterable[int]) -> List[int]:
+        """The pokemon of the component that do not evolve from another"""
+        return [
+            idx
+            for idx in component
+            if not self.predecessors[idx] and self.successors[idx]
+        ]
+
+    def tree_data(self, root: int) -> Dict[str, Any]:
+        """Gives the tree below the root in the format of networkx's tree_data,
+        with the methods of an evolution stored on the evolved pokemon"""
+
+        def children(idx: int) -> List[Dict[str, Any]]:
+            nodes = []
+            for child in self.successors[idx]:
+                node: Dict[str, Any] = {
+                    "methods": list(self.methods[(idx, child)]),
+                    "id": self.pokes[child],
+                }
+                grandchildren = children(child)
+                if grandchildren:
+                    node["children"] = grandchildren
+                nodes.append(node)
+            return nodes
+
+        return {"id": self.pokes[root], "children": children(root)}
+
+    def iter_trees(self) -> Iterator[Dict[str, Any]]:
+        """Yields a tree per component, below its first root like the networkx
+        version. Pokemon only reachable from the other roots are left out."""
+        for comp in self.components():
+            root, *others = self.roots(comp)
+            if others:
+                logger.warning(
+                    f"Only the tree below {self.pokes[root]} is kept of a component "
+                    f"that also evolves from {[self.pokes[idx] for idx in others]}"
+                )
+            yield self.tree_data(root)
+
+    def trees(self) -> List[Dict[str, Any]]:
+        """A tree per component, ordered by component"""
+        return list(self.iter_trees())
@@ -0,0 +1,224 @@
+"""Parses the evolution methods listed on pokemondb into Evolution records and
+indexes them by their requirements"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, Final, Iterable, List, Optional, Tuple
+
+from src.data.poke_enums import EvolutionType
+from src.data.species import Evolution
+from src.data.typing import ItemId, PokeId
+
+RE_LEVEL: Final = re.compile(r"Level (\d+)$")
+RE_LOCATION: Final = re.compile(
+    r"(?:level up )?(?:near an? |near |at |in an? |in )(.+?)(?: area)?$"
+)
+RE_GAME: Final = re.compile(r"in (?:Pokémon )?((?:Gen |Ultra |Sun |Moon ).+)$")
+RE_REGION: Final = re.compile(
+    r"(?:in |(outside ))(Kanto|Johto|Hoenn|Sinnoh|Unova|Kalos|Alola|Galar)$"
+)
+
+# Where Burmy battled last, which decides the cloak of Wormadam. The variant
+# evolved into already tells the cloak, so these stay in the description.
+CLOAKS: Final[Tuple[str, ...]] = ("in buildings", "in caves", "in grass")
+
+# Primary clauses that take their requirement from the rest of the clause
+PREFIXED_TYPES: Final[Tuple[Tuple[str, str, EvolutionType], ...]] = (
+    ("trade holding ", "item_reqr", EvolutionType.TradeItem),
+    ("Trade with ", "species_reqr", EvolutionType.TradeSpecies),
+    ("use ", "item_reqr", EvolutionType.Item),
+    ("hold ", "item_reqr", EvolutionType.Item),
+)
+
+TIMES: Final[Tuple[str, ...]] = ("Daytime", "Nighttime", "Dusk 5-6pm")
+
+# How a condition changes the type of an evolution
+MODIFIED_TYPES: Final[Dict[Tuple[EvolutionType, str], EvolutionType]] = {
+    (EvolutionType.Level, "Daytime"): EvolutionType.LevelDay,
+    (EvolutionType.Level, "Nighttime"): EvolutionType.LevelNight,
+    (EvolutionType.Level, "Male"): EvolutionType.LevelMale,
+    (EvolutionType.Level, "Female"): EvolutionType.LevelFemale,
+    (EvolutionType.Level, "Attack > Defense"): EvolutionType.AttackGreater,
+    (EvolutionType.Level, "Attack < Defense"): EvolutionType.DefenseGreater,
+    (EvolutionType.Level, "Attack = Defense"): EvolutionType.AtkDefEqual,
+    (EvolutionType.Level, "Dark type Pokémon in party"): EvolutionType.LevelDarkInParty,
+    (EvolutionType.Level, "during rain"): EvolutionType.LevelRain,
+    # Dusk Lycanroc has no type of its own
+    (EvolutionType.Level, "Dusk 5-6pm"): EvolutionType.Custom1,
+    (EvolutionType.Happiness, "Daytime"): EvolutionType.HappinessDay,
+    (EvolutionType.Happiness, "Nighttime"): EvolutionType.HappinessNight,
+    (EvolutionType.Item, "Male"): EvolutionType.ItemMale,
+    (EvolutionType.Item, "Female"): EvolutionType.ItemFemale,
+    (EvolutionType.Item, "Daytime"): EvolutionType.DayHoldItem,
+    (EvolutionType.Item, "Nighttime"): EvolutionType.NightHoldItem,
+}
+
+
+def _parse_primary(clause: str, evolution: Evolution):
+    """Reads the type of the evolution from its first clause"""
+    level = RE_LEVEL.match(clause)
+    if level:
+        evolution.evolution_type = EvolutionType.Level
+        evolution.numeric_reqr = int(level.group(1))
+        return
+
+    if clause == "Trade":
+        evolution.evolution_type = EvolutionType.Trade
+    elif clause == "high Friendship":
+        evolution.evolution_type = EvolutionType.Happiness
+    elif clause == "level up with max Beauty":
+        evolution.evolution_type = EvolutionType.Beauty
+    elif clause.startswith("after ") and clause.endswith(" learned"):
+        evolution.evolution_type = EvolutionType.HasMove
+        evolution.move_reqr = clause[len("after ") : -len(" learned")]
+    elif clause.startswith("with ") and clause.endswith(" in party"):
+        evolution.evolution_type = EvolutionType.HasInParty
+        evolution.species_reqr = clause[len("with ") : -len(" in party")]
+    else:
+        for prefix, field, evolution_type in PREFIXED_TYPES:
+            if clause.startswith(prefix):
+                evolution.evolution_type = evolution_type
+                setattr(evolution, field, clause[len(prefix) :])
+                return
+
+        location = RE_LOCATION.match(clause)
+        if location:
+            evolution.evolution_type = EvolutionType.Location
+            evolution.location_reqr = location.group(1)
+
+
+def _parse_condition(clause: str, evolution: Evolution):
+    """Narrows the evolution with one of the clauses after the first"""
+    if clause in TIMES:
+        evolution.time_reqr = clause
+
+    modified = MODIFIED_TYPES.get((evolution.evolution_type, clause))
+    if modified is not None:
+        evolution.evolution_type = modified
+        return
+
+    if clause in CLOAKS:
+        return
+
+    region = RE_REGION.match(clause)
+    if region:
+        evolution.region_reqr = (region.group(1) or "") + region.group(2)
+        return
+
+    game = RE_GAME.match(clause)
+    if game:
+        evolution.game_reqr = game.group(1)
+        return
+
+    location = RE_LOCATION.match(clause)
+    if location and not evolution.location_reqr:
+        evolution.location_reqr = location.group(1)
+
+
+def parse_evolution_method(method: str) -> List[Evolution]:
+    """Parses a method such as "(Level 20, Nighttime)" into an Evolution for
+    each of its alternatives. Parts that are not understood are only kept in
+    the description, and an evolution that is not understood at all is
+    INVALID.
+
+    >>> [evo] = parse_evolution_method("(Level 20, Nighttime)")
+    >>> evo.evolution_type, evo.numeric_reqr, evo.time_reqr
+    (LevelNight, 20, 'Nighttime')
+    >>> trade, beauty = parse_evolution_method(
+    ...     "(trade holding Prism Scale, or level up with max Beauty)")
+    >>> trade.evolution_type, trade.item_reqr, beauty.evolution_type
+    (TradeItem, 'Prism Scale', Beauty)
+    >>> [evo] = parse_evolution_method("(use Thunder Stone, outside Alola)")
+    >>> evo.evolution_type, evo.item_reqr, evo.region_reqr, evo.location_reqr
+    (Item, 'Thunder Stone', 'outside Alola', '')
+    >>> [evo] = parse_evolution_method("(use Moon Stone, Dusk 5-6pm)")
+    >>> evo.evolution_type, evo.time_reqr
+    (Item, 'Dusk 5-6pm')
+    """
+    evolutions = []
+    for alternative in method.strip().strip("()").split(", or "):
+        clauses = [clause.strip() for clause in alternative.split(",")]
+        evolution = Evolution(description=method)
+        _parse_primary(clauses[0], evolution)
+        for clause in clauses[1:]:
+            _parse_condition(clause, evolution)
+        evolutions.append(evolution)
+    return evolutions
+
+
+# (pokemon that evolves, evolution)
+Posting = Tuple[PokeId, Evolution]
+
+
+class RequirementIndex:
+    """Inverted indexes of the evolutions by their item, level and location
+
+    >>> index = RequirementIndex.from_trees([
+    ...     {"id": ["Pikachu", "Pikachu"], "children": [
+    ...         {"id": ["Raichu", "Raichu"], "methods": ["(use Thunder Stone)"]},
+    ...     ]},
+    ...     {"id": ["Machop", "Machop"], "children": [
+    ...         {"id": ["Machoke", "Machoke"], "methods": ["(Level 28)"]},
+    ...     ]},
+    ... ])
+    >>> [evo.evolution_form for _, evo in index.with_item("Thunder Stone")]
+    ['Raichu']
+    >>> [poke for poke, _ in index.between_levels(25, 30)]
+    [('Machop', 'Machop')]
+    """
+
+    def __init__(self, postings: Iterable[Posting] = ()):
+        self.by_item: DefaultDict[ItemId, List[Posting]] = defaultdict(list)
+        self.by_location: DefaultDict[str, List[Posting]] = defaultdict(list)
+        self.by_type: DefaultDict[EvolutionType, List[Posting]] = defaultdict(list)
+        # Postings of level evolutions, sorted by level
+        self._levels: List[int] = []
+        self._level_postings: List[Posting] = []
+
+        levelled = []
+        for posting in postings:
+            evolution = posting[1]
+            self.by_type[evolution.evolution_type].append(posting)
+            if evolution.item_reqr:
+                self.by_item[evolution.item_reqr].append(posting)
+            if evolution.location_reqr:
+                self.by_location[evolution.location_reqr].append(posting)
+            if evolution.numeric_reqr >= 0:
+                levelled.append(posting)
+
+        levelled.sort(key=lambda posting: posting[1].numeric_reqr)
+        self._levels = [evolution.numeric_reqr for _, evolution in levelled]
+        self._level_postings = levelled
+
+    @classmethod
+    def from_trees(cls, trees: Iterable[Dict[str, Any]]) -> "RequirementIndex":
+        """Builds the index from trees in the format of networkx's tree_data"""
+
+        def postings(node: Dict[str, Any]) -> Iterable[Posting]:
+            poke = tuple(node["id"])
+            for child in node.get("children", ()):
+                species, variant = child["id"]
+                for method in child.get("methods", ()):
+                    for evolution in parse_evolution_method(method):
+                        evolution.evolution_form = species
+                        evolution.variant_form = variant
+                        yield poke, evolution  # type: ignore
+                yield from postings(child)
+
+        return cls(posting for tree in trees for posting in postings(tree))
+
+    def with_item(self, item: ItemId) -> List[Posting]:
+        return self.by_item.get(item, [])
+
+    def at_location(self, location: str) -> List[Posting]:
+        return self.by_location.get(location, [])
+
+    def of_type(self, evolution_type: EvolutionType) -> List[Posting]:
+        return self.by_type.get(evolution_type, [])
+
+    def between_levels(self, low: int, high: Optional[int] = None) -> List[Posting]:
+        """The evolutions from level low up to and including level high"""
+        start = bisect_left(self._levels, low)
+        end = len(self._levels) if high is None else bisect_right(self._levels, high)
+        return self._level_postings[start:end]
@@ -1,9 +1,10 @@
 """Constructs the evolution graph"""
 
+import enum
 from abc import ABC, abstractmethod
 from collections import deque
 from dataclasses import dataclass
-from typing import Deque, List, Optional, Tuple
+from typing import Deque, List, Optional, Sequence, Tuple
 
 from bs4.element import Tag
 from loguru import logger
@@ -11,13 +12,62 @@ from loguru import logger
 from src.data.typing import PokeId
 
 
+class TagKind(enum.Enum):
+    """The role of a tag in an evolution chain"""
+
+    INVALID = -1
+    INFOCARD = 0
+    ARROW = 1
+    CHAIN = 2
+    SPLIT = 3
+    PLUS = 4
+
+
+def tag_kind(tag: Tag) -> TagKind:
+    """Classifies a tag by its name and class set
+
+    >>> import bs4
+    >>> soup = bs4.BeautifulSoup('''<div class="infocard "></div>
+    ... <span class="infocard infocard-arrow"></span>
+    ... <span><i class="icon-arrow">+</i></span>''', 'lxml')
+    >>> [tag_kind(tag).name for tag in soup.body.find_all(recursive=False)]
+    ['INFOCARD', 'ARROW', 'PLUS']
+    """
+    classes = tag.get("class", ())
+    if classes == ["infocard"]:
+        return TagKind.INFOCARD
+    if "infocard-arrow" in classes:
+        return TagKind.ARROW
+    if "infocard-list-evo" in classes and tag.name == "div":
+        return TagKind.CHAIN
+    if "infocard-evo-split" in classes:
+        return TagKind.SPLIT
+    if tag.name == "span":
+        icon = tag.find("i", class_="icon-arrow")
+        if icon is not None and icon.string == "+":
+            return TagKind.PLUS
+    return TagKind.INVALID
+
+
+def tag_kinds(html_list: Sequence[Tag]) -> List[TagKind]:
+    return [tag_kind(tag) for tag in html_list]
+
+
+def _is_variant_label(small: Tag) -> bool:
+    """Matches br + small:not(:has(a))"""
+    previous = small.find_previous_sibling(True)
+    return previous is not None and previous.name == "br" and small.find("a") is None
+
+
 def poke_from_infocard(html_frag: Tag) -> PokeId:
     """Given that the tag is an div.infocard, this extracts the pokemon from the Tag"""
-    if not (html_frag.has_attr("class") and {"infocard"} == set(html_frag["class"])):
+    if tag_kind(html_frag) != TagKind.INFOCARD:
         raise ValueError("Tag is not of the form div.infocard")
 
-    species_html = html_frag.select_one("a.ent-name")
-    variant_html = html_frag.select_one("br + small:not(:has(a))")
+    species_html = html_frag.find("a", class_="ent-name")
+    variant_html = next(
+        (i for i in html_frag.find_all("small") if _is_variant_label(i)), None
+    )
 
     species = species_html.string
     variant = species
@@ -154,7 +204,7 @@ class EvoToken(BaseToken):
     html_frag: Tag
 
     def __post_init__(self):
-        self._evolution = self.html_frag.select_one("small").text
+        self._evolution = self.html_frag.find("small").text
 
     @property
     def token_type(self) -> str:
@@ -175,134 +225,100 @@ class EvoToken(BaseToken):
 
 
 class Lexeme(ABC):
-    """General base class for a lexeme"""
+    """General base class for a lexeme. A lexeme matches when the kinds of the
+    tags at the cursor equal its pattern."""
 
-    @classmethod
-    @abstractmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        """Determines if the first tags match the lexeme"""
+    PATTERN: Tuple[TagKind, ...] = ()
 
     @classmethod
-    @abstractmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
-        """Create a token from the lexeme"""
+    def matches(
+        cls,
+        html_list: Sequence[Tag],
+        pos: int = 0,
+        kinds: Optional[Sequence[TagKind]] = None,
+    ) -> bool:
+        """Determines if the tags starting at pos match the lexeme. The kinds of
+        the tags are classified on the spot unless they are given."""
+        width = len(cls.PATTERN)
+        if isinstance(html_list, Tag) or pos + width > len(html_list):
+            return False
+
+        for offset, kind in enumerate(cls.PATTERN):
+            found = (
+                kinds[pos + offset]
+                if kinds is not None
+                else tag_kind(html_list[pos + offset])
+            )
+            if found != kind:
+                return False
+        return True
 
     @classmethod
     @abstractmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        """Returns a slice of the html_list without the lexeme.
-        This assumes that the lexeme begins at the 0th index and is present"""
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
+        """Create a token from the lexeme starting at pos"""
+        raise NotImplementedError()
 
 
 class ComboLex(Lexeme):
     """Lexeme to represent a combo of pokemon. This is currently only used
-    the Nincada family."""
-
-    @classmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        """Determines if the first three elements form a 'combo'
-        where multiple pokemon are grouped together like Shedinja and Ninjask
-        """
-        if len(html_list) < 3:
-            return False
+    the Nincada family, where multiple pokemon are grouped together like
+    Shedinja and Ninjask."""
 
-        card1, operation, card2, *_ = html_list
-        op_valid = operation.name == "span" and (
-            operation.select_one("i.icon-arrow").string == "+"
-        )
-        card1_valid = InfocardLex.matches([card1])
-        card2_valid = InfocardLex.matches([card2])
-        return op_valid and card1_valid and card2_valid
-
-    @classmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
-        """Create a token from the lexeme"""
-        return ComboToken(html_list[0:3])
+    PATTERN = (TagKind.INFOCARD, TagKind.PLUS, TagKind.INFOCARD)
 
     @classmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        """Returns a slice of the html_list without the lexeme.
-        This assumes that the lexeme begins at the 0th index and is present"""
-        return html_list[3:]
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
+        return ComboToken(list(html_list[pos : pos + 3]))
 
 
 class InfocardLex(Lexeme):
     """Lexeme representing a infocard element. Note that infocard must be
     the only class of the tag"""
 
-    @classmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        html_frag = html_list[0]
-        return html_frag.has_attr("class") and {"infocard"} == set(html_frag["class"])
-
-    @classmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
-        return PokeToken(html_list[0])
+    PATTERN = (TagKind.INFOCARD,)
 
     @classmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        return html_list[1:]
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
+        return PokeToken(html_list[pos])
 
 
 class ArrowLex(Lexeme):
     """Lexeme representing a infocard-arrow element."""
 
-    @classmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        html_frag = html_list[0]
-        return html_frag.has_attr("class") and "infocard-arrow" in html_frag["class"]
+    PATTERN = (TagKind.ARROW,)
 
     @classmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
-        return EvoToken(html_list[0])
-
-    @classmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        return html_list[1:]
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
+        return EvoToken(html_list[pos])
 
 
 class InfocardListLex(Lexeme):
     """Lexeme representing a infocard-list element."""
 
-    @classmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        html_frag = html_list[0]
-        return (
-            html_frag.has_attr("class")
-            and "infocard-list-evo" in html_frag["class"]
-            and html_frag.name == "div"
-        )
+    PATTERN = (TagKind.CHAIN,)
 
     @classmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
         return EvoChainToken(
-            html_list[0], tokenize_list(html_list[0].find_all(recursive=False))
+            html_list[pos], tokenize_list(html_list[pos].find_all(recursive=False))
         )
 
-    @classmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        return html_list[1:]
-
 
 class EvoSplitLex(Lexeme):
     """Lexeme representing a infocard-list element."""
 
-    @classmethod
-    def matches(cls, html_list: List[Tag]) -> bool:
-        html_frag = html_list[0]
-        return (
-            html_frag.has_attr("class") and "infocard-evo-split" in html_frag["class"]
-        )
+    PATTERN = (TagKind.SPLIT,)
 
     @classmethod
-    def create_token(cls, html_list: List[Tag]) -> BaseToken:
+    def create_token(cls, html_list: Sequence[Tag], pos: int = 0) -> BaseToken:
         def simplify(html_list: List[Tag]):
             """Sanity check that everything has one child and every child is a chain"""
-            if len(html_list) > 1 or not InfocardListLex.matches([html_list[0]]):
+            if len(html_list) > 1 or not InfocardListLex.matches(html_list):
                 raise NotImplementedError()
             return html_list[0]
 
-        children = html_list[0].find_all(recursive=False)
+        children = html_list[pos].find_all(recursive=False)
 
         first_level = [i for i in children if i.name == "span"]
 
@@ -317,11 +333,7 @@ class EvoSplitLex(Lexeme):
             for child in second_level
         ]
 
-        return SplitToken(deque(head_d), html_list[0])
-
-    @classmethod
-    def consume_lexeme(cls, html_list: List[Tag]) -> List[Tag]:
-        return html_list[1:]
+        return SplitToken(deque(head_d), html_list[pos])
 
 
 LEXABLE_HTML_ELEMENTS = [
@@ -442,9 +454,10 @@ def is_valid_token(evo_token: EvoChainToken, start_with_poke: bool = True) -> bo
     return True
 
 
-def tokenize_list(html_list: List) -> Deque:
+def tokenize_list(html_list: Sequence[Tag]) -> Deque:
     """
-    Tokenizes a list of html fragments into a full tree describing the evolution chain
+    Tokenizes a list of html fragments into a full tree describing the evolution chain.
+    The kinds of the tags are classified once, and a cursor walks over them.
 
      Possible children
      - i.icon-arrow:contains("+") (Two or more pokemon generated) -
@@ -453,19 +466,21 @@ def tokenize_list(html_list: List) -> Deque:
      - infocard-evo-split (Fork in chain) -
      - infocard-list-evo (evolution subtree) -
     """
+    kinds = tag_kinds(html_list)
+    tokens: Deque = deque()
+    pos = 0
+
+    while pos < len(html_list):
+        for lexeme in LEXABLE_HTML_ELEMENTS:
+            if lexeme.matches(html_list, pos, kinds):
+                tokens.append(lexeme.create_token(html_list, pos))
+                pos += len(lexeme.PATTERN)
+                break
+        else:
+            # Does not match one of the given cases
+            raise NotImplementedError()
 
-    if len(html_list) == 0:
-        return deque()
-
-    for lexeme in LEXABLE_HTML_ELEMENTS:
-        if lexeme.matches(html_list):
-            head = lexeme.create_token(html_list)
-            tail = tokenize_list(lexeme.consume_lexeme(html_list))
-            tail.appendleft(head)
-            return tail
-
-    # Does not match one of the given cases
-    raise NotImplementedError()
+    return tokens
 
 
 def tokenize(html: Tag) -> EvoChainToken:
@@ -0,0 +1,57 @@
+"""Plans every PokemonDB page a full scrape reads before any of them is parsed.
+
+Species, move and ability pages used to be fetched one scraper at a time, the
+species pages even one at a time while creating each species, so network waits
+were interleaved with parsing. The frontier is read from the three list pages
+instead and prefetched as one deduplicated batch, after which every scraper
+parses from a warm cache."""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from loguru import logger
+
+from src.gather_files import populate_cache, prefetch_pokemondb
+from src.scraper.ability import scrape_ability_urls
+from src.scraper.pmove import scrape_move_urls
+from src.scraper.pokedex import scrape_pokedex
+from src.utils.general import unique
+
+
+@dataclass
+class Frontier:
+    """Relative PokemonDB urls of every species, move and ability page
+
+    >>> frontier = Frontier(["/pokedex/bulbasaur"], ["/move/absorb"], [])
+    >>> len(frontier)
+    2
+    """
+
+    species: List[str] = field(default_factory=list)
+    moves: List[str] = field(default_factory=list)
+    abilities: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.species) + len(self.moves) + len(self.abilities)
+
+
+def plan_frontier() -> Frontier:
+    """Collects the urls linked from Pokedex.html, Moves.html and AbilityList.html.
+    Variants of a species share one page, so each url is only kept once."""
+    populate_cache()
+    urls = scrape_pokedex()[4]
+    return Frontier(unique(urls), unique(scrape_move_urls()), scrape_ability_urls())
+
+
+def prefetch_frontier(frontier: Optional[Frontier] = None) -> Frontier:
+    """Fetches every page of the frontier in one batch
+
+    :param frontier: The pages to fetch, planned from the list pages if not given
+    """
+    frontier = frontier if frontier is not None else plan_frontier()
+    logger.info(
+        f"Prefetching {len(frontier.species)} species, {len(frontier.moves)} move "
+        f"and {len(frontier.abilities)} ability pages"
+    )
+    prefetch_pokemondb(frontier.species, frontier.moves, frontier.abilities)
+    return frontier
@@ -10,6 +10,7 @@ from loguru import logger
 from src.config import ITEMS_LIST
 from src.data.item import Item
 from src.data.poke_enums import ItemCategory
+from src.gather_files import read_page
 
 
 def parse_item(item_html):
@@ -29,7 +30,7 @@ def scrape_items():
 
     populate_cache()
     strainer = bs4.SoupStrainer("table")
-    items_html = bs4.BeautifulSoup(ITEMS_LIST.read_text(), "lxml", parse_only=strainer)
+    items_html = bs4.BeautifulSoup(read_page(ITEMS_LIST), "lxml", parse_only=strainer)
 
     items = items_html.select("tbody tr")
 
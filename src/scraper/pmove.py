@@ -1,23 +1,56 @@
 """Scrape Moves"""
 
 import re
+from concurrent.futures import Future
 from functools import cached_property
 from pathlib import Path
 from pprint import pprint
-from typing import Final, List, Optional
+from typing import Any, Dict, Final, Iterator, List, Optional, Tuple
 
 import bs4
 from loguru import logger
+from lxml import etree
 
-from src.config import MOVES_LIST
+from src.config import MOVES_LIST, PARSE_PROCESSES
 from src.data.pmove import PMove
 from src.data.poke_enums import MoveCategory, PType
-from src.gather_files import request_moveurl_pokemondb
-from src.utils.general import normalize_unicode
+from src.gather_files import open_page, read_page, request_moveurls_pokemondb
+from src.scraper.pokedex import classes_of, stream_table_rows
+from src.utils.general import imap_unordered, normalize_unicode, run_in_background
 
 RE_MAX_PP = re.compile(r"\(max. (\d+)\)")
 RE_GENERATION = re.compile(r"Generation (\d+)")
 
+# Fields of a PMove that are only listed on the page of the move itself
+MOVE_DETAIL_FIELDS: Final[Tuple[str, ...]] = (
+    "max_pp",
+    "generation_introduced",
+    "tm",
+    "tr",
+    "effect",
+    "zmove_effect",
+    "description",
+    "target_description",
+)
+
+
+def _move_value(string: str) -> float:
+    """Parses the power or accuracy of a move
+
+    >>> _move_value(" 40 ")
+    40.0
+    >>> _move_value("—")
+    nan
+    >>> _move_value("∞")
+    inf
+    """
+    string = string.strip()
+    if string == "—":
+        return float("nan")
+    if string == "∞":
+        return float("inf")
+    return float(string)
+
 
 class MovePage:
 
@@ -28,9 +61,13 @@ class MovePage:
     ZMOVE_EFFECT_SELECTOR: Final[str] = "h3:contains('Z-Move effects')"
     TARGET_DESCR_SELECTOR: Final[str] = "p.mt-descr"
     MOVE_DESCR_TABLE: Final[str] = "#move-descr + div > table.vitals-table > tbody"
+    # Everything that is read lives in the main content of the page
+    STRAINER: Final[bs4.SoupStrainer] = bs4.SoupStrainer("main")
 
     def __init__(self, path: Path):
-        self._soup = bs4.BeautifulSoup(path.read_text(), "lxml")
+        self._soup = bs4.BeautifulSoup(
+            read_page(path), "lxml", parse_only=MovePage.STRAINER
+        )
         self._move_data = self._soup.select_one(MovePage.MOVE_DATA_SELECTOR)
 
     @cached_property
@@ -54,22 +91,12 @@ class MovePage:
     @cached_property
     def power(self) -> float:
         html = self._move_data.select_one("th:contains('Power') + td")
-        string = html.string.strip()
-        if string == "—":
-            return float("nan")
-        if string == "∞":
-            return float("inf")
-        return float(html.string.strip())
+        return _move_value(html.string)
 
     @cached_property
     def accuracy(self) -> float:
         html = self._move_data.select_one("th:contains('Accuracy') + td")
-        string = html.string.strip()
-        if string == "—":
-            return float("nan")
-        if string == "∞":
-            return float("inf")
-        return float(html.string.strip())
+        return _move_value(html.string)
 
     @cached_property
     def pp(self) -> Optional[int]:
@@ -207,25 +234,156 @@ class MovePage:
         return self.move.__repr__()
 
 
+def read_move_details(file: Path) -> Tuple[str, Optional[Dict[str, Any]], str]:
+    """Parses the detail fields of a move page. Runs in pool workers, so a page
+    that cannot be parsed is reported instead of raised.
+
+    :returns: The name of the page, its detail fields or None, and the error
+    """
+    try:
+        page = MovePage(file)
+        return file.stem, {name: getattr(page, name) for name in MOVE_DETAIL_FIELDS}, ""
+    except Exception as err:
+        return file.stem, None, f"{type(err).__name__}: {err}"
+
+
+def merge_move_details(move: PMove, details: Dict[str, Any]) -> PMove:
+    """Fills the fields of a listed move that only its own page has"""
+    for name in MOVE_DETAIL_FIELDS:
+        setattr(move, name, details[name])
+    return move
+
+
 def get_move_url(move_html: bs4.BeautifulSoup) -> str:
     fields = move_html.select("td")
     return fields[0].find("a")["href"]
 
 
-def scrape_moves() -> List[PMove]:
-    from src.gather_files import populate_cache
+def scrape_move_urls() -> List[str]:
+    strainer = bs4.SoupStrainer(id="moves")
+    moves_html = bs4.BeautifulSoup(read_page(MOVES_LIST), "lxml", parse_only=strainer)
+    return [get_move_url(move) for move in moves_html.select("tbody tr")]
+
+
+def _parse_move_row(row: etree._Element) -> Optional[Tuple[str, PMove]]:
+    """Builds a move from its row in the move list. Fields that are not listed
+    there keep their defaults, and the short effect stands in for the effect.
+
+    >>> row = etree.fromstring('''<tr>
+    ... <td class="cell-name"><a class="ent-name" href="/move/absorb">Absorb</a></td>
+    ... <td class="cell-icon"><a class="type-icon type-grass">Grass</a></td>
+    ... <td class="cell-icon text-center"><img alt="Special" title="Special"/></td>
+    ... <td class="cell-num">20</td><td class="cell-num">100</td>
+    ... <td class="cell-num">25</td>
+    ... <td class="cell-long-text">User recovers half the HP inflicted.</td>
+    ... <td class="cell-num">—</td></tr>''')
+    >>> url, move = _parse_move_row(row)
+    >>> url, move.ptype, move.category, move.power, move.accuracy, move.pp
+    ('/move/absorb', Grass, Special, 20.0, 100.0, 25)
+    >>> move.effect
+    'User recovers half the HP inflicted.'
+    """
+    link = None
+    ptype = PType.INVALID
+    category = MoveCategory.NoCategory
+    numbers: List[str] = []
+    effect = ""
+
+    for cell in row.iterchildren("td"):
+        classes = classes_of(cell)
+        if "cell-name" in classes:
+            link = next(cell.iterchildren("a"), None)
+        elif "cell-long-text" in classes:
+            effect = "".join(cell.itertext()).strip()
+        elif "cell-icon" in classes:
+            for child in cell.iterchildren("a", "img"):
+                if child.tag == "a":
+                    ptype = PType[child.text]
+                elif child.get("title") is not None:
+                    category = MoveCategory[child.get("title")]
+        elif "cell-num" in classes:
+            numbers.append("".join(cell.itertext()))
+
+    if link is None or len(numbers) < 3:
+        return None
 
-    populate_cache()
+    pp = numbers[2].strip()
+    return link.get("href"), PMove(
+        name="".join(link.itertext()).strip(),
+        ptype=ptype,
+        category=category,
+        power=_move_value(numbers[0]),
+        accuracy=_move_value(numbers[1]),
+        pp=int(pp) if pp != "—" else None,
+        effect=effect,
+    )
+
+
+def scrape_listed_moves() -> Dict[str, PMove]:
+    """Builds every move from the move list alone, keyed by the url of its page.
+    This takes a single cached page instead of one request per move."""
+    moves: Dict[str, PMove] = {}
+    with open_page(MOVES_LIST) as page:
+        for row in stream_table_rows(page, "moves"):
+            entry = _parse_move_row(row)
+            if entry is not None:
+                moves[entry[0]] = entry[1]
+    return moves
 
-    strainer = bs4.SoupStrainer(id="moves")
-    moves_html = bs4.BeautifulSoup(MOVES_LIST.read_text(), "lxml", parse_only=strainer)
 
-    moves = moves_html.select("tbody tr")
+def iter_enriched_moves(
+    moves: Dict[str, PMove], processes: Optional[int] = PARSE_PROCESSES
+) -> Iterator[PMove]:
+    """Fetches the pages of listed moves and parses them in a process pool,
+    yielding each move as soon as its detail fields are merged. Moves whose
+    page could not be fetched or parsed keep their listed fields and are
+    not yielded."""
+    by_name = {url[len("/move/") :]: move for url, move in moves.items()}
+    files = request_moveurls_pokemondb(moves)
 
-    urls = [get_move_url(move) for move in moves]
-    files = [request_moveurl_pokemondb(url) for url in urls]
+    for name, details, error in imap_unordered(
+        read_move_details, files, processes, chunksize=8
+    ):
+        if details is None:
+            logger.error(f"Could not read the details of {name}: {error}")
+            continue
+        yield merge_move_details(by_name[name], details)
 
-    # 0 - 10,000 Volt thunderbolt, 1 - Absorb, 7 - Acrobatics
-    moves = [MovePage(i).move for i in files]
 
-    return moves
+def enrich_moves(
+    moves: Dict[str, PMove], processes: Optional[int] = PARSE_PROCESSES
+) -> List[PMove]:
+    """Merges the detail fields of every listed move whose page could be read
+
+    :returns: The moves that were enriched
+    """
+    return list(iter_enriched_moves(moves, processes))
+
+
+def enrich_moves_in_background(moves: Dict[str, PMove]) -> "Future[List[PMove]]":
+    """Enriches the moves on a worker thread, so that the listed moves can be
+    used while the move pages are crawled. The pages are parsed on that thread
+    too, since forking a pool from a thread is not safe."""
+    return run_in_background(enrich_moves, moves, 1, name="moves")
+
+
+def prefetch_moves_in_background(moves: Dict[str, PMove]) -> "Future[List[Path]]":
+    """Fetches the pages of the moves into the cache on a worker thread"""
+    return run_in_background(request_moveurls_pokemondb, list(moves), name="moves")
+
+
+def scrape_moves(details: bool = True) -> List[PMove]:
+    """Scrapes every move from the move list
+
+    :param details: Also fetch the page of every move for the fields that the
+        list does not have
+    """
+    from src.gather_files import populate_cache
+
+    populate_cache()
+
+    moves = scrape_listed_moves()
+    if details:
+        enrich_moves(moves)
+
+    return list(moves.values())
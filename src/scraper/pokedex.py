@@ -1,58 +1,178 @@
 """Constructs a pokedex from the pokemon db page"""
 
-# from functools import lru_cache
-
+from array import array
+from dataclasses import dataclass, field
 from functools import lru_cache
-from typing import Dict, Iterable, List, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
-import bs4
+from lxml import etree
 
 from src.config import POKEDEX
 from src.data.poke_enums import PType
 from src.data.stats import BaseStats
 from src.data.typing import SpeciesId, VariantId
-
-
-# @profile
-def _parse_dex_entry(
-    html: bs4.BeautifulSoup,
-) -> Tuple[str, str, List[PType], BaseStats, str]:
-    """Parses a single dex entry from the pokemon database.
+from src.gather_files import open_page
+
+# Stat columns of the pokedex table, in the order they are listed
+STAT_NAMES = (
+    "hp",
+    "attack",
+    "defense",
+    "special_attack",
+    "special_defense",
+    "speed",
+)
+
+
+@dataclass
+class PokedexTable:
+    """The all pokemon list stored column by column. Types are kept as the codes
+    of their PType, with PType.INVALID for the missing type of a single type
+    pokemon, and every base stat has its own array."""
+
+    species: List[SpeciesId] = field(default_factory=list)
+    variants: List[VariantId] = field(default_factory=list)
+    primary_types: array = field(default_factory=lambda: array("b"))
+    secondary_types: array = field(default_factory=lambda: array("b"))
+    stats: Dict[str, array] = field(
+        default_factory=lambda: {stat: array("B") for stat in STAT_NAMES}
+    )
+    urls: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.species)
+
+    def append(
+        self,
+        species: SpeciesId,
+        variant: VariantId,
+        typing: List[PType],
+        stats: List[int],
+        url: str,
+    ) -> None:
+        self.species.append(species)
+        self.variants.append(variant)
+        self.primary_types.append(typing[0].value if typing else PType.INVALID.value)
+        self.secondary_types.append(
+            typing[1].value if len(typing) > 1 else PType.INVALID.value
+        )
+        for stat, value in zip(STAT_NAMES, stats):
+            self.stats[stat].append(value)
+        self.urls.append(url)
+
+    def typing(self, row: int) -> List[PType]:
+        codes = (self.primary_types[row], self.secondary_types[row])
+        return [PType(code) for code in codes if code != PType.INVALID.value]
+
+    def base_stats(self, row: int) -> BaseStats:
+        return BaseStats(**{stat: self.stats[stat][row] for stat in STAT_NAMES})
+
+    def columns(self) -> List[Tuple]:
+        """The species, variants, typing, stats and urls as parallel tuples"""
+        rows = range(len(self))
+        return [
+            tuple(self.species),
+            tuple(self.variants),
+            tuple(self.typing(row) for row in rows),
+            tuple(self.base_stats(row) for row in rows),
+            tuple(self.urls),
+        ]
+
+
+def classes_of(element: etree._Element) -> List[str]:
+    """The classes of an lxml element"""
+    return (element.get("class") or "").split()
+
+
+def _parse_dex_row(
+    row: etree._Element,
+) -> Optional[Tuple[str, str, List[PType], List[int], str]]:
+    """Parses a single row of the pokedex table in one pass over its cells.
     If the default form of the species has no variant name,
     the species name will be used as the variant name.
 
+    >>> row = etree.fromstring('''<tr>
+    ... <td class="cell-num cell-fixed"><span>0003</span></td>
+    ... <td class="cell-name"><a class="ent-name" href="/pokedex/venusaur">Venusaur</a>
+    ... <small class="text-muted">Mega Venusaur</small></td>
+    ... <td class="cell-icon"><a class="type-icon type-grass">Grass</a>
+    ... <a class="type-icon type-poison">Poison</a></td>
+    ... <td class="cell-num cell-total">625</td><td class="cell-num">80</td>
+    ... <td class="cell-num">100</td><td class="cell-num">123</td>
+    ... <td class="cell-num">122</td><td class="cell-num">120</td>
+    ... <td class="cell-num">80</td></tr>''')
+    >>> _parse_dex_row(row)
+    ('Venusaur', 'Mega Venusaur', [Grass, Poison], [80, 100, 123, 122, 120, 80], '/pokedex/venusaur')
+
     :returns: A tuple of the species name as listed, the variant name as listed,
-        the typing of the pokemon, the base stats of the pokemon, and the relative
-        of the pokemon
+        the typing of the pokemon, the base stats of the pokemon in the order of
+        STAT_NAMES, and the relative url of the pokemon. None for rows without
+        a pokemon, such as the header.
     """
+    name_link = None
+    variant_name = None
+    typing: List[PType] = []
+    numbers: List[str] = []
+
+    for cell in row.iterchildren("td"):
+        classes = classes_of(cell)
+        if "cell-name" in classes:
+            for child in cell.iterchildren("a", "small"):
+                if child.tag == "small":
+                    variant_name = child.text
+                elif "ent-name" in classes_of(child):
+                    name_link = child
+        elif "cell-icon" in classes:
+            typing = [
+                PType[icon.text]
+                for icon in cell.iterchildren("a")
+                if "type-icon" in classes_of(icon)
+            ]
+        elif "cell-num" in classes:
+            numbers.append(cell.text)
+
+    if name_link is None:
+        return None
+
+    species_name = str(name_link.text)
+    stats = [int(number) for number in numbers[-len(STAT_NAMES) :]]
+    return (
+        species_name,
+        str(variant_name) if variant_name is not None else species_name,
+        typing,
+        stats,
+        str(name_link.get("href")),
+    )
+
+
+def stream_table_rows(page: BinaryIO, table_id: str) -> Iterator[etree._Element]:
+    """Streams the body rows of the table with the id. The page is parsed as it
+    is read, and every row is discarded once the caller is done with it, so
+    neither the page nor its tree is held in memory at once."""
+    for _, row in etree.iterparse(
+        page, events=("end",), tag="tr", html=True, encoding="utf-8"
+    ):
+        body = row.getparent()
+        if body is not None and body.tag == "tbody":
+            table = body.getparent()
+            if table is not None and table.get("id") == table_id:
+                yield row
+
+        row.clear()
+        while body is not None and row.getprevious() is not None:
+            del body[0]
 
-    name_link = html.select_one("a.ent-name")
-    small = html.select_one("small")
-    species_name = str(name_link.string)
-    variant_name = str(small.string) if small else species_name
-
-    url = str(name_link["href"])
 
-    # print(html)
-    typing = [PType[t.string] for t in html.find_all("a", attrs={"class": "type-icon"})]
-
-    # This has to explicitly select one class to avoid selecting other html elements
-
-    stat_names = [
-        "hp",
-        "attack",
-        "defense",
-        "special_attack",
-        "special_defense",
-        "speed",
-    ]
-    stat_vals = [
-        int(stat.string)
-        for stat in html.find_all("td", attrs={"class": "cell-num"})[-6:]
-    ]
-    stats = BaseStats(**dict(zip(stat_names, stat_vals)))
-
-    return species_name, variant_name, typing, stats, url
+@lru_cache(maxsize=1)
+def scrape_pokedex_table() -> PokedexTable:
+    """Scrapes the pokedex for variants, typing, and base stats into columns"""
+    table = PokedexTable()
+    with open_page(POKEDEX) as page:
+        for row in stream_table_rows(page, "pokedex"):
+            entry = _parse_dex_row(row)
+            if entry is not None:
+                table.append(*entry)
+    return table
 
 
 @lru_cache(maxsize=1)
@@ -62,10 +182,4 @@ def scrape_pokedex() -> List:
     :returns: A tuple of species, variants, typing, stats, url.
 
     """
-
-    # Note: We are using lxml to shave off half a second from the execution time.
-    # This makes parsing of invalid documents more fragile
-    pokedex_html = bs4.BeautifulSoup(POKEDEX.read_text(), "lxml")
-    variants_html = pokedex_html.select("#pokedex > tbody > tr")
-    pokedex = [_parse_dex_entry(dex_entry) for dex_entry in variants_html]
-    return list(zip(*pokedex))
+    return scrape_pokedex_table().columns()
@@ -1,14 +1,16 @@
 """Contains basic code for completely defining a speciess/variant in pokemon"""
 
 import re
+from dataclasses import dataclass, field
 from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
 
 import bs4
 from bs4.element import Tag
 from loguru import logger
 
+from src.config import SPECIES_PARSER, SPECIES_RECORD_CACHE_SIZE
 from src.data.poke_enums import EggGroup, LevelingRate, PType
 from src.data.species import (
     REGIONAL_TEXT_MAPPING,
@@ -20,22 +22,45 @@ from src.data.species import (
 )
 from src.data.stats import BaseStats, EffortValues
 from src.data.typing import SpeciesId, VariantId
-from src.gather_files import request_pokeurl_pokemondb
-from src.utils.general import normalize_unicode
+from src.gather_files import read_page, request_pokeurl_pokemondb
+from src.utils.general import add_slots, normalize_unicode
+
+T = TypeVar("T")
 
-# TODO: Add LRU caching for soup (Note that this caching is per worker, so chunking is needed)
 OMISSION = "—"
 
+# Headings of the learnset tables and the MoveComponent field each one fills
+MOVE_CATEGORIES = {
+    "Moves learnt by level up": "learned_moves",
+    "Moves learnt by TM": "tm_moves",
+    "Egg moves": "egg_moves",
+    "Moves learnt by TR": "tr_moves",
+    "Move Tutor moves": "tutor_moves",
+    "Transfer-only moves": "transfer_moves",
+    "Moves learnt on evolution": "evolution_moves",
+}
+# Categories whose rows start with a level or machine number
+NUMBERED_MOVE_CATEGORIES = {"learned_moves", "tm_moves", "tr_moves"}
+
+
+def _variant_key(variant: str) -> str:
+    """Normalizes a variant name so that tab labels and pokedex names match
+
+    >>> _variant_key(" Flabébé ")
+    'FLABEBE'
+    """
+    return normalize_unicode(variant.strip()).upper()
+
 
-def _index_from_tablist(tablist_html: Tag, variant: VariantId) -> int:
-    """Determines what index the variant's information is in and returns the id of
-    the corresponding internal link
+def _variant_tabs(tablist_html: Tag) -> Dict[str, Tuple[str, str]]:
+    """Maps the normalized name of every variant in the tablist to its label and
+    the id of the corresponding internal link
 
     >>> a = bs4.BeautifulSoup('''<div class="tabs-tab-list">
     ... <a class="tabs-tab active" href="#tab-basic-244">Entei</a>
     ... </div>''', 'lxml')
-    >>> _index_from_tablist(a, "Entei")
-    '#tab-basic-244'
+    >>> _variant_tabs(a)
+    {'ENTEI': ('Entei', '#tab-basic-244')}
     >>> a = bs4.BeautifulSoup('''<div class="tabs-tab-list">
     ...   <a class="tabs-tab active" href="#tab-basic-3">
     ...    Venusaur
@@ -44,15 +69,16 @@ def _index_from_tablist(tablist_html: Tag, variant: VariantId) -> int:
     ...    Mega Venusaur
     ...   </a>
     ...  </div>''', 'lxml')
-    >>> _index_from_tablist(a, "Venusaur")
-    '#tab-basic-3'
-    >>> _index_from_tablist(a, "Mega Venusaur")
-    '#tab-basic-11001'
+    >>> _variant_tabs(a)["VENUSAUR"]
+    ('Venusaur', '#tab-basic-3')
+    >>> _variant_tabs(a)["MEGA VENUSAUR"]
+    ('Mega Venusaur', '#tab-basic-11001')
     """
-    tablist = tablist_html.select("a.tabs-tab")
-    variants = [normalize_unicode(i.string).strip().upper() for i in tablist]
-    index = variants.index(normalize_unicode(variant.strip()).upper())
-    return tablist[index]["href"]
+    tabs: Dict[str, Tuple[str, str]] = {}
+    for tab in tablist_html.select("a.tabs-tab"):
+        label = normalize_unicode(tab.string).strip()
+        tabs.setdefault(_variant_key(label), (label, tab["href"]))
+    return tabs
 
 
 def _determine_gender_rate(raw_str: str):
@@ -82,36 +108,103 @@ def _determine_gender_rate(raw_str: str):
     return float(match.group())
 
 
-def _select_move_tab(moves_html: Tag):
-    """Selects the move tab with the most categories"""
-    fragments = [i["href"] for i in moves_html.select("div.tabs-tab-list > a")]
-    generation_select = [moves_html.select(f"{frag} h3") for frag in fragments]
-    return max(zip(generation_select, fragments), key=lambda x: len(x[0]))
+def _normalize_label(text: str) -> str:
+    """Normalizes the text of a heading or table header for lookups
+
+    >>> _normalize_label(" National  № ")
+    'national no'
+    >>> _normalize_label("Pokédex data")
+    'pokedex data'
+    """
+    return " ".join(normalize_unicode(text).split()).casefold()
+
+
+class VitalsTable:
+    """Maps the normalized th labels of a vitals table to their td cells. The
+    rows are read once, so that every field is a dictionary lookup instead of
+    a :contains selector that rescans the table.
+
+    >>> table = bs4.BeautifulSoup('''<table class="vitals-table"><tbody>
+    ... <tr><th>National №</th><td><strong>0133</strong></td></tr>
+    ... <tr><th>EV yield</th><td>1 Special Defense</td></tr>
+    ... </tbody></table>''', 'lxml').table
+    >>> vitals = VitalsTable(table)
+    >>> vitals.cell("National №").strong.string
+    '0133'
+    >>> vitals.cell("EV").string
+    '1 Special Defense'
+    >>> vitals.cell("Catch rate") is None
+    True
+    """
+
+    def __init__(self, table: Optional[Tag]):
+        self.cells: Dict[str, Tag] = {}
+        if table is None:
+            return
+
+        for row in table.find_all("tr"):
+            header = row.find("th")
+            cell = header.find_next_sibling("td") if header is not None else None
+            if cell is not None:
+                self.cells.setdefault(_normalize_label(header.get_text()), cell)
+
+    def cell(self, label: str) -> Optional[Tag]:
+        """Finds the cell of the row with the label. A label that is not a full
+        header matches the first header that contains it."""
+        key = _normalize_label(label)
+        found = self.cells.get(key)
+        if found is None:
+            found = next((v for k, v in self.cells.items() if key in k), None)
+        return found
+
+
+class VitalsIndex:
+    """Indexes the vitals tables of a basics tab by the h2 heading above them
+
+    >>> tab = bs4.BeautifulSoup('''<div>
+    ... <h2>Pokédex data</h2><table class="vitals-table"><tbody>
+    ... <tr><th>Species</th><td>Evolution Pokémon</td></tr></tbody></table>
+    ... <h2>Training</h2><table class="vitals-table"><tbody>
+    ... <tr><th>Base Exp.</th><td>65</td></tr></tbody></table>
+    ... </div>''', 'lxml')
+    >>> vitals = VitalsIndex(tab)
+    >>> vitals.table("Pokédex data").cell("Species").string
+    'Evolution Pokémon'
+    >>> vitals.table("Breeding").cells
+    {}
+    """
+
+    def __init__(self, basics_html: Tag):
+        self.tables: Dict[str, VitalsTable] = {}
+        for table in basics_html.find_all(class_="vitals-table"):
+            heading = table.find_previous_sibling(True)
+            if heading is not None and heading.name == "h2":
+                key = _normalize_label(heading.get_text())
+                self.tables.setdefault(key, VitalsTable(table))
+
+    def table(self, heading: str) -> VitalsTable:
+        """The table under the heading, or an empty one if there is none"""
+        return self.tables.get(_normalize_label(heading), VitalsTable(None))
 
 
 class DexEntrySubpage:
     """Wrapper class for containing dex entry information"""
 
-    def __init__(self, basics_html: Tag, flavor_html: Tag):
-        initial_filter = "h2:contains('Pokédex data') + .vitals-table"
-        self.table = basics_html.select_one(initial_filter)
+    def __init__(self, vitals: VitalsIndex, flavor_html: Tag):
+        self.table = vitals.table("Pokédex data")
         self.flavor_html = flavor_html
 
     @cached_property
     def national_dex_num(self) -> int:
-        return int(
-            self.table.select_one("th:contains('National') + td > strong").string
-        )
+        return int(self.table.cell("National №").strong.string)
 
     @cached_property
     def kind(self) -> str:
-        return str(self.table.select_one("th:contains('Species') + td").string)
+        return str(self.table.cell("Species").string)
 
     @cached_property
     def height(self) -> float:
-        height_str = str(
-            self.table.select_one("th:contains('Height') + td").string
-        ).strip()
+        height_str = str(self.table.cell("Height").string).strip()
         if height_str != OMISSION:
             return float(height_str.split()[0])
         else:
@@ -119,9 +212,7 @@ class DexEntrySubpage:
 
     @cached_property
     def weight(self) -> float:
-        weight_str = str(
-            self.table.select_one("th:contains('Weight') + td").string
-        ).strip()
+        weight_str = str(self.table.cell("Weight").string).strip()
         if weight_str != OMISSION:
             return float(weight_str.split()[0])
         else:
@@ -129,21 +220,15 @@ class DexEntrySubpage:
 
     @cached_property
     def abilities(self) -> List[str]:
-        return [
-            str(i.string)
-            for i in self.table.select("th:contains('Abilities') + td > span > a")
-        ]
+        return [str(i.string) for i in self.table.cell("Abilities").select("span > a")]
 
     @cached_property
     def hidden_abilities(self) -> List[str]:
-        return [
-            str(i.string)
-            for i in self.table.select("th:contains('Abilities') + td > small > a")
-        ]
+        return [str(i.string) for i in self.table.cell("Abilities").select("small > a")]
 
     @cached_property
     def regional_dex_nums(self) -> Dict[str, int]:
-        raw_nums: Tag = self.table.select_one("th:contains('Local') + td")
+        raw_nums: Optional[Tag] = self.table.cell("Local №")
         NavigableString = bs4.element.NavigableString
 
         if raw_nums is None or raw_nums.string == OMISSION:
@@ -186,14 +271,12 @@ class DexEntrySubpage:
 
 
 class BreedingSubpage:
-    def __init__(self, basics_html):
-        initial_filter = "h2:contains('Breeding') + .vitals-table"
-        self.table = basics_html.select_one(initial_filter)
+    def __init__(self, vitals: VitalsIndex):
+        self.table = vitals.table("Breeding")
 
     @cached_property
     def egg_groups(self) -> List[EggGroup]:
-        egg_group_filter = "tr > th:contains('Egg Groups') + td"
-        egg_group_string = str(self.table.select_one(egg_group_filter).text).strip()
+        egg_group_string = str(self.table.cell("Egg Groups").text).strip()
 
         if egg_group_string == OMISSION:
             return []
@@ -205,16 +288,12 @@ class BreedingSubpage:
 
     @cached_property
     def male_rate(self) -> float:
-        gender_dist_filter = "tr > th:contains('Gender') + td"
-        gender_rate_string = str(self.table.select_one(gender_dist_filter).text)
+        gender_rate_string = str(self.table.cell("Gender").text)
         return _determine_gender_rate(gender_rate_string)
 
     @cached_property
     def egg_cycles(self) -> Optional[int]:
-        egg_cycles_filter = "tr > th:contains('Egg cycles') + td"
-        egg_cycles_string = str(
-            list(self.table.select_one(egg_cycles_filter).stripped_strings)[0]
-        )
+        egg_cycles_string = str(list(self.table.cell("Egg cycles").stripped_strings)[0])
         if egg_cycles_string == OMISSION:
             return None
         return int(egg_cycles_string)
@@ -245,32 +324,26 @@ class BreedingSubpage:
 
 
 class TrainingSubpage:
-    def __init__(self, basics_html):
-        initial_filter = "h2:contains('Training') + .vitals-table"
-        self.table = basics_html.select_one(initial_filter)
+    def __init__(self, vitals: VitalsIndex):
+        self.table = vitals.table("Training")
 
     @cached_property
     def effort_points(self) -> Optional[EffortValues]:
-        ev_yield_filter = "tr > th:contains('EV') + td"
-        return EffortValues.from_string(self.table.select_one(ev_yield_filter).string)
+        return EffortValues.from_string(self.table.cell("EV yield").string)
 
     @cached_property
     def catch_rate(self) -> Optional[int]:
-        catch_filter = "tr > th:contains('Catch') + td"
         catch_list = [
             i.strip()
-            for i in self.table.select_one(catch_filter).find_all(
-                text=True, recursive=False
-            )
+            for i in self.table.cell("Catch rate").find_all(text=True, recursive=False)
         ]
         return int(catch_list[0]) if catch_list[0] != OMISSION else None
 
     @cached_property
     def base_friendship(self) -> Optional[int]:
-        friendship_filter = "tr > th:contains('Friendship') + td"
         friendship_list = [
             i.strip()
-            for i in self.table.select_one(friendship_filter).find_all(
+            for i in self.table.cell("Base Friendship").find_all(
                 text=True, recursive=False
             )
         ]
@@ -278,14 +351,12 @@ class TrainingSubpage:
 
     @cached_property
     def base_exp_yield(self) -> Optional[int]:
-        base_exp_filter = "tbody > tr > th:contains('Base Exp.') + td"
-        base_exp = str(self.table.select_one(base_exp_filter).string)
+        base_exp = str(self.table.cell("Base Exp.").string)
         return int(base_exp) if base_exp != OMISSION else None
 
     @cached_property
     def leveling_rate(self) -> LevelingRate:
-        level_filter = "tbody > tr > th:contains('Growth Rate') + td"
-        level_rate = self.table.select_one(level_filter).string.replace(" ", "").strip()
+        level_rate = self.table.cell("Growth Rate").string.replace(" ", "").strip()
         return (
             LevelingRate[level_rate] if level_rate != OMISSION else LevelingRate.INVALID
         )
@@ -301,52 +372,151 @@ class TrainingSubpage:
         return TrainingComponent(**dex_params)
 
 
-class SpeciesPage:
-    def __init__(self, species: str, path: Path):
-        self.species = species
-        self._soup: bs4.BeautifulSoup = bs4.BeautifulSoup(path.read_text(), "lxml")
+class SectionStrainer(bs4.SoupStrainer):
+    """Keeps the children of the `scope` tag of a document for which the
+    predicate holds, given the tag name and its raw attributes, together with
+    their contents. Matches nested in a dropped tag are dropped along with it,
+    so that every kept tag is next to the same siblings as in the document.
+    Text outside of the kept tags is dropped.
 
-        for linebreak in self._soup.find_all("br"):
-            linebreak.extract()
+    The strainer follows the open tags of a single parse by a SectionSoup."""
 
-    @cached_property
-    def dex_basics(self) -> Tag:
-        return self._soup.select_one(".tabset-basics")
+    def __init__(
+        self, predicate: Callable[[str, Dict[str, Any]], bool], scope: str = "main"
+    ):
+        super().__init__()
+        self.predicate = predicate
+        self.scope = scope
+        self._open: List[str] = []
 
-    @cached_property
-    def moves_html(self) -> Tag:
-        return self._soup.select_one(".tabset-moves-game.tabs-wrapper")
+    def _allow(self, name: str, attrs: Dict[str, Any]) -> bool:
+        parent = self._open[-1] if self._open else None
+        self._open.append(name)
+        return parent == self.scope and self.predicate(name, attrs or {})
 
-    def flavor_html(self, variant) -> Tag:
-        flavor_html = self._soup.select_one(
-            f'main h3:contains("{variant}") + div.resp-scroll > table > tbody'
-        )
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        # Called while parsing by BeautifulSoup before 4.13
+        return self._allow(markup_name, markup_attrs)
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return self._allow(name, attrs)
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    def close_tag(self) -> None:
+        """Called at the end of every tag that was offered to the strainer"""
+        self._open.pop()
+
+
+class SectionSoup(bs4.BeautifulSoup):
+    """Parses the sections of a document that a SectionStrainer keeps"""
+
+    def __init__(self, markup: str, strainer: SectionStrainer):
+        super().__init__(markup, "lxml", parse_only=strainer)
+
+    def handle_endtag(self, name, nsprefix=None):
+        # Only the tags outside of any kept tag, and the kept tags themselves,
+        # were offered to the strainer
+        if len(self.tagStack) <= 2:
+            self.parse_only.close_tag()
+        super().handle_endtag(name, nsprefix)
+
+
+# Classes of the species page sections that SpeciesPage reads
+SPECIES_SECTION_CLASSES = frozenset(
+    {"tabset-basics", "tabset-moves-game", "resp-scroll"}
+)
+
+
+def _is_species_section(name: str, attrs: Dict[str, Any]) -> bool:
+    """Matches the parts of a species page that are read: the basics and moves
+    tabsets, and the headings and tables that the Pokédex entries are in.
+    Paragraphs are kept as well, so that a heading does not end up next to a
+    table that it was not next to in the page.
+
+    >>> _is_species_section("div", {"class": "tabset-basics tabs-wrapper"})
+    True
+    >>> _is_species_section("nav", {"class": "navbar"})
+    False
+    """
+    classes = attrs.get("class", "")
+    if isinstance(classes, str):
+        classes = classes.split()
+    return name in ("h2", "h3", "p") or not SPECIES_SECTION_CLASSES.isdisjoint(classes)
+
+
+def _entry_table(tag: Optional[Tag]) -> Optional[Tag]:
+    """The body of the table in a div.resp-scroll"""
+    if tag is None or tag.name != "div" or "resp-scroll" not in tag.get("class", []):
+        return None
+    table = tag.find("table", recursive=False)
+    return table.find("tbody", recursive=False) if table is not None else None
+
+
+class EntryIndex(Generic[T]):
+    """Pokédex entry tables of a species page, indexed by the normalized text of
+    the h2 or h3 heading right above them. Headings are looked up exactly first,
+    and otherwise match the first heading that contains them.
+
+    >>> index = EntryIndex()
+    >>> index.add("h3", "Mega Venusaur", "mega")
+    >>> index.add("h3", "Venusaur", "base")
+    >>> index.lookup("h3", "Venusaur")
+    'base'
+    >>> index.lookup("h3", "Mega")
+    'mega'
+    >>> index.lookup("h2", "Pokédex entries") is None
+    True
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, Dict[str, T]] = {"h2": {}, "h3": {}}
+        # Tables after the h3 right below an h2, for forms without an own entry
+        self.unlisted: Dict[str, T] = {}
+
+    def add(self, level: str, heading: str, table: Optional[T]) -> None:
+        if table is not None:
+            self.tables[level].setdefault(_normalize_label(heading), table)
+
+    def add_unlisted(self, heading: str, table: Optional[T]) -> None:
+        if table is not None:
+            self.unlisted.setdefault(_normalize_label(heading), table)
+
+    @staticmethod
+    def _find(tables: Dict[str, T], heading: str) -> Optional[T]:
+        key = _normalize_label(heading)
+        found = tables.get(key)
+        if found is None:
+            found = next((v for k, v in tables.items() if key in k), None)
+        return found
+
+    def lookup(self, level: str, heading: str) -> Optional[T]:
+        return self._find(self.tables[level], heading)
+
+    def flavor(self, species: str, variant: VariantId) -> Optional[T]:
+        """Finds the dex entries of the variant, falling back to those of the
+        species, the default entries and finally those of an unlisted form"""
+        flavor_html = self.lookup("h3", variant)
 
         if flavor_html is None:
             logger.trace(
-                f"Variant {variant} of Species {self.species} does not have a dex entry"
-            )
-            flavor_html = self._soup.select_one(
-                f'main h3:contains("{self.species}") + div.resp-scroll > table > tbody'
+                f"Variant {variant} of Species {species} does not have a dex entry"
             )
+            flavor_html = self.lookup("h3", species)
 
         if flavor_html is None:
             logger.trace(
                 "Flavor text is not listed under species name, "
                 "so instead the default flavor text is being used."
             )
-            flavor_html = self._soup.select_one(
-                f"main h2:contains('Pokédex entries') + div.resp-scroll > table > tbody"
-            )
+            flavor_html = self.lookup("h2", "Pokédex entries")
 
         if flavor_html is None:
             logger.debug(
                 f"Species does not contain a dex entry. Using a unlisted form dex entry"
             )
-
-            flavor_html = self._soup.select_one(
-                f"main h2:contains('Pokédex entries') + h3 + div.resp-scroll > table > tbody"
-            )
+            flavor_html = self._find(self.unlisted, "Pokédex entries")
 
         if flavor_html is None:
             logger.error(f"Species does not contain a dex entry.")
@@ -354,6 +524,140 @@ class SpeciesPage:
         return flavor_html
 
 
+def _learnset_table(heading: Tag) -> Optional[Tag]:
+    """The table in the div.resp-scroll after the paragraph below the heading"""
+    paragraph = heading.find_next_sibling(True)
+    if paragraph is None or paragraph.name != "p":
+        return None
+    return _entry_table(paragraph.find_next_sibling(True))
+
+
+class Learnset:
+    """The learnset tables of one generation tab of a species page. The tab is
+    walked once, and every table row once, to fill all MoveComponent fields.
+
+    >>> tab = bs4.BeautifulSoup('''<div id="tab-moves-18">
+    ... <h3>Moves learnt by level up</h3><p></p><div class="resp-scroll"><table>
+    ... <thead><tr><th>Lv.</th><th>Move</th></tr></thead><tbody>
+    ... <tr><td class="cell-num">9</td><td class="cell-name">
+    ... <a class="ent-name">Vine Whip</a></td></tr>
+    ... <tr><td class="cell-num">1</td><td class="cell-name">
+    ... <a class="ent-name">Tackle</a></td></tr></tbody></table></div>
+    ... <h3>Egg moves</h3><p></p><div class="resp-scroll"><table><tbody>
+    ... <tr><td class="cell-name"><a class="ent-name">Curse</a></td></tr>
+    ... </tbody></table></div></div>''', 'lxml').div
+    >>> learnset = Learnset(tab)
+    >>> learnset.headings
+    2
+    >>> learnset.moves["learned_moves"]
+    [(1, 'Tackle'), (9, 'Vine Whip')]
+    >>> learnset.move_component().egg_moves
+    ['Curse']
+    """
+
+    def __init__(self, tab: Tag):
+        self.headings = 0
+        self.moves: Dict[str, List[Any]] = {}
+
+        for heading in tab.find_all("h3"):
+            self.headings += 1
+            category = MOVE_CATEGORIES.get(str(heading.string))
+            if category is None:
+                continue
+            table = _learnset_table(heading)
+            self.moves[category] = (
+                sorted(Learnset._rows(table, category in NUMBERED_MOVE_CATEGORIES))
+                if table is not None
+                else []
+            )
+
+    @staticmethod
+    def _rows(table: Tag, numbered: bool) -> List[Any]:
+        rows = []
+        for row in table.find_all("tr", recursive=False):
+            name = row.find("a", class_="ent-name")
+            if name is None:
+                continue
+            if not numbered:
+                rows.append(str(name.string))
+                continue
+            number = row.find("td", recursive=False)
+            if number is not None and "cell-num" in number.get("class", []):
+                rows.append((int(number.get_text()), str(name.string)))
+        return rows
+
+    def move_component(self) -> MoveComponent:
+        return MoveComponent(**{key: list(moves) for key, moves in self.moves.items()})
+
+
+class SpeciesPage:
+    def __init__(self, species: str, path: Path):
+        self.species = species
+        self._soup: bs4.BeautifulSoup = SectionSoup(
+            read_page(path), SectionStrainer(_is_species_section)
+        )
+
+        for linebreak in self._soup.find_all("br"):
+            linebreak.extract()
+
+    @cached_property
+    def dex_basics(self) -> Tag:
+        return self._soup.select_one(".tabset-basics")
+
+    @cached_property
+    def moves_html(self) -> Tag:
+        return self._soup.select_one(".tabset-moves-game.tabs-wrapper")
+
+    @cached_property
+    def variant_tabs(self) -> Dict[str, Tuple[str, str]]:
+        return _variant_tabs(self.dex_basics.select_one("div.tabs-tab-list"))
+
+    @property
+    def variant_names(self) -> List[str]:
+        return [label for label, _ in self.variant_tabs.values()]
+
+    def close(self) -> None:
+        """Frees the parse tree once every component has been extracted"""
+        self._soup.decompose()
+
+    @cached_property
+    def learnsets(self) -> Dict[str, Learnset]:
+        """The learnset of every generation tab, keyed by the tab label"""
+        learnsets = {}
+        for anchor in self.moves_html.select("div.tabs-tab-list > a"):
+            tab = self.moves_html.find(id=anchor["href"][1:])
+            if tab is not None:
+                learnsets[anchor.get_text(strip=True)] = Learnset(tab)
+        return learnsets
+
+    @cached_property
+    def learnset(self) -> Learnset:
+        """The learnset of the generation with the most learnset categories"""
+        return max(self.learnsets.values(), key=lambda learnset: learnset.headings)
+
+    @cached_property
+    def entry_index(self) -> "EntryIndex":
+        index = EntryIndex()
+        for heading in self._soup.find_all(["h2", "h3"]):
+            following = heading.find_next_sibling(True)
+            table = _entry_table(following)
+            if table is None and heading.name == "h2" and following is not None:
+                if following.name == "h3":
+                    index.add_unlisted(
+                        heading.get_text(),
+                        _entry_table(following.find_next_sibling(True)),
+                    )
+                continue
+            index.add(heading.name, heading.get_text(), table)
+        return index
+
+    def flavor_html(self, variant) -> Tag:
+        return self.entry_index.flavor(self.species, variant)
+
+    def variant(self, variant: VariantId) -> "VariantSubpage":
+        return VariantSubpage(variant, self)
+
+
 class VariantSubpage:
     def __init__(self, variant: str, parent: SpeciesPage):
         self.variant = variant if variant is not None else parent.species
@@ -363,100 +667,107 @@ class VariantSubpage:
     def flavor_text_html(self) -> Tag:
         return self.parent.flavor_html(self.variant)
 
-    @cached_property
-    def _dex_basics_tablist(self) -> Tag:
-        return self.parent.dex_basics.select_one("div.tabs-tab-list")
-
     @cached_property
     def variant_basics_html(self) -> Tag:
         """Generate dex basics from scraped html"""
-        index = _index_from_tablist(self._dex_basics_tablist, self.variant)
-        # Select correct tab
-        variant_basics = self.parent.dex_basics.select_one(index)
-        return variant_basics
+        tab = self.parent.variant_tabs.get(_variant_key(self.variant))
+        if tab is None:
+            raise ValueError(
+                f"{self.variant} is not a variant of {self.parent.species}"
+            )
+        return self.parent.dex_basics.select_one(tab[1])
+
+    @cached_property
+    def vitals(self) -> VitalsIndex:
+        """Vitals tables of the variant's tab, indexed once for all subpages"""
+        return VitalsIndex(self.variant_basics_html)
 
     @cached_property
     def dex_entry(self) -> DexEntryComponent:
-        return DexEntrySubpage(
-            self.variant_basics_html, self.flavor_text_html
-        ).dex_entry_component
+        return DexEntrySubpage(self.vitals, self.flavor_text_html).dex_entry_component
 
     @cached_property
     def breeding(self) -> BreedingComponent:
-        return BreedingSubpage(self.variant_basics_html).breeding_component
+        return BreedingSubpage(self.vitals).breeding_component
 
     @cached_property
     def training(self) -> TrainingComponent:
-        return TrainingSubpage(self.variant_basics_html).training_component
+        return TrainingSubpage(self.vitals).training_component
 
     @cached_property
     def moves(self) -> MoveComponent:
-        key_mapping = {
-            "Moves learnt by level up": "learned_moves",
-            "Moves learnt by TM": "tm_moves",
-            "Egg moves": "egg_moves",
-            "Moves learnt by TR": "tr_moves",
-            "Move Tutor moves": "tutor_moves",
-            "Transfer-only moves": "transfer_moves",
-            "Moves learnt on evolution": "evolution_moves",
-        }
-
-        def sorted_moves(move_list):
-            if move_list is None:
-                return []
-            return sorted([str(i.string) for i in move_list.select("a.ent-name")])
-
-        def technical_extract(move_list):
-            if move_list is None:
-                return []
-            pairs = zip(
-                move_list.select("td.cell-num > a"), move_list.select("a.ent-name")
-            )
-            return sorted([(int(i.string), str(j.string)) for (i, j) in pairs])
-
-        def number_extract(move_list):
-            if move_list is None:
-                return []
-            pairs = zip(
-                move_list.select("td.cell-num:first-child"),
-                move_list.select("a.ent-name"),
-            )
-            return sorted([(int(i.string), str(j.string)) for (i, j) in pairs])
-
-        TRANSFORM_MAPPING = {
-            "learned_moves": number_extract,
-            "tm_moves": technical_extract,
-            "egg_moves": sorted_moves,
-            "tr_moves": technical_extract,
-            "tutor_moves": sorted_moves,
-            "transfer_moves": sorted_moves,
-            "evolution_moves": sorted_moves,
-        }
-
-        move_anchors, href = _select_move_tab(self.parent.moves_html)
-        keys = [
-            key_mapping[str(i.string)]
-            for i in move_anchors
-            if i.string in key_mapping.keys()
-        ]
-        move_tables = [
-            self.parent.moves_html.select_one(
-                href + f" h3:contains('{str(i.string)}') + p + div.resp-scroll"
-            )
-            for i in move_anchors
-            if i.string in key_mapping.keys()
-            # i.findNext("div") for i in move_anchors if i.string in key_mapping.keys()
-        ]
-
-        moves = {i: TRANSFORM_MAPPING[i](j) for (i, j) in zip(keys, move_tables)}
-
-        return MoveComponent(**moves)
-
-
-@lru_cache
-def get_species_page(species: str, url: str):
+        return self.parent.learnset.move_component()
+
+
+def species_page_class(parser: str = SPECIES_PARSER):
+    """The species page implementation of the parser selected by the config"""
+    if parser == "soup":
+        return SpeciesPage
+    if parser == "lxml":
+        from src.scraper.species_lxml import LxmlSpeciesPage
+
+        return LxmlSpeciesPage
+    raise ValueError(f"Unknown species page parser {parser}")
+
+
+@add_slots
+@dataclass
+class VariantRecord:
+    """The components of one variant, extracted from its species page"""
+
+    dex_entry: DexEntryComponent
+    breeding: BreedingComponent
+    training: TrainingComponent
+    moves: MoveComponent
+
+
+@dataclass
+class SpeciesRecord:
+    """Every variant of a species page, extracted in one go so that the parse
+    tree can be freed before the variants are used"""
+
+    species: SpeciesId
+    variants: Dict[str, VariantRecord] = field(default_factory=dict)
+    failures: Dict[str, Exception] = field(default_factory=dict)
+
+    def variant(self, variant: Optional[VariantId]) -> VariantRecord:
+        key = _variant_key(variant if variant is not None else self.species)
+        if key in self.failures:
+            raise self.failures[key]
+        if key not in self.variants:
+            raise ValueError(f"{variant} is not a variant of {self.species}")
+        return self.variants[key]
+
+
+def extract_species_record(species: SpeciesId, page) -> SpeciesRecord:
+    """Extracts the components of every variant on the page and frees the page"""
+    record = SpeciesRecord(species)
+    try:
+        for name in page.variant_names:
+            key = _variant_key(name)
+            try:
+                variant_page = page.variant(name)
+                record.variants[key] = VariantRecord(
+                    variant_page.dex_entry,
+                    variant_page.breeding,
+                    variant_page.training,
+                    variant_page.moves,
+                )
+            except Exception as err:
+                # Only the variants that are asked for should fail
+                logger.debug(f"Could not extract {name} of {species}: {err}")
+                record.failures[key] = err.with_traceback(None)
+    finally:
+        page.close()
+    return record
+
+
+@lru_cache(maxsize=SPECIES_RECORD_CACHE_SIZE)
+def get_species_record(species: SpeciesId, url: str) -> SpeciesRecord:
+    """The extracted record of a species page. Only the records of the last few
+    species are kept, since the variants of a species are scraped together."""
     path = request_pokeurl_pokemondb(url)
-    return SpeciesPage(species, path)
+    return extract_species_record(species, species_page_class()(species, path))
 
 
 def create_species(
@@ -467,8 +778,7 @@ def create_species(
     url: str,
 ) -> Species:
     """Create full species information"""
-    species_page = get_species_page(species, url)
-    variant_page = VariantSubpage(variant, species_page)
+    variant_record = get_species_record(species, url).variant(variant)
 
     species_info: Dict[str, Any] = {"species_name": species, "variant_name": species}
 
@@ -477,10 +787,10 @@ def create_species(
     species_info["base_stats"] = stats
     species_info["types"] = typing
 
-    species_info["dex_entry"] = variant_page.dex_entry
-    species_info["move_info"] = variant_page.moves
-    species_info["training_info"] = variant_page.training
-    species_info["breeding_info"] = variant_page.breeding
+    species_info["dex_entry"] = variant_record.dex_entry
+    species_info["move_info"] = variant_record.moves
+    species_info["training_info"] = variant_record.training
+    species_info["breeding_info"] = variant_record.breeding
 
     return Species(**species_info)
 
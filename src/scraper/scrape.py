@@ -7,6 +7,7 @@ from loguru import logger
 from src.data.typing import SpeciesId, VariantId
 from src.gather_files import request_pokeurl_pokemondb
 from src.scraper.ability import scrape_abilities
+from src.scraper.frontier import prefetch_frontier
 from src.scraper.pmove import scrape_moves
 from src.scraper.pokedex import scrape_pokedex
 from src.scraper.pokemon import create_species
@@ -19,6 +20,7 @@ def _create_species_wrapper(args):
 
 def generate_all_pokemon():
     """Completey scrape all supported information and compose them together"""
+    prefetch_frontier()
     species, variants, typing, stats, urls = scrape_pokedex()
 
     try:
@@ -0,0 +1,467 @@
+"""Species page parser working directly on lxml trees with precompiled XPath.
+
+This is a faster alternative to the BeautifulSoup based SpeciesPage that skips
+building a soup and running soupsieve selectors. It produces the same
+components, which compare_species_parsers checks over the cached pages.
+Select it with SPECIES_PARSER = "lxml" in the config."""
+
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import lxml.html
+from loguru import logger
+from lxml import etree
+
+from src.config import SPECIES_POKEDB_DIR
+from src.data.poke_enums import EggGroup, LevelingRate
+from src.data.species import (
+    REGIONAL_TEXT_MAPPING,
+    BreedingComponent,
+    DexEntryComponent,
+    MoveComponent,
+    TrainingComponent,
+)
+from src.data.stats import EffortValues
+from src.data.typing import VariantId
+from src.gather_files import read_page_bytes
+from src.scraper.pokemon import (
+    MOVE_CATEGORIES,
+    NUMBERED_MOVE_CATEGORIES,
+    OMISSION,
+    SPECIES_SECTION_CLASSES,
+    EntryIndex,
+    SpeciesPage,
+    _determine_gender_rate,
+    _normalize_label,
+    _variant_key,
+    species_page_class,
+)
+from src.utils.general import normalize_unicode
+
+Element = lxml.html.HtmlElement
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate matching elements with the class, like .name in CSS
+
+    >>> _has_class("resp-scroll")
+    "contains(concat(' ', normalize-space(@class), ' '), ' resp-scroll ')"
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+_DEX_BASICS = etree.XPath(f"(//*[{_has_class('tabset-basics')}])[1]")
+_MOVES_HTML = etree.XPath(
+    f"(//*[{_has_class('tabset-moves-game')} and {_has_class('tabs-wrapper')}])[1]"
+)
+_TABLIST = etree.XPath(
+    f"(.//div[{_has_class('tabs-tab-list')}])[1]//a[{_has_class('tabs-tab')}]"
+)
+_MOVE_TABLIST = etree.XPath(f".//div[{_has_class('tabs-tab-list')}]/a")
+_BY_ID = etree.XPath("(.//*[@id = $id])[1]")
+_VITALS_TABLES = etree.XPath(
+    f".//*[{_has_class('vitals-table')}][preceding-sibling::*[1][self::h2]]"
+)
+_HEADING = etree.XPath("preceding-sibling::*[1]")
+_ROWS = etree.XPath(".//tr")
+_HEADER = etree.XPath("(.//th)[1]")
+_HEADER_CELL = etree.XPath("following-sibling::td[1]")
+_ABILITIES = etree.XPath(".//span/a")
+_HIDDEN_ABILITIES = etree.XPath(".//small/a")
+_OWN_TEXT = etree.XPath("text()")
+_CELLS = etree.XPath(".//td")
+
+# The headings that the strainer of SpeciesPage keeps: the children of main and
+# the headings inside its kept sections
+_SECTIONS = " or ".join(_has_class(name) for name in sorted(SPECIES_SECTION_CLASSES))
+_ENTRY_HEADINGS = etree.XPath(
+    "//main/*[self::h2 or self::h3] | "
+    f"//main/*[self::p or {_SECTIONS}]//*[self::h2 or self::h3]"
+)
+# The soup parser drops every br, so they are skipped when walking siblings
+_NEXT_SIBLING = etree.XPath("following-sibling::*[not(self::br)][1]")
+_ENTRY_TABLE = etree.XPath(f"self::div[{_has_class('resp-scroll')}]/table/tbody")
+
+_TAB_HEADINGS = etree.XPath(".//h3")
+_TABLE_ROWS = etree.XPath("tr")
+_MOVE_NAME = etree.XPath(f"(.//a[{_has_class('ent-name')}])[1]")
+_MOVE_NUMBER = etree.XPath(f"td[1][{_has_class('cell-num')}]")
+
+
+def _string(element: Element) -> Optional[str]:
+    """The text of an element whose only content is text, or of its only child.
+    Mirrors Tag.string of BeautifulSoup on a soup with the line breaks removed.
+
+    >>> _string(lxml.html.fromstring("<td><strong>003</strong><br></td>"))
+    '003'
+    >>> _string(lxml.html.fromstring("<td>45 <small>(5.9%)</small></td>")) is None
+    True
+    """
+    nodes: List[Any] = [element.text] if element.text else []
+    for child in element:
+        if child.tag != "br":
+            nodes.append(child)
+        if child.tail:
+            nodes.append(child.tail)
+
+    if len(nodes) != 1:
+        return None
+    return nodes[0] if isinstance(nodes[0], str) else _string(nodes[0])
+
+
+def _stripped_strings(element: Element) -> List[str]:
+    return [text.strip() for text in element.itertext() if text.strip()]
+
+
+def _first(found: List[Element]) -> Optional[Element]:
+    return found[0] if found else None
+
+
+class LxmlVitalsTable:
+    """Maps the normalized th labels of a vitals table to their td cells"""
+
+    def __init__(self, table: Optional[Element]):
+        self.cells: Dict[str, Element] = {}
+        if table is None:
+            return
+
+        for row in _ROWS(table):
+            headers = _HEADER(row)
+            cells = _HEADER_CELL(headers[0]) if headers else []
+            if cells:
+                label = _normalize_label(headers[0].text_content())
+                self.cells.setdefault(label, cells[0])
+
+    def cell(self, label: str) -> Optional[Element]:
+        key = _normalize_label(label)
+        found = self.cells.get(key)
+        if found is None:
+            found = next((v for k, v in self.cells.items() if key in k), None)
+        return found
+
+
+class LxmlVariantPage:
+    """Builds the components of a single variant from its basics tab"""
+
+    def __init__(self, variant: VariantId, parent: "LxmlSpeciesPage"):
+        self.variant = variant if variant is not None else parent.species
+        self.parent = parent
+
+    @cached_property
+    def variant_basics_html(self) -> Element:
+        tab = self.parent.variant_tabs.get(_variant_key(self.variant))
+        if tab is None:
+            raise ValueError(
+                f"{self.variant} is not a variant of {self.parent.species}"
+            )
+        return _BY_ID(self.parent.dex_basics, id=tab[1][1:])[0]
+
+    @cached_property
+    def vitals(self) -> Dict[str, LxmlVitalsTable]:
+        tables: Dict[str, LxmlVitalsTable] = {}
+        for table in _VITALS_TABLES(self.variant_basics_html):
+            heading = _normalize_label(_HEADING(table)[0].text_content())
+            tables.setdefault(heading, LxmlVitalsTable(table))
+        return tables
+
+    def _table(self, heading: str) -> LxmlVitalsTable:
+        return self.vitals.get(_normalize_label(heading), LxmlVitalsTable(None))
+
+    @cached_property
+    def dex_entry(self) -> DexEntryComponent:
+        table = self._table("Pokédex data")
+        abilities = table.cell("Abilities")
+
+        def measure(label: str) -> float:
+            value = str(_string(table.cell(label))).strip()
+            return float(value.split()[0]) if value != OMISSION else float("nan")
+
+        flavor_html = self.parent.flavor_html(self.variant)
+
+        return DexEntryComponent(
+            national_dex_num=int(_string(table.cell("National №"))),
+            kind=str(_string(table.cell("Species"))),
+            height=measure("Height"),
+            weight=measure("Weight"),
+            abilities=[str(_string(a)) for a in _ABILITIES(abilities)],
+            hidden_abilities=[str(_string(a)) for a in _HIDDEN_ABILITIES(abilities)],
+            regional_dex_nums=self._regional_dex_nums(table.cell("Local №")),
+            flavor_text=str(_string(_CELLS(flavor_html)[-1])),
+        )
+
+    @staticmethod
+    def _regional_dex_nums(raw_nums: Optional[Element]) -> Dict[str, int]:
+        if raw_nums is None or _string(raw_nums) == OMISSION:
+            return {}
+        regions = [
+            REGIONAL_TEXT_MAPPING[str(_string(small))]
+            for small in raw_nums
+            if small.tag != "br"
+        ]
+        nums = [int(text.strip()) for text in _OWN_TEXT(raw_nums) if text.strip()]
+        return dict(zip(regions, nums))
+
+    @cached_property
+    def breeding(self) -> BreedingComponent:
+        table = self._table("Breeding")
+
+        egg_group_string = table.cell("Egg Groups").text_content().strip()
+        egg_groups = []
+        if egg_group_string != OMISSION:
+            egg_groups = [
+                EggGroup[i.strip().replace(" ", "").replace("-", "").title()]
+                for i in egg_group_string.split(",")
+            ]
+
+        egg_cycles_string = _stripped_strings(table.cell("Egg cycles"))[0]
+        egg_cycles = None if egg_cycles_string == OMISSION else int(egg_cycles_string)
+
+        return BreedingComponent(
+            egg_groups=egg_groups,
+            male_rate=_determine_gender_rate(table.cell("Gender").text_content()),
+            egg_cycles=egg_cycles,
+            steps_to_hatch_lower=(
+                (egg_cycles - 1) * 257 + 1 if egg_cycles is not None else None
+            ),
+            steps_to_hatch_upper=egg_cycles * 257 if egg_cycles is not None else None,
+        )
+
+    @cached_property
+    def training(self) -> TrainingComponent:
+        table = self._table("Training")
+
+        def leading_int(label: str) -> Optional[int]:
+            first = _OWN_TEXT(table.cell(label))[0].strip()
+            return int(first) if first != OMISSION else None
+
+        base_exp = str(_string(table.cell("Base Exp.")))
+        level_rate = _string(table.cell("Growth Rate")).replace(" ", "").strip()
+
+        return TrainingComponent(
+            effort_points=EffortValues.from_string(_string(table.cell("EV yield"))),
+            catch_rate=leading_int("Catch rate"),
+            base_friendship=leading_int("Base Friendship"),
+            base_exp_yield=int(base_exp) if base_exp != OMISSION else None,
+            leveling_rate=(
+                LevelingRate[level_rate]
+                if level_rate != OMISSION
+                else LevelingRate.INVALID
+            ),
+        )
+
+    @cached_property
+    def moves(self) -> MoveComponent:
+        return self.parent.learnset.move_component()
+
+
+def _learnset_table(heading: Element) -> Optional[Element]:
+    """The table in the div.resp-scroll after the paragraph below the heading"""
+    paragraph = _first(_NEXT_SIBLING(heading))
+    if paragraph is None or paragraph.tag != "p":
+        return None
+    following = _first(_NEXT_SIBLING(paragraph))
+    return _first(_ENTRY_TABLE(following)) if following is not None else None
+
+
+class LxmlLearnset:
+    """The learnset tables of one generation tab, read like Learnset does: the
+    headings are matched exactly, and every number is read from its own row."""
+
+    def __init__(self, tab: Element):
+        self.headings = 0
+        self.moves: Dict[str, List[Any]] = {}
+
+        for heading in _TAB_HEADINGS(tab):
+            self.headings += 1
+            category = MOVE_CATEGORIES.get(str(_string(heading)))
+            if category is None:
+                continue
+            table = _learnset_table(heading)
+            self.moves[category] = (
+                sorted(LxmlLearnset._rows(table, category in NUMBERED_MOVE_CATEGORIES))
+                if table is not None
+                else []
+            )
+
+    @staticmethod
+    def _rows(table: Element, numbered: bool) -> List[Any]:
+        rows = []
+        for row in _TABLE_ROWS(table):
+            name = _first(_MOVE_NAME(row))
+            if name is None:
+                continue
+            if not numbered:
+                rows.append(str(_string(name)))
+                continue
+            number = _first(_MOVE_NUMBER(row))
+            if number is not None:
+                rows.append((int(number.text_content()), str(_string(name))))
+        return rows
+
+    def move_component(self) -> MoveComponent:
+        return MoveComponent(**{key: list(moves) for key, moves in self.moves.items()})
+
+
+class LxmlSpeciesPage:
+    """A species page parsed into an lxml tree"""
+
+    def __init__(self, species: str, path: Path):
+        self.species = species
+        self._root: Element = lxml.html.fromstring(
+            read_page_bytes(path), parser=_PARSER
+        )
+
+    @cached_property
+    def dex_basics(self) -> Element:
+        return _DEX_BASICS(self._root)[0]
+
+    @cached_property
+    def moves_html(self) -> Element:
+        return _MOVES_HTML(self._root)[0]
+
+    @cached_property
+    def variant_tabs(self) -> Dict[str, Tuple[str, str]]:
+        tabs: Dict[str, Tuple[str, str]] = {}
+        for tab in _TABLIST(self.dex_basics):
+            label = normalize_unicode(_string(tab)).strip()
+            tabs.setdefault(_variant_key(label), (label, tab.get("href")))
+        return tabs
+
+    @property
+    def variant_names(self) -> List[str]:
+        return [label for label, _ in self.variant_tabs.values()]
+
+    def close(self) -> None:
+        """Drops the tree, which lxml frees as soon as nothing refers to it"""
+        self._root = None
+
+    @cached_property
+    def learnsets(self) -> Dict[str, LxmlLearnset]:
+        """The learnset of every generation tab, keyed by the tab label"""
+        learnsets = {}
+        for anchor in _MOVE_TABLIST(self.moves_html):
+            tab = _first(_BY_ID(self.moves_html, id=anchor.get("href")[1:]))
+            if tab is not None:
+                learnsets[anchor.text_content().strip()] = LxmlLearnset(tab)
+        return learnsets
+
+    @cached_property
+    def learnset(self) -> LxmlLearnset:
+        """The learnset of the generation with the most learnset categories"""
+        return max(self.learnsets.values(), key=lambda learnset: learnset.headings)
+
+    @cached_property
+    def entry_index(self) -> EntryIndex:
+        index = EntryIndex()
+        for heading in _ENTRY_HEADINGS(self._root):
+            following = _first(_NEXT_SIBLING(heading))
+            table = _first(_ENTRY_TABLE(following)) if following is not None else None
+            if table is None and heading.tag == "h2" and following is not None:
+                if following.tag == "h3":
+                    after = _first(_NEXT_SIBLING(following))
+                    if after is not None:
+                        index.add_unlisted(
+                            heading.text_content(), _first(_ENTRY_TABLE(after))
+                        )
+                continue
+            index.add(heading.tag, heading.text_content(), table)
+        return index
+
+    def flavor_html(self, variant: VariantId) -> Optional[Element]:
+        return self.entry_index.flavor(self.species, variant)
+
+    def variant(self, variant: VariantId) -> LxmlVariantPage:
+        return LxmlVariantPage(variant, self)
+
+
+@dataclass
+class ParserMismatch:
+    """A component on which the two species page parsers disagree. A parser
+    that raises gives an "error" mismatch holding its exception"""
+
+    species: str
+    variant: str
+    component: str
+    soup: Any
+    lxml: Any
+    url: str = ""
+
+
+COMPONENTS = ("dex_entry", "breeding", "training", "moves")
+PARSERS = ("soup", "lxml")
+
+
+def _error(
+    species: str, variant: VariantId, engine: str, err: Exception
+) -> ParserMismatch:
+    failure: Dict[str, Any] = {name: None for name in PARSERS}
+    failure[engine] = err
+    return ParserMismatch(species, variant, "error", **failure)
+
+
+def compare_species_pages(
+    species: str, variants: List[VariantId], path: Path
+) -> List[ParserMismatch]:
+    """Parses a species page with both parsers and lists every disagreement"""
+    mismatches = []
+    pages = {}
+    for engine in PARSERS:
+        try:
+            pages[engine] = species_page_class(engine)(species, path)
+        except FileNotFoundError:
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            logger.error(f"The {engine} parser failed on {path}: {err!r}")
+            mismatches += [
+                _error(species, variant, engine, err) for variant in variants
+            ]
+
+    for variant in variants:
+        parsed = {}
+        for engine, page in pages.items():
+            try:
+                subpage = page.variant(variant)
+                parsed[engine] = [getattr(subpage, part) for part in COMPONENTS]
+            except Exception as err:  # pylint: disable=broad-except
+                logger.error(f"The {engine} parser failed on {path}: {err!r}")
+                mismatches.append(_error(species, variant, engine, err))
+        if len(parsed) < len(PARSERS):
+            continue
+
+        for component, left, right in zip(COMPONENTS, parsed["soup"], parsed["lxml"]):
+            # repr treats nan as equal to itself, unlike ==
+            if repr(left) != repr(right):
+                mismatches.append(
+                    ParserMismatch(species, variant, component, left, right)
+                )
+
+    return mismatches
+
+
+def compare_species_parsers() -> List[ParserMismatch]:
+    """Golden comparison of the two parsers over every cached species page"""
+    from src.scraper.pokedex import scrape_pokedex
+
+    species, variants, _, _, urls = scrape_pokedex()
+    pages: Dict[str, Tuple[str, List[VariantId]]] = {}
+    for name, variant, url in zip(species, variants, urls):
+        pages.setdefault(url, (name, []))[1].append(variant)
+
+    mismatches = []
+    for url, (name, page_variants) in pages.items():
+        path = SPECIES_POKEDB_DIR / (url[len("/pokedex/") :] + ".html")
+        try:
+            page_mismatches = compare_species_pages(name, page_variants, path)
+        except FileNotFoundError:
+            logger.debug(f"Skipping {path} since it is not cached")
+            continue
+        for mismatch in page_mismatches:
+            mismatch.url = url
+        mismatches += page_mismatches
+
+    logger.info(f"The species page parsers disagree {len(mismatches)} times")
+    return mismatches
@@ -3,33 +3,22 @@ This does not mean that they use pure python functions, but instead are things l
 list operations that are fairly common."""
 
 import dataclasses
-import time
+import multiprocessing
 import unicodedata
 from collections import defaultdict
-from itertools import tee, zip_longest
-from typing import Any, DefaultDict, Dict, Generator, Iterable, List
-
-import networkx as nx
-
-
-def rate_limited(maxPerSecond):
-    minInterval = 1.0 / float(maxPerSecond)
-
-    def decorate(func):
-        lastTimeCalled = [0.0]
-
-        def rateLimitedFunction(*args, **kargs):
-            elapsed = time.perf_counter() - lastTimeCalled[0]
-            leftToWait = minInterval - elapsed
-            if leftToWait > 0:
-                time.sleep(leftToWait)
-            ret = func(*args, **kargs)
-            lastTimeCalled[0] = time.perf_counter()
-            return ret
-
-        return rateLimitedFunction
-
-    return decorate
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain, islice, tee, zip_longest
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
 
 
 def create_multimap(keys: Iterable, values: Iterable) -> DefaultDict[Any, List[Any]]:
@@ -84,6 +73,60 @@ def pairwise(iterable: Iterable) -> Iterable:
     return zip(elem1, elem2)
 
 
+class DisjointSet:
+    """Union-find over the integers 0..n-1 with path halving and union by size
+
+    >>> sets = DisjointSet(5)
+    >>> sets.union(0, 3) == sets.union(4, 3)
+    True
+    >>> sets.find(4) == sets.find(0), sets.find(1) == sets.find(0)
+    (True, False)
+    >>> sets.add()
+    5
+    >>> sets.groups()
+    [[0, 3, 4], [1], [2], [5]]
+    """
+
+    def __init__(self, size: int = 0):
+        self._parent = list(range(size))
+        self._size = [1] * size
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def add(self) -> int:
+        """Adds a new singleton set and returns its element"""
+        self._parent.append(len(self._parent))
+        self._size.append(1)
+        return len(self._parent) - 1
+
+    def find(self, elem: int) -> int:
+        parent = self._parent
+        while parent[elem] != elem:
+            parent[elem] = parent[parent[elem]]
+            elem = parent[elem]
+        return elem
+
+    def union(self, first: int, second: int) -> int:
+        """Merges the sets of both elements and returns the new representative"""
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return first
+        if self._size[first] < self._size[second]:
+            first, second = second, first
+        self._parent[second] = first
+        self._size[first] += self._size[second]
+        return first
+
+    def groups(self) -> List[List[int]]:
+        """Every set with its elements in ascending order. The sets are
+        ordered by their smallest element."""
+        groups: Dict[int, List[int]] = {}
+        for elem in range(len(self._parent)):
+            groups.setdefault(self.find(elem), []).append(elem)
+        return list(groups.values())
+
+
 def get_components(iterable: Iterable[Iterable]):
     """Expects a iterable of subiterables (representing subgraph vertices).
     All elements in the subgraph are expected to be hashable vertices. This
@@ -100,19 +143,22 @@ def get_components(iterable: Iterable[Iterable]):
     >>> a
     []
     """
+    ids: Dict[Any, int] = {}
+    sets = DisjointSet()
 
-    def to_graph(list_graph):
-        graph = nx.Graph()
-        for part in list_graph:
-            # each sublist is a bunch of nodes
-            graph.add_nodes_from(part)
-            # it also imlies a number of edges:
-            graph.add_edges_from(pairwise(part))
-        return graph
+    for part in iterable:
+        # each sublist is a bunch of nodes that are connected to each other
+        first = None
+        for vertex in part:
+            if vertex not in ids:
+                ids[vertex] = sets.add()
+            if first is None:
+                first = ids[vertex]
+            else:
+                sets.union(first, ids[vertex])
 
-    graph = to_graph(iterable)
-
-    return nx.connected_components(graph)
+    vertices = list(ids)
+    return ({vertices[i] for i in group} for group in sets.groups())
 
 
 def grouper(iterable: Iterable, num: int, fillvalue=None):
@@ -168,6 +214,38 @@ def xchunk_list(lst: List, num: int) -> Generator[List, None, None]:
         yield lst[i : i + num]
 
 
+def imap_unordered(
+    func: Callable, items: Iterable, processes: Optional[int] = None, chunksize=1
+) -> Iterator:
+    """Applies func to every item in a process pool and yields the results as
+    they finish. With a single process the items are mapped in order instead.
+    The items are consumed lazily, so one pool can be fed by a generator that
+    is still producing them. The pool forks this process, so no other thread
+    may be running when it is first iterated.
+    >>> sorted(imap_unordered(abs, [-2, 1, -3], processes=2))
+    [1, 2, 3]
+    >>> list(imap_unordered(abs, (i for i in [-2, 1, -3]), processes=1))
+    [2, 1, 3]"""
+    items = iter(items)
+    head = list(islice(items, 2))
+    if processes == 1 or len(head) <= 1:
+        yield from map(func, chain(head, items))
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(func, chain(head, items), chunksize)
+
+
+def run_in_background(func: Callable, *args, name: str = "background") -> Future:
+    """Runs func on its own worker thread
+    >>> run_in_background(sum, [1, 2, 3]).result()
+    6"""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+    future = executor.submit(func, *args)
+    executor.shutdown(wait=False)
+    return future
+
+
 def add_slots(cls):
     """Decorator for adding slots to a dataclass"""
     # Need to create a new class, since we can't set __slots__
@@ -0,0 +1,25 @@
+import pytest
+
+from src import gather_files
+from src.fetch.store import BlobPageStore, FilePageStore, PageStore
+from src.file_resource import ResourceManager
+
+
+def _isolate(store: PageStore, tmp_path, monkeypatch) -> PageStore:
+    resources = ResourceManager(store, db_path=tmp_path / "resources.sqlite3")
+    monkeypatch.setattr(gather_files, "_STORE", store)
+    monkeypatch.setattr(gather_files, "_RESOURCES", resources)
+    return store
+
+
+@pytest.fixture
+def file_cache(tmp_path, monkeypatch) -> FilePageStore:
+    """Reads and writes pages as plain files, tracked in a temporary database"""
+    return _isolate(FilePageStore(), tmp_path, monkeypatch)  # type: ignore
+
+
+@pytest.fixture
+def blob_cache(tmp_path, monkeypatch) -> BlobPageStore:
+    """Stores pages as blobs under the temporary directory"""
+    store = BlobPageStore(blob_dir=tmp_path / "blobs", root=tmp_path)
+    return _isolate(store, tmp_path, monkeypatch)  # type: ignore
@@ -0,0 +1,68 @@
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from src.data.evolution_family import EvolutionIndex
+
+ROOT = Path(__file__).parent.parent.parent
+EVOLUTIONS = ROOT / "evolutions.json"
+SCHEMA = ROOT / "sql" / "pokemon_tables.sql"
+
+
+@pytest.fixture(scope="module")
+def index():
+    return EvolutionIndex.from_trees(json.loads(EVOLUTIONS.read_text()))
+
+
+def test_every_pokemon_knows_its_family(index):
+    espeon = index[("Espeon", "Espeon")]
+    assert espeon.root == ("Eevee", "Eevee")
+    assert espeon.depth == 1
+    assert espeon.parent == ("Eevee", "Eevee")
+    assert espeon.methods == ("(high Friendship, Daytime)",)
+    assert len(index.family(("Espeon", "Espeon"))) == 9
+    assert index.family(("Eevee", "Eevee"))[0] == ("Eevee", "Eevee")
+
+
+def test_ancestors_and_descendants(index):
+    dustox = index[("Dustox", "Dustox")]
+    assert dustox.ancestors == (("Wurmple", "Wurmple"), ("Cascoon", "Cascoon"))
+    assert index[("Wurmple", "Wurmple")].descendants == (
+        ("Silcoon", "Silcoon"),
+        ("Beautifly", "Beautifly"),
+        ("Cascoon", "Cascoon"),
+        ("Dustox", "Dustox"),
+    )
+    assert index.is_ancestor(("Wurmple", "Wurmple"), ("Dustox", "Dustox"))
+    assert not index.is_ancestor(("Silcoon", "Silcoon"), ("Dustox", "Dustox"))
+    assert index.same_family(("Beautifly", "Beautifly"), ("Dustox", "Dustox"))
+    assert ("Ditto", "Ditto") not in index
+
+
+def test_index_round_trips_through_sql(index):
+    conn = sqlite3.connect(":memory:")
+    conn.cursor().executescript(SCHEMA.read_text())
+    index.write_to_sql(conn.cursor())
+    index.write_to_sql(conn.cursor())
+
+    stored = EvolutionIndex.read_from_sql(conn.cursor())
+    assert stored.families == index.families
+    assert stored.entries == index.entries
+
+    (distance,) = conn.execute(
+        """SELECT distance FROM EvolutionLineage
+        WHERE ancestor_species = 'Wurmple' AND descendant_species = 'Dustox'"""
+    ).fetchone()
+    assert distance == 2
+
+
+def test_pokemon_reached_twice_are_rejected():
+    trees = [
+        {"id": ["A", "A"], "children": [{"id": ["C", "C"], "methods": ["x"]}]},
+        {"id": ["B", "B"], "children": [{"id": ["C", "C"], "methods": ["y"]}]},
+    ]
+
+    with pytest.raises(ValueError, match=r"below \('A', 'A'\) and \('B', 'B'\)"):
+        EvolutionIndex.from_trees(trees)
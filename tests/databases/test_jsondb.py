@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.data.evolution_family import EvolutionIndex
+from src.databases.jsondb import EvolutionLines, index_path, write_evolution_lines
+
+EVOLUTIONS = Path(__file__).parent.parent.parent / "evolutions.json"
+
+
+@pytest.fixture(scope="module")
+def trees():
+    return json.loads(EVOLUTIONS.read_text())
+
+
+@pytest.fixture
+def lines(tmp_path, trees):
+    path = tmp_path / "evolutions.jsonl"
+    assert write_evolution_lines(path, iter(trees)) == len(trees)
+    return EvolutionLines(path)
+
+
+def test_one_family_per_line(lines, trees):
+    raw = lines.path.read_bytes().splitlines()
+    assert len(raw) == len(lines) == len(trees)
+    assert [json.loads(line) for line in raw] == trees
+    assert index_path(lines.path).exists()
+
+
+def test_names_are_written_as_utf8(tmp_path):
+    path = tmp_path / "evolutions.jsonl"
+    tree = {
+        "id": ["Flabébé", "Flabébé"],
+        "children": [
+            {"methods": ['(a "quoted" \\ method)'], "id": ["Floette", "Floette"]}
+        ],
+    }
+    write_evolution_lines(path, [tree])
+
+    assert "Flabébé".encode("utf-8") in path.read_bytes()
+    assert EvolutionLines(path).family_of(("Floette", "Floette")) == tree
+
+
+def test_single_family_is_read_by_seeking(lines, trees):
+    eevee = lines.family_of(("Umbreon", "Umbreon"))
+    assert eevee["id"] == ["Eevee", "Eevee"]
+    assert eevee in trees
+    assert lines.family_of(("Ditto", "Ditto")) is None
+    assert ("Dustox", "Dustox") in lines
+    assert lines.read_family(len(lines) - 1) == trees[-1]
+
+
+def test_families_stream_into_the_index(lines, trees):
+    streamed = EvolutionIndex.from_trees(lines)
+    assert streamed.entries == EvolutionIndex.from_trees(trees).entries
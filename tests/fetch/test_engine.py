@@ -0,0 +1,59 @@
+import threading
+from pathlib import Path
+
+from src.fetch.engine import AsyncFetcher
+from src.fetch.limiter import HostLimiter
+
+
+def test_fetch_all_downloads_every_job():
+    fetched = []
+    lock = threading.Lock()
+
+    def download(file, url):
+        with lock:
+            fetched.append((file, url))
+
+    limiter = HostLimiter({"a.com": 1000.0, "b.com": 1000.0})
+    jobs = [(Path(f"{i}.html"), f"https://{'ab'[i % 2]}.com/{i}") for i in range(20)]
+    AsyncFetcher(download, concurrency=4, limiter=limiter).fetch_all(jobs)
+
+    assert sorted(fetched) == sorted(jobs)
+
+
+def test_fetch_all_respects_concurrency():
+    active = [0]
+    peak = [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def download(file, url):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        release.wait(0.05)
+        with lock:
+            active[0] -= 1
+
+    limiter = HostLimiter({"a.com": 1000.0})
+    jobs = [(Path(f"{i}.html"), f"https://a.com/{i}") for i in range(12)]
+    AsyncFetcher(download, concurrency=3, limiter=limiter).fetch_all(jobs)
+
+    assert peak[0] <= 3
+
+
+def test_failure_does_not_cancel_other_jobs():
+    fetched = []
+
+    def download(file, url):
+        if url.endswith("/3"):
+            raise RuntimeError("boom")
+        fetched.append(url)
+
+    limiter = HostLimiter({"a.com": 1000.0})
+    jobs = [(Path(f"{i}.html"), f"https://a.com/{i}") for i in range(6)]
+
+    failures = AsyncFetcher(download, concurrency=2, limiter=limiter).fetch_all(jobs)
+
+    assert len(fetched) == 5
+    assert list(failures) == [Path("3.html")]
+    assert isinstance(failures[Path("3.html")], RuntimeError)
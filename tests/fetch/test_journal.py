@@ -0,0 +1,67 @@
+from pathlib import Path
+
+import requests
+
+from src.fetch.journal import CrawlJournal, CrawlState
+
+
+def make_journal(tmp_path, crawl="moves"):
+    return CrawlJournal(crawl, db_path=tmp_path / "journal.sqlite3")
+
+
+def jobs(count):
+    return [
+        (Path(f"{i}.html"), f"https://pokemondb.net/move/{i}") for i in range(count)
+    ]
+
+
+def http_error(headers):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers.update(headers)
+    return requests.HTTPError(response=response)
+
+
+def test_resume_skips_done_urls(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.plan(jobs(4))
+    journal.record(jobs(4)[0], None)
+    journal.record(jobs(4)[1], RuntimeError("boom"))
+
+    # Planning again does not reset urls that already have a state
+    journal.plan(jobs(4))
+
+    assert journal.remaining() == [jobs(4)[1], jobs(4)[2], jobs(4)[3]]
+    assert journal.remaining(only_failed=True) == [jobs(4)[1]]
+    assert journal.state(jobs(4)[0][1]) == CrawlState.Done
+
+
+def test_retry_after_holds_url_back(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.plan(jobs(2))
+    journal.record(jobs(2)[0], http_error({"Retry-After": "3600"}))
+    journal.record(jobs(2)[1], http_error({"Retry-After": "0"}))
+
+    assert journal.state(jobs(2)[0][1]) == CrawlState.RetryAfter
+    assert journal.remaining(only_failed=True) == [jobs(2)[1]]
+
+
+def test_progress_counts_states(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.plan(jobs(5))
+    journal.mark_done(jobs(5)[0][1], jobs(5)[1][1])
+    journal.record(jobs(5)[2], RuntimeError("boom"))
+
+    progress = journal.progress()
+    assert (progress.total, progress.done, progress.failed, progress.pending) == (
+        5,
+        2,
+        1,
+        2,
+    )
+    assert not progress.finished
+
+
+def test_crawls_are_separate(tmp_path):
+    make_journal(tmp_path, "moves").plan(jobs(3))
+    assert make_journal(tmp_path, "abilities").remaining() == []
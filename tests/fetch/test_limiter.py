@@ -0,0 +1,58 @@
+import multiprocessing
+import time
+
+from src.fetch.limiter import HostLimiter, SharedTokenBucket, TokenBucket
+
+
+def _reserve(args):
+    path, rate = args
+    return SharedTokenBucket(path, rate).reserve()
+
+
+def test_shared_bucket_state_survives_instances(tmp_path):
+    path = tmp_path / "pokemondb.net.bucket"
+    assert SharedTokenBucket(path, 10.0).reserve() == 0.0
+    waits = [SharedTokenBucket(path, 10.0).reserve() for _ in range(3)]
+    assert waits == sorted(waits)
+    assert 0.25 < waits[-1] <= 0.3
+
+
+def test_shared_bucket_spans_processes(tmp_path):
+    path = tmp_path / "pokemondb.net.bucket"
+    with multiprocessing.Pool(4) as pool:
+        waits = sorted(pool.map(_reserve, [(path, 10.0)] * 8))
+
+    # One token was available, the other seven queue up behind it at 10/s
+    assert waits[0] == 0.0
+    assert 0.65 < waits[-1] <= 0.7
+    for earlier, later in zip(waits, waits[1:]):
+        assert later - earlier > 0.05
+
+
+def test_shared_bucket_refills(tmp_path):
+    bucket = SharedTokenBucket(tmp_path / "a.bucket", 100.0)
+    bucket.reserve()
+    time.sleep(0.02)
+    assert bucket.reserve() == 0.0
+
+
+def test_shared_bucket_ignores_a_clock_set_back(tmp_path):
+    path = tmp_path / "a.bucket"
+    path.write_bytes(SharedTokenBucket.STATE.pack(-1.0, time.time() + 100))
+
+    assert 0.15 < SharedTokenBucket(path, 10.0).reserve() <= 0.2
+
+
+def test_host_limiter_shares_state_dir(tmp_path):
+    first = HostLimiter({"pokemondb.net": 10.0}, state_dir=tmp_path)
+    second = HostLimiter({"pokemondb.net": 10.0}, state_dir=tmp_path)
+    assert isinstance(first.bucket("https://pokemondb.net"), SharedTokenBucket)
+    assert first.bucket("https://pokemondb.net/move/all").reserve() == 0.0
+    assert second.bucket("https://pokemondb.net/ability").reserve() > 0.05
+    assert (tmp_path / "pokemondb.net.bucket").exists()
+
+
+def test_host_limiter_without_state_dir_is_local():
+    limiter = HostLimiter({"pokemondb.net": 10.0})
+    bucket = limiter.bucket("https://pokemondb.net")
+    assert type(bucket) is TokenBucket
@@ -0,0 +1,83 @@
+from src import gather_files
+from src.fetch.metadata import (
+    PageMetadata,
+    load_metadata,
+    metadata_path,
+    save_metadata,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+        self.headers = headers or {}
+        self.ok = status_code < 400
+        self.url = "https://pokemondb.net/move/absorb"
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def close(self):
+        pass
+
+
+def test_metadata_round_trip(tmp_path):
+    page = tmp_path / "absorb.html"
+    metadata = PageMetadata("https://pokemondb.net/move/absorb", '"v1"', None, 1.0)
+    save_metadata(page, metadata)
+    assert load_metadata(page) == metadata
+    assert load_metadata(tmp_path / "missing.html") is None
+
+
+def test_new_page_records_validators(file_cache, tmp_path, monkeypatch):
+    page = tmp_path / "absorb.html"
+    response = FakeResponse(200, "<html></html>", {"ETag": '"v1"'})
+    monkeypatch.setattr(gather_files, "get_with_retry", lambda url, **kwargs: response)
+
+    gather_files._request_url(page, "https://pokemondb.net/move/absorb")
+
+    assert page.read_text() == "<html></html>"
+    assert load_metadata(page).etag == '"v1"'
+
+
+def test_not_modified_keeps_local_page(file_cache, tmp_path, monkeypatch):
+    page = tmp_path / "absorb.html"
+    page.write_text("<html>old</html>")
+    save_metadata(page, PageMetadata("https://pokemondb.net/move/absorb", '"v1"'))
+    sent = {}
+
+    def fake_get(url, headers, **kwargs):
+        sent.update(headers)
+        return FakeResponse(304)
+
+    monkeypatch.setattr(gather_files, "get_with_retry", fake_get)
+    gather_files._request_url(page, "https://pokemondb.net/move/absorb")
+
+    assert sent == {"If-None-Match": '"v1"'}
+    assert page.read_text() == "<html>old</html>"
+    assert load_metadata(page).fetched_at > 0
+
+
+def test_blob_store_revalidates_from_its_index(blob_cache, tmp_path, monkeypatch):
+    page = tmp_path / "move" / "absorb.html"
+    responses = [
+        FakeResponse(200, "<html></html>", {"ETag": '"v1"'}),
+        FakeResponse(304),
+    ]
+    sent = []
+
+    def fake_get(url, headers, **kwargs):
+        sent.append(headers)
+        return responses.pop(0)
+
+    monkeypatch.setattr(gather_files, "get_with_retry", fake_get)
+    gather_files._request_url(page, "https://pokemondb.net/move/absorb")
+    gather_files._request_url(page, "https://pokemondb.net/move/absorb")
+
+    assert sent == [{}, {"If-None-Match": '"v1"'}]
+    assert not metadata_path(page).exists()
+    assert blob_cache.load_metadata(page).etag == '"v1"'
+    assert blob_cache.read_text(page) == "<html></html>"
@@ -0,0 +1,108 @@
+import pytest
+
+from src import gather_files
+from src.fetch import session as fetch_session
+from src.fetch.engine import AsyncFetcher
+from src.fetch.limiter import HostLimiter
+from src.fetch.replay import ReplayArchive, ReplayServer, recording, replaying
+from src.fetch.session import get_session
+
+URLS = [f"https://pokemondb.net/move/move-{i}" for i in range(10)]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ReplayArchive(tmp_path / "archive")
+    for url in URLS:
+        archive.add(url, 200, {"ETag": f'"{url}"'}, url.encode())
+    return archive
+
+
+@pytest.fixture
+def isolated_cache(file_cache, tmp_path, monkeypatch):
+    fetcher = AsyncFetcher(
+        gather_files._request_url,
+        concurrency=4,
+        limiter=HostLimiter({"pokemondb.net": 1000.0}),
+    )
+    monkeypatch.setattr(gather_files, "_FETCHER", fetcher)
+    monkeypatch.setattr(fetch_session, "backoff_delay", lambda attempt: 0.0)
+    return tmp_path / "pages"
+
+
+def test_replay_through_the_fetch_path(archive, isolated_cache):
+    jobs = [(isolated_cache / f"{i}.html", url) for i, url in enumerate(URLS)]
+
+    with replaying(archive, latency=0.01, error_rate=0.3, seed=1) as server:
+        files = gather_files.request_urls(jobs)
+
+    assert [f.read_text() for f in files] == URLS
+    assert server.stats.injected_errors > 0
+    assert server.stats.served == len(URLS)
+    assert 1 < server.stats.peak_in_flight <= 4
+
+
+def test_replay_answers_conditional_requests(archive, isolated_cache):
+    jobs = [(isolated_cache / "0.html", URLS[0])]
+
+    with replaying(archive) as server:
+        gather_files.request_urls(jobs)
+        gather_files.request_urls(jobs, refresh_cache=True)
+
+    assert server.stats.served == 1
+    assert server.stats.not_modified == 1
+
+
+def test_missing_urls_are_not_found(archive):
+    with replaying(archive) as server:
+        response = get_session().get("https://pokemondb.net/move/unknown")
+
+    assert response.status_code == 404
+    assert server.stats.misses == 1
+
+
+def test_recording_fills_an_archive(archive, tmp_path):
+    live = ReplayServer(archive)
+    live.start()
+    try:
+        recorded = ReplayArchive(tmp_path / "recorded")
+        url = live.base_url + "/" + URLS[0].replace(":", "%3A").replace("/", "%2F")
+        with recording(recorded):
+            get_session().get(url)
+    finally:
+        live.stop()
+
+    assert url in recorded
+    assert recorded.body(recorded.get(url)) == URLS[0].encode()
+    assert ReplayArchive(tmp_path / "recorded").get(url) is not None
+
+
+def test_responses_are_appended_to_the_index(tmp_path):
+    archive = ReplayArchive(tmp_path / "archive")
+    archive.add(URLS[0], 200, {}, b"old")
+    archive.add(URLS[1], 200, {}, b"other")
+    archive.add(URLS[0], 200, {"ETag": '"v2"'}, b"new")
+    index = tmp_path / "archive" / ReplayArchive.INDEX
+
+    assert len(index.read_text().splitlines()) == 3
+    reopened = ReplayArchive(tmp_path / "archive")
+    assert len(reopened) == 2
+    assert reopened.get(URLS[0]).headers == {"ETag": '"v2"'}
+    assert reopened.body(reopened.get(URLS[0])) == b"new"
+
+    reopened.compact()
+    assert len(index.read_text().splitlines()) == 2
+    assert ReplayArchive(tmp_path / "archive").get(URLS[0]).headers == {"ETag": '"v2"'}
+
+
+def test_a_cut_short_line_is_skipped(tmp_path):
+    archive = ReplayArchive(tmp_path / "archive")
+    archive.add(URLS[0], 200, {}, b"absorb")
+    with open(tmp_path / "archive" / ReplayArchive.INDEX, "a") as index:
+        index.write('{"url": "https://pokemon')
+
+    reopened = ReplayArchive(tmp_path / "archive")
+    reopened.add(URLS[1], 200, {}, b"acid")
+
+    assert ReplayArchive(tmp_path / "archive").get(URLS[0]) is not None
+    assert ReplayArchive(tmp_path / "archive").get(URLS[1]) is not None
@@ -0,0 +1,91 @@
+import pytest
+import requests
+
+from src.fetch import session as fetch_session
+from src.fetch.session import get_with_retry
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(fetch_session.time, "sleep", lambda _: None)
+
+
+def test_retries_transient_statuses():
+    session = FakeSession([FakeResponse(503), FakeResponse(429), FakeResponse(200)])
+    response = get_with_retry("https://pokemondb.net", retries=3, session=session)
+    assert response.status_code == 200
+    assert session.calls == 3
+
+
+def test_does_not_retry_client_errors():
+    session = FakeSession([FakeResponse(404), FakeResponse(200)])
+    response = get_with_retry("https://pokemondb.net", retries=3, session=session)
+    assert response.status_code == 404
+    assert session.calls == 1
+
+
+def test_returns_last_response_when_budget_is_spent():
+    session = FakeSession([FakeResponse(500)] * 3)
+    response = get_with_retry("https://pokemondb.net", retries=2, session=session)
+    assert response.status_code == 500
+    assert session.calls == 3
+
+
+def test_retries_connection_errors():
+    session = FakeSession([requests.ConnectionError(), FakeResponse(200)])
+    assert get_with_retry("https://pokemondb.net", session=session).status_code == 200
+
+    session = FakeSession([requests.ConnectionError()] * 2)
+    with pytest.raises(requests.ConnectionError):
+        get_with_retry("https://pokemondb.net", retries=1, session=session)
+
+
+class CountingBucket:
+    def __init__(self):
+        self.waits = 0
+
+    def wait(self):
+        self.waits += 1
+
+
+class OneBucketLimiter:
+    def __init__(self):
+        self.counter = CountingBucket()
+
+    def bucket(self, url):
+        return self.counter
+
+
+def test_retries_take_a_token_from_the_limiter():
+    limiter = OneBucketLimiter()
+    session = FakeSession(
+        [FakeResponse(503), requests.ConnectionError(), FakeResponse(200)]
+    )
+    get_with_retry("https://pokemondb.net", session=session, limiter=limiter)
+    assert limiter.counter.waits == 2
+
+    session = FakeSession([FakeResponse(200)])
+    get_with_retry("https://pokemondb.net", session=session, limiter=limiter)
+    assert limiter.counter.waits == 2
@@ -0,0 +1,195 @@
+import hashlib
+import sqlite3
+
+import pytest
+
+from src import gather_files
+from src.fetch.metadata import PageMetadata, metadata_path, save_metadata
+from src.fetch.store import BlobPageStore, FilePageStore
+
+
+def make_store(tmp_path):
+    return BlobPageStore(blob_dir=tmp_path / "blobs", root=tmp_path)
+
+
+def test_round_trip(tmp_path):
+    store = make_store(tmp_path)
+    page = tmp_path / "pokedex" / "flabebe.html"
+
+    assert not store.exists(page)
+    store.write(page, "https://pokemondb.net/pokedex/flabebe", "Flabébé".encode())
+
+    assert store.exists(page)
+    assert store.read_text(page) == "Flabébé"
+    assert store.read_url("https://pokemondb.net/pokedex/flabebe") == "Flabébé".encode()
+    with store.open(page) as stream:
+        assert stream.read() == "Flabébé".encode()
+    assert not page.exists()
+
+
+def test_identical_pages_share_a_blob(tmp_path):
+    store = make_store(tmp_path)
+    first = tmp_path / "move" / "a.html"
+    second = tmp_path / "move" / "b.html"
+
+    store.write(first, "a", b"<html>same</html>")
+    store.write(second, "b", b"<html>same</html>")
+    assert len(list((tmp_path / "blobs").glob("*/*.gz"))) == 1
+
+    store.delete(first)
+    assert store.read_bytes(second) == b"<html>same</html>"
+
+    store.delete(second)
+    assert list((tmp_path / "blobs").glob("*/*.gz")) == []
+
+
+def test_overwrite_releases_old_blob(tmp_path):
+    store = make_store(tmp_path)
+    page = tmp_path / "ability" / "levitate.html"
+
+    store.write(page, "u", b"old")
+    store.write(page, "u", b"new")
+
+    assert store.read_bytes(page) == b"new"
+    assert len(list((tmp_path / "blobs").glob("*/*.gz"))) == 1
+
+
+def test_legacy_files_are_moved_into_the_store(tmp_path):
+    store = make_store(tmp_path)
+    directory = tmp_path / "pokedex"
+    directory.mkdir()
+    (directory / "eevee.html").write_bytes(b"eevee")
+    store.write(directory / "pikachu.html", "u", b"pikachu")
+
+    assert list(store.pages(directory)) == [
+        directory / "eevee.html",
+        directory / "pikachu.html",
+    ]
+    assert store.read_bytes(directory / "eevee.html") == b"eevee"
+    assert not (directory / "eevee.html").exists()
+
+
+def test_legacy_sidecars_are_moved_into_the_index(tmp_path):
+    store = BlobPageStore(
+        blob_dir=tmp_path / "blobs",
+        root=tmp_path,
+        url_of=lambda file: "https://pokemondb.net/move/" + file.stem,
+    )
+    directory = tmp_path / "move"
+    directory.mkdir()
+    absorb, acid = directory / "absorb.html", directory / "acid.html"
+    absorb.write_bytes(b"absorb")
+    acid.write_bytes(b"acid")
+    save_metadata(absorb, PageMetadata("https://pokemondb.net/move/absorb", '"v1"'))
+
+    assert store.load_metadata(absorb).etag == '"v1"'
+    assert not metadata_path(absorb).exists()
+    assert store.read_url("https://pokemondb.net/move/absorb") == b"absorb"
+    assert store.exists(acid)
+    assert store.read_url("https://pokemondb.net/move/acid") == b"acid"
+    assert store.load_metadata(acid).etag is None
+
+
+def test_legacy_files_moved_meanwhile_are_looked_up_again(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    page = tmp_path / "move" / "absorb.html"
+    page.parent.mkdir()
+    page.write_bytes(b"absorb")
+    save_metadata(page, PageMetadata("https://pokemondb.net/move/absorb", '"v1"'))
+    migrate = store._migrate
+
+    def racing(file):
+        migrate(file)  # another thread moves the file first
+        migrate(file)
+
+    monkeypatch.setattr(store, "_migrate", racing)
+
+    assert store.read_bytes(page) == b"absorb"
+    assert store.load_metadata(page).etag == '"v1"'
+    assert not metadata_path(page).exists()
+
+
+def test_validators_are_kept_in_the_index(tmp_path):
+    store = make_store(tmp_path)
+    page = tmp_path / "ability" / "levitate.html"
+    digest = store.write(page, "u", b"levitate")
+
+    store.save_metadata(page, PageMetadata("u", '"v2"', "Mon", 5.0))
+
+    assert store.load_metadata(page) == PageMetadata("u", '"v2"', "Mon", 5.0, digest)
+    assert not metadata_path(page).exists()
+    assert store.load_metadata(tmp_path / "ability" / "missing.html") is None
+
+
+def test_old_indexes_gain_the_validator_columns(tmp_path):
+    blobs = tmp_path / "blobs"
+    blobs.mkdir()
+    conn = sqlite3.connect(str(blobs / "index.sqlite3"))
+    conn.execute("CREATE TABLE Page (path TEXT PRIMARY KEY, url TEXT, digest TEXT)")
+    conn.commit()
+    conn.close()
+
+    store = make_store(tmp_path)
+    page = tmp_path / "move" / "absorb.html"
+    store.write(page, "u", b"absorb")
+    store.save_metadata(page, PageMetadata("u", last_modified="Tue"))
+
+    assert store.load_metadata(page).last_modified == "Tue"
+
+
+def test_write_returns_content_checksum(tmp_path):
+    store = make_store(tmp_path)
+    page = tmp_path / "move" / "absorb.html"
+
+    digest = store.write_stream(page, "u", [b"<html>", b"absorb", b"</html>"])
+
+    assert digest == hashlib.sha256(b"<html>absorb</html>").hexdigest()
+    assert store.checksum(page) == store.expected_checksum(page) == digest
+    assert list((tmp_path / "blobs").glob("*.tmp")) == []
+
+
+def test_failed_stream_leaves_no_page(tmp_path):
+    def broken_download():
+        yield b"<html>half"
+        raise ConnectionError("dropped")
+
+    for store in (make_store(tmp_path), FilePageStore()):
+        page = tmp_path / "pokedex" / "mew.html"
+        with pytest.raises(ConnectionError):
+            store.write_stream(page, "u", broken_download())
+        assert not store.exists(page)
+        assert list(tmp_path.glob("**/*.tmp")) == []
+
+
+def test_verify_evicts_corrupt_pages(blob_cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(gather_files, "URLS", {})
+    monkeypatch.setattr(gather_files, "_POKEMONDB_DIRS", {tmp_path / "move": "/move/"})
+
+    intact = tmp_path / "move" / "absorb.html"
+    damaged = tmp_path / "move" / "acid.html"
+    blob_cache.write(intact, "u", b"absorb")
+    digest = blob_cache.write(damaged, "u", b"acid")
+    blob = blob_cache._blob_path(digest)
+    blob.write_bytes(blob.read_bytes()[:-4])
+
+    assert gather_files.verify_cache(workers=2) == [damaged]
+    assert blob_cache.exists(intact)
+    assert not blob_cache.exists(damaged)
+
+
+def test_verify_checks_plain_files_against_metadata(file_cache, tmp_path, monkeypatch):
+    monkeypatch.setattr(gather_files, "URLS", {})
+    monkeypatch.setattr(gather_files, "_POKEMONDB_DIRS", {tmp_path: "/move/"})
+
+    page = tmp_path / "absorb.html"
+    legacy = tmp_path / "acid.html"
+    digest = file_cache.write(page, "u", b"<html>absorb</html>")
+    save_metadata(page, PageMetadata("u", sha256=digest))
+    legacy.write_bytes(b"<html>ac")
+
+    assert gather_files.verify_cache() == []
+
+    page.write_bytes(b"<html>abs")
+    assert gather_files.verify_cache() == [page]
+    assert not page.exists()
+    assert legacy.exists()
@@ -0,0 +1,115 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.scraper.evolutions import evolution_graph
+from src.scraper.evolutions.forest import EvolutionForest
+
+# Not a captured page: it was generated from evolutions.json in the markup of
+# the evolution chart, so comparing against evolutions.json only checks that
+# the trees survive a round trip, not that the real page is parsed correctly
+EVOLUTION_GRAPH = Path(__file__).parent / "EvolutionGraph.html"
+EVOLUTIONS = Path(__file__).parent.parent.parent.parent / "evolutions.json"
+
+VARIANTS = [
+    ("Eevee", "Eevee"),
+    ("Nincada", "Nincada"),
+    ("Wurmple", "Wurmple"),
+    ("Meowth", "Meowth"),
+    ("Meowth", "Galarian Meowth"),
+    ("Venusaur", "Mega Venusaur"),
+]
+
+
+@pytest.fixture
+def forest(file_cache, monkeypatch):
+    monkeypatch.setattr(evolution_graph, "EVOLUTION_GRAPH", EVOLUTION_GRAPH)
+    return evolution_graph.scrape_evolution_forest(VARIANTS)
+
+
+def test_components_follow_the_known_pokemon(forest):
+    roots = [forest.pokes[forest.roots(comp)[0]] for comp in forest.components()]
+    assert roots[:4] == [
+        ("Eevee", "Eevee"),
+        ("Nincada", "Nincada"),
+        ("Wurmple", "Wurmple"),
+        ("Meowth", "Meowth"),
+    ]
+    assert ("Venusaur", "Mega Venusaur") not in [
+        forest.pokes[i] for comp in forest.components() for i in comp
+    ]
+
+
+def test_trees_keep_every_method(forest):
+    eevee, nincada, wurmple = forest.trees()[:3]
+    assert len(eevee["children"]) == 8
+    assert [child["id"][0] for child in wurmple["children"]] == [
+        "Silcoon",
+        "Cascoon",
+    ]
+
+    ninjask, shedinja = nincada["children"]
+    assert ninjask["id"] == ("Ninjask", "Ninjask")
+    assert ninjask["methods"] == [
+        "(Level 20)",
+        "(Level 20, empty spot in party, Pokéball in bag)",
+    ]
+    assert shedinja["methods"] == ["(Level 20, empty spot in party, Pokéball in bag)"]
+
+
+def test_chains_restating_an_evolution_replace_its_methods():
+    forest = EvolutionForest()
+    forest.add_chain([(("A", "A"), ("B", "B"), "old"), (("A", "A"), ("B", "B"), "x")])
+    forest.add_chain([(("A", "A"), ("B", "B"), "new")])
+
+    assert forest.successors == [[1], []]
+    assert forest.tree_data(0)["children"][0]["methods"] == ["new", "x"]
+
+
+def test_components_with_several_roots_give_one_tree():
+    forest = EvolutionForest()
+    forest.add_chain([(("A", "A"), ("C", "C"), "(Level 10)")])
+    forest.add_chain([(("B", "B"), ("C", "C"), "(Level 20)")])
+
+    assert forest.roots(forest.components()[0]) == [0, 2]
+    assert forest.trees() == [
+        {"id": ("A", "A"), "children": [{"methods": ["(Level 10)"], "id": ("C", "C")}]}
+    ]
+
+
+def test_missing_variants_are_grouped(file_cache, monkeypatch):
+    monkeypatch.setattr(evolution_graph, "EVOLUTION_GRAPH", EVOLUTION_GRAPH)
+    forest = evolution_graph.scrape_evolution_forest(
+        VARIANTS + [("Venusaur", "Venusaur")], with_missing_variants=True
+    )
+
+    comp = next(
+        comp for comp in forest.components() if forest.pokes[comp[0]][0] == "Venusaur"
+    )
+    pokes = {forest.pokes[i] for i in comp}
+    assert {("Bulbasaur", "Bulbasaur"), ("Venusaur", "Mega Venusaur")} <= pokes
+
+
+def test_missing_variants_group_every_species(file_cache, monkeypatch):
+    monkeypatch.setattr(evolution_graph, "EVOLUTION_GRAPH", EVOLUTION_GRAPH)
+    rotom = [("Rotom", "Rotom"), ("Rotom", "Heat Rotom"), ("Rotom", "Wash Rotom")]
+    forest = evolution_graph.scrape_evolution_forest(
+        rotom + [("Ditto", "Ditto")], with_missing_variants=True
+    )
+
+    groups = [{forest.pokes[i] for i in comp} for comp in forest.components()]
+    assert set(rotom) in groups
+    assert {("Ditto", "Ditto")} not in groups
+    assert [("Ditto", "Ditto")] in [
+        [forest.pokes[i] for i in comp]
+        for comp in forest.components(with_isolates=True)
+    ]
+
+
+def test_trees_round_trip_the_checked_in_evolutions(file_cache, monkeypatch):
+    monkeypatch.setattr(evolution_graph, "EVOLUTION_GRAPH", EVOLUTION_GRAPH)
+    trees = json.loads(json.dumps(evolution_graph.scrape_evolution_trees([])))
+
+    assert len(trees) == 316
+    assert trees == json.loads(EVOLUTIONS.read_text())
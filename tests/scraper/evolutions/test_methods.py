@@ -0,0 +1,193 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from src.data.poke_enums import EvolutionType
+from src.scraper.evolutions.methods import RequirementIndex, parse_evolution_method
+
+EVOLUTIONS = Path(__file__).parent.parent.parent.parent / "evolutions.json"
+
+
+@pytest.mark.parametrize(
+    "method, evolution_type, field, value",
+    [
+        ("(Level 36)", EvolutionType.Level, "numeric_reqr", 36),
+        (
+            "(high Friendship, Daytime)",
+            EvolutionType.HappinessDay,
+            "time_reqr",
+            "Daytime",
+        ),
+        (
+            "(hold Razor Fang, Nighttime)",
+            EvolutionType.NightHoldItem,
+            "item_reqr",
+            "Razor Fang",
+        ),
+        (
+            "(use Dawn Stone, Female)",
+            EvolutionType.ItemFemale,
+            "item_reqr",
+            "Dawn Stone",
+        ),
+        ("(Trade with Shelmet)", EvolutionType.TradeSpecies, "species_reqr", "Shelmet"),
+        ("(after Mimic learned)", EvolutionType.HasMove, "move_reqr", "Mimic"),
+        (
+            "(level up near a Mossy Rock)",
+            EvolutionType.Location,
+            "location_reqr",
+            "Mossy Rock",
+        ),
+        (
+            "(Level 20, Attack > Defense)",
+            EvolutionType.AttackGreater,
+            "numeric_reqr",
+            20,
+        ),
+        (
+            "(Level 53, in Pokémon Sun or Ultra Sun)",
+            EvolutionType.Level,
+            "game_reqr",
+            "Sun or Ultra Sun",
+        ),
+        ("(spin around holding Sweet)", EvolutionType.INVALID, "item_reqr", ""),
+    ],
+)
+def test_parse_evolution_method(method, evolution_type, field, value):
+    [evolution] = parse_evolution_method(method)
+    assert evolution.evolution_type == evolution_type
+    assert getattr(evolution, field) == value
+    assert evolution.description == method
+
+
+def test_alternatives_are_separate_evolutions():
+    stone, field = parse_evolution_method(
+        "(use Thunder Stone, in Gen 8, or level up in a Magnetic Field area)"
+    )
+    assert (stone.evolution_type, stone.item_reqr) == (
+        EvolutionType.Item,
+        "Thunder Stone",
+    )
+    assert (field.evolution_type, field.location_reqr) == (
+        EvolutionType.Location,
+        "Magnetic Field",
+    )
+
+
+@pytest.fixture(scope="module")
+def trees():
+    return json.loads(EVOLUTIONS.read_text())
+
+
+def _methods(trees):
+    stack = list(trees)
+    while stack:
+        node = stack.pop()
+        for child in node.get("children", ()):
+            yield from child.get("methods", ())
+            stack.append(child)
+
+
+# (method, type, location, region, game) of the methods with a clause that
+# limits where the evolution happens
+WHERE_CONDITIONS = [
+    ("(Level 20, Female, in buildings)", EvolutionType.LevelFemale, "", "", ""),
+    ("(Level 20, Female, in caves)", EvolutionType.LevelFemale, "", "", ""),
+    ("(Level 20, Female, in grass)", EvolutionType.LevelFemale, "", "", ""),
+    (
+        "(Level 25, Daytime, in Pokémon Sun or Ultra Sun)",
+        EvolutionType.LevelDay,
+        "",
+        "",
+        "Sun or Ultra Sun",
+    ),
+    (
+        "(Level 25, Dusk 5-6pm, in Ultra Sun/Moon)",
+        EvolutionType.Custom1,
+        "",
+        "",
+        "Ultra Sun/Moon",
+    ),
+    (
+        "(Level 25, Nighttime, in Pokémon Moon or Ultra Moon)",
+        EvolutionType.LevelNight,
+        "",
+        "",
+        "Moon or Ultra Moon",
+    ),
+    ("(Level 28, Nighttime, in Alola)", EvolutionType.LevelNight, "", "Alola", ""),
+    ("(Level 28, outside Alola)", EvolutionType.Level, "", "outside Alola", ""),
+    ("(Level 35, in Galar)", EvolutionType.Level, "", "Galar", ""),
+    (
+        "(Level 53, in Pokémon Moon or Ultra Moon)",
+        EvolutionType.Level,
+        "",
+        "",
+        "Moon or Ultra Moon",
+    ),
+    ("(use Leaf Stone, in Alola)", EvolutionType.Item, "", "Alola", ""),
+    ("(use Leaf Stone, outside Alola)", EvolutionType.Item, "", "outside Alola", ""),
+    ("(use Thunder Stone, outside Alola)", EvolutionType.Item, "", "outside Alola", ""),
+    ("(at Mount Lanakila)", EvolutionType.Location, "Mount Lanakila", "", ""),
+    ("(near Dusty Bowl)", EvolutionType.Location, "Dusty Bowl", "", ""),
+    ("(level up near an Icy Rock)", EvolutionType.Location, "Icy Rock", "", ""),
+]
+
+
+def test_where_conditions_are_listed(trees):
+    methods = set(_methods(trees))
+    assert {method for method, *_ in WHERE_CONDITIONS} <= methods
+
+
+@pytest.mark.parametrize(
+    "method, evolution_type, location, region, game", WHERE_CONDITIONS
+)
+def test_where_conditions(method, evolution_type, location, region, game):
+    [evolution] = parse_evolution_method(method)
+    assert evolution.evolution_type == evolution_type
+    assert evolution.location_reqr == location
+    assert evolution.region_reqr == region
+    assert evolution.game_reqr == game
+
+
+def test_game_of_an_alternative():
+    stone, field = parse_evolution_method(
+        "(use Thunder Stone, in Gen 8, or level up in a Magnetic Field area)"
+    )
+    assert stone.game_reqr == "Gen 8"
+    assert field.game_reqr == ""
+
+
+@pytest.fixture(scope="module")
+def index(trees):
+    return RequirementIndex.from_trees(trees)
+
+
+def test_index_by_item(index):
+    evolved = {evo.evolution_form for _, evo in index.with_item("Thunder Stone")}
+    assert evolved == {"Raichu", "Jolteon", "Eelektross", "Vikavolt"}
+    assert index.with_item("Poké Ball") == []
+
+
+def test_index_by_level(index):
+    postings = index.between_levels(30, 40)
+    levels = [evo.numeric_reqr for _, evo in postings]
+    assert levels == sorted(levels)
+    assert min(levels) == 30 and max(levels) == 40
+    assert ("Charmeleon", "Charmeleon") in [poke for poke, _ in postings]
+    assert index.between_levels(65) == []
+
+
+def test_index_by_location(index):
+    assert set(index.by_location) == {
+        "Mount Lanakila",
+        "Dusty Bowl",
+        "Mossy Rock",
+        "Icy Rock",
+        "Magnetic Field",
+    }
+    [(poke, evolution)] = index.at_location("Mount Lanakila")
+    assert poke == ("Crabrawler", "Crabrawler")
+    assert evolution.evolution_form == "Crabominable"
+    assert len(index.of_type(EvolutionType.TradeItem)) > 10
@@ -1,9 +1,28 @@
+import json
 from pathlib import Path
 
 import bs4
 import pytest
 
-from src.scraper.evolutions.tokenizer import poke_from_infocard
+from src.scraper.evolutions.evolution_graph import extract_edges
+from src.scraper.evolutions.tokenizer import (
+    EvoChainToken,
+    Lexeme,
+    PokeToken,
+    SplitToken,
+    TagKind,
+    poke_from_infocard,
+    tag_kind,
+    tag_kinds,
+    tokenize,
+    tokenize_list,
+)
+
+# Not a captured page: it was generated from evolutions.json in the markup of
+# the evolution chart, so comparing against evolutions.json only checks that
+# the trees survive a round trip, not that the real page is parsed correctly
+EVOLUTION_GRAPH = Path(__file__).parent / "EvolutionGraph.html"
+EVOLUTIONS = Path(__file__).parent.parent.parent.parent / "evolutions.json"
 
 shedinja_file = Path(__file__).parent / "ShedinjaTest.html"
 shedinja = bs4.BeautifulSoup(shedinja_file.read_text(), "lxml")
@@ -22,3 +41,59 @@ def test_pokemon_extraction():
 
     with pytest.raises(ValueError):
         poke_from_infocard(body)
+
+
+def test_tag_kinds():
+    assert tag_kinds(children) == [TagKind.INFOCARD, TagKind.PLUS, TagKind.INFOCARD]
+    assert tag_kind(shedinja.select_one("body")) == TagKind.INVALID
+
+
+@pytest.fixture(scope="module")
+def chains():
+    graph = bs4.BeautifulSoup(EVOLUTION_GRAPH.read_text(encoding="utf-8"), "lxml")
+    return graph.select("hr ~ div.infocard-list-evo")
+
+
+def test_tokenize_evolution_graph(chains):
+    assert len(chains) == 316
+
+    splits = 0
+    for chain in chains:
+        token = tokenize(chain)
+        assert isinstance(token, EvoChainToken)
+        assert isinstance(token.chain[0], PokeToken)
+        splits += sum(isinstance(i, SplitToken) for i in token.chain)
+    assert splits > 0
+
+
+def test_tokens_round_trip_the_checked_in_evolutions(chains):
+    expected = set()
+    stack = json.loads(EVOLUTIONS.read_text())
+    while stack:
+        node = stack.pop()
+        for child in node.get("children", ()):
+            expected.update(
+                (tuple(node["id"]), tuple(child["id"]), method)
+                for method in child["methods"]
+            )
+            stack.append(child)
+
+    edges = {
+        (prev[0], curr[0], method)
+        for chain in chains
+        for prev, curr, method in extract_edges(tokenize(chain))
+    }
+    assert edges == expected
+
+
+def test_lexemes_must_create_tokens():
+    class NoTokenLex(Lexeme):
+        PATTERN = (TagKind.INFOCARD,)
+
+    with pytest.raises(TypeError):
+        NoTokenLex()
+
+
+def test_tokenize_list_rejects_unknown_tags():
+    with pytest.raises(NotImplementedError):
+        tokenize_list([shedinja.select_one("body")])
@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from src.scraper import ability
+
+FIXTURES = Path(__file__).parent
+
+
+@pytest.fixture
+def listed(file_cache, monkeypatch):
+    monkeypatch.setattr(ability, "ABILITY_LIST", FIXTURES / "AbilityList.html")
+    return ability.scrape_listed_abilities()
+
+
+def test_abilities_are_built_from_the_list(listed):
+    assert list(listed) == [
+        "/ability/adaptability",
+        "/ability/levitate",
+        "/ability/overgrow",
+    ]
+    assert listed["/ability/overgrow"].ability_name == "Overgrow"
+    assert listed["/ability/overgrow"].effect == ""
+    assert [a.ability_name for a in ability.scrape_abilities()] == [
+        "Adaptability",
+        "Levitate",
+        "Overgrow",
+    ]
+
+
+def test_effects_are_enriched_in_batches(listed, monkeypatch):
+    batches = []
+
+    def fetch(urls):
+        batches.append(list(urls))
+        return [
+            FIXTURES / "ability" / (url[len("/ability/") :] + ".html") for url in urls
+        ]
+
+    monkeypatch.setattr(ability, "request_abilityurls_pokemondb", fetch)
+    enriched = ability.enrich_abilities_in_background(listed, batch_size=2).result()
+
+    levitate = listed["/ability/levitate"]
+    assert len(batches) == 2
+    assert enriched == [levitate]
+    assert levitate.effect.startswith("Levitate gives the Pokémon immunity")
+    assert levitate.description.startswith("By floating in the air")
+    assert listed["/ability/overgrow"].description == (
+        "Powers up Grass-type moves in a pinch."
+    )
+
+
+def test_effects_are_parsed_in_a_pool(listed, monkeypatch):
+    monkeypatch.setattr(
+        ability,
+        "request_abilityurls_pokemondb",
+        lambda urls: [FIXTURES / "ability" / "levitate.html"],
+    )
+
+    enriched = list(ability.iter_enriched_abilities(listed, processes=2))
+
+    assert enriched == [listed["/ability/levitate"]]
+    assert listed["/ability/levitate"].effect.endswith("Toxic Spikes.")
+
+
+def test_scraped_abilities_have_their_details(listed, monkeypatch):
+    monkeypatch.setattr(
+        ability,
+        "request_abilityurls_pokemondb",
+        lambda urls: [FIXTURES / "ability" / "levitate.html"],
+    )
+
+    abilities = ability.scrape_abilities(details=True)
+
+    levitate = next(a for a in abilities if a.ability_name == "Levitate")
+    assert levitate.effect.startswith("Levitate gives the Pokémon immunity")
+    assert levitate.description.startswith("By floating in the air")
+
+
+def test_abilities_are_returned_without_fetching(listed, monkeypatch):
+    def fetch(urls):
+        raise AssertionError("the ability pages were fetched")
+
+    monkeypatch.setattr(ability, "request_abilityurls_pokemondb", fetch)
+    abilities = ability.scrape_abilities()
+
+    assert [a.effect for a in abilities] == ["", "", ""]
+    assert abilities[1].description == "Gives full immunity to all Ground-type moves."
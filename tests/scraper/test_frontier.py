@@ -0,0 +1,40 @@
+from src import gather_files
+from src.scraper import frontier
+
+
+def test_plan_frontier_dedups_species_urls(monkeypatch):
+    urls = ["/pokedex/rattata", "/pokedex/rattata", "/pokedex/raticate"]
+    monkeypatch.setattr(frontier, "populate_cache", lambda: None)
+    monkeypatch.setattr(frontier, "scrape_pokedex", lambda: ([], [], [], [], urls))
+    monkeypatch.setattr(frontier, "scrape_move_urls", lambda: ["/move/tackle"])
+    monkeypatch.setattr(frontier, "scrape_ability_urls", lambda: ["/ability/guts"])
+
+    planned = frontier.plan_frontier()
+
+    assert planned.species == ["/pokedex/rattata", "/pokedex/raticate"]
+    assert planned.moves == ["/move/tackle"]
+    assert planned.abilities == ["/ability/guts"]
+    assert len(planned) == 4
+
+
+def test_prefetch_is_one_deduplicated_batch(monkeypatch):
+    batches = []
+
+    def fake_request_urls(jobs, skip_failures=False, crawl=None):
+        batches.append((list(jobs), crawl))
+        return [file for file, _ in jobs]
+
+    monkeypatch.setattr(gather_files, "request_urls", fake_request_urls)
+    files = gather_files.prefetch_pokemondb(
+        ["/pokedex/rattata", "/pokedex/rattata"], ["/move/tackle"], ["/ability/guts"]
+    )
+
+    assert len(batches) == 1
+    jobs, crawl = batches[0]
+    assert crawl == "frontier"
+    assert [url for _, url in jobs] == [
+        "https://pokemondb.net/pokedex/rattata",
+        "https://pokemondb.net/move/tackle",
+        "https://pokemondb.net/ability/guts",
+    ]
+    assert [file.name for file in files] == ["rattata.html", "tackle.html", "guts.html"]
@@ -0,0 +1,68 @@
+import math
+from pathlib import Path
+
+import pytest
+
+from src.data.poke_enums import MoveCategory, PType
+from src.scraper import pmove
+
+FIXTURES = Path(__file__).parent
+
+
+@pytest.fixture
+def listed(file_cache, monkeypatch):
+    monkeypatch.setattr(pmove, "MOVES_LIST", FIXTURES / "Moves.html")
+    return pmove.scrape_listed_moves()
+
+
+def test_moves_are_built_from_the_list(listed):
+    assert list(listed) == [
+        "/move/10000000-volt-thunderbolt",
+        "/move/absorb",
+        "/move/aerial-ace",
+        "/move/growl",
+        "/move/max-strike",
+    ]
+
+    growl = listed["/move/growl"]
+    assert (growl.ptype, growl.category, growl.pp) == (
+        PType.Normal,
+        MoveCategory.Status,
+        40,
+    )
+    assert math.isnan(growl.power)
+    assert listed["/move/aerial-ace"].accuracy == float("inf")
+    assert listed["/move/max-strike"].category == MoveCategory.NoCategory
+    assert listed["/move/max-strike"].pp is None
+    assert listed["/move/absorb"].max_pp == 0
+
+
+def test_details_are_merged_into_listed_moves(listed, monkeypatch):
+    def fetch(urls):
+        assert "/move/absorb" in list(urls)
+        return [FIXTURES / "move" / "absorb.html", FIXTURES / "move" / "growl.html"]
+
+    monkeypatch.setattr(pmove, "request_moveurls_pokemondb", fetch)
+    enriched = pmove.enrich_moves_in_background(listed).result()
+
+    absorb = listed["/move/absorb"]
+    assert enriched == [absorb]
+    assert (absorb.max_pp, absorb.generation_introduced) == (40, 1)
+    assert absorb.zmove_effect == "The Z-Move Bloom Doom has a base power of 100."
+    assert absorb.target_description == "Targets a single adjacent Pokémon."
+    assert listed["/move/growl"].effect == "Lowers opponent's Attack."
+
+
+def test_pages_are_parsed_in_a_pool_with_failures_isolated(listed, monkeypatch):
+    pages = ["absorb.html", "aerial-ace.html", "growl.html"]
+    monkeypatch.setattr(
+        pmove,
+        "request_moveurls_pokemondb",
+        lambda urls: [FIXTURES / "move" / page for page in pages],
+    )
+
+    enriched = list(pmove.iter_enriched_moves(listed, processes=2))
+
+    assert enriched == [listed["/move/absorb"]]
+    assert listed["/move/absorb"].max_pp == 40
+    assert listed["/move/aerial-ace"].generation_introduced == 0
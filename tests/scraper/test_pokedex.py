@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from src.data.poke_enums import PType
+from src.data.stats import BaseStats
+from src.scraper import pokedex
+
+POKEDEX = Path(__file__).parent / "Pokedex.html"
+
+
+@pytest.fixture
+def table(file_cache, monkeypatch):
+    monkeypatch.setattr(pokedex, "POKEDEX", POKEDEX)
+    pokedex.scrape_pokedex_table.cache_clear()
+    pokedex.scrape_pokedex.cache_clear()
+    yield pokedex.scrape_pokedex_table()
+    pokedex.scrape_pokedex_table.cache_clear()
+    pokedex.scrape_pokedex.cache_clear()
+
+
+def test_only_pokedex_rows_are_read(table):
+    assert len(table) == 5
+    assert table.species == [
+        "Bulbasaur",
+        "Venusaur",
+        "Venusaur",
+        "Charmander",
+        "Flabébé",
+    ]
+    assert table.variants[1:3] == ["Venusaur", "Mega Venusaur"]
+    assert table.urls[4] == "/pokedex/flabebe"
+
+
+def test_types_and_stats_are_columns(table):
+    assert list(table.primary_types) == [5, 5, 5, 1, 17]
+    assert list(table.secondary_types) == [6, 6, 6, -1, -1]
+    assert list(table.stats["special_attack"]) == [65, 100, 122, 60, 61]
+    assert table.typing(3) == [PType.Fire]
+    assert table.base_stats(2) == BaseStats(
+        hp=80,
+        attack=100,
+        defense=123,
+        special_attack=122,
+        special_defense=120,
+        speed=80,
+    )
+
+
+def test_legacy_columns(table):
+    species, variants, typing, stats, urls = pokedex.scrape_pokedex()
+
+    assert species[0] == "Bulbasaur"
+    assert typing[0] == [PType.Grass, PType.Poison]
+    assert stats[4].special_defense == 79
+    assert urls == tuple(table.urls)
@@ -0,0 +1,266 @@
+from pathlib import Path
+
+import pytest
+
+from src import gather_files
+from src.config import CACHE_DIR, POKEDEX, SPECIES_POKEDB_DIR
+from src.data.poke_enums import EggGroup, LevelingRate
+from src.data.species import (
+    BreedingComponent,
+    DexEntryComponent,
+    MoveComponent,
+    TrainingComponent,
+)
+from src.data.stats import EffortValues
+from src.scraper.pokemon import (
+    SpeciesPage,
+    VariantSubpage,
+    extract_species_record,
+    species_page_class,
+)
+from src.scraper.species_lxml import (
+    LxmlSpeciesPage,
+    compare_species_pages,
+    compare_species_parsers,
+)
+
+VENUSAUR = Path(__file__).parent / "Venusaur.html"
+# Venusaur's page with a Let's Go TM table listed before the Sword/Shield one
+# and a TM number that is not a link
+CHARIZARD = Path(__file__).parent / "Charizard.html"
+
+SUNNY_ENTRY = (
+    "While it basks in the sun, it can convert the light into energy. "
+    "As a result, it is more powerful in the summertime."
+)
+
+MOVES = MoveComponent(
+    learned_moves=[(1, "Growl"), (1, "Tackle"), (9, "Leech Seed"), (58, "Solar Beam")],
+    tm_moves=[(1, "Hyper Beam"), (11, "Solar Beam")],
+    tr_moves=[(0, "Swords Dance"), (10, "Earthquake")],
+    evolution_moves=["Petal Dance"],
+    egg_moves=["Curse", "Skull Bash"],
+    tutor_moves=["Frenzy Plant", "Grass Pledge"],
+    transfer_moves=["Bind"],
+)
+
+
+@pytest.fixture
+def venusaur(file_cache):
+    return SpeciesPage("Venusaur", VENUSAUR)
+
+
+@pytest.fixture(params=["soup", "lxml"])
+def page_class(request, file_cache):
+    """Each species page parser, reading from an isolated cache"""
+    return species_page_class(request.param)
+
+
+def _write_page(directory: Path, html: str) -> Path:
+    path = directory / "venusaur.html"
+    path.write_text(html, encoding="utf-8")
+    return path
+
+
+def test_default_variant(venusaur):
+    page = VariantSubpage("Venusaur", venusaur)
+
+    assert page.dex_entry == DexEntryComponent(
+        national_dex_num=3,
+        height=2.0,
+        weight=100.0,
+        kind="Seed Pokémon",
+        flavor_text=SUNNY_ENTRY,
+        abilities=["Overgrow"],
+        hidden_abilities=["Chlorophyll"],
+        regional_dex_nums={"rby": 3, "gsc": 233, "frlg": 3, "lets_go": 3},
+    )
+    assert page.breeding == BreedingComponent(
+        egg_groups=[EggGroup.Grass, EggGroup.Monster],
+        male_rate=87.5,
+        steps_to_hatch_lower=4884,
+        steps_to_hatch_upper=5140,
+        egg_cycles=20,
+    )
+    assert page.training == TrainingComponent(
+        leveling_rate=LevelingRate.MediumSlow,
+        base_exp_yield=236,
+        effort_points=EffortValues(special_attack=2, special_defense=1),
+        catch_rate=45,
+        base_friendship=70,
+    )
+    assert page.moves == MOVES
+
+
+def test_alternate_form_reads_its_own_tab(venusaur):
+    page = VariantSubpage("Mega Venusaur", venusaur)
+
+    assert page.dex_entry == DexEntryComponent(
+        national_dex_num=3,
+        height=2.4,
+        weight=155.5,
+        kind="Seed Pokémon",
+        flavor_text=SUNNY_ENTRY,
+        abilities=["Thick Fat"],
+        hidden_abilities=[],
+        regional_dex_nums={},
+    )
+    assert page.training.base_exp_yield == 281
+    assert page.breeding.egg_groups == [EggGroup.Grass, EggGroup.Monster]
+    assert page.moves == MOVES
+
+
+def test_vitals_are_indexed_by_heading(venusaur):
+    vitals = VariantSubpage("Venusaur", venusaur).vitals
+
+    assert set(vitals.tables) == {"pokedex data", "training", "breeding"}
+    assert vitals.table("Training").cell("Base Friendship").find(string=True) == "70 "
+    assert vitals.table("Breeding").cell("Egg cycles") is not None
+
+
+def _text(table) -> str:
+    return table.get_text() if hasattr(table, "get_text") else table.text_content()
+
+
+NESTED_TABLE = """<html><body><main><h2>Pokédex entries</h2>
+<div class="grid-row"><div class="resp-scroll"><table><tbody>
+<tr><td>Where to find it</td></tr></tbody></table></div></div>
+<h3>Venusaur</h3><div class="resp-scroll"><table><tbody>
+<tr><td>Its entry</td></tr></tbody></table></div></main></body></html>"""
+
+
+def test_nested_tables_stay_below_their_own_heading(page_class, tmp_path):
+    index = page_class("Venusaur", _write_page(tmp_path, NESTED_TABLE)).entry_index
+
+    assert index.lookup("h2", "Pokédex entries") is None
+    assert "Its entry" in _text(index.lookup("h3", "Venusaur"))
+
+
+MEGA_FIRST = """<html><body><nav><h2>Pokédex entries</h2><div class="resp-scroll">
+<table><tbody><tr><td>Navigation</td></tr></tbody></table></div></nav><main>
+<h3>Mega Venusaur</h3><div class="resp-scroll"><table><tbody>
+<tr><td>Mega entry</td></tr></tbody></table></div>
+<h3>Venusaur</h3><div class="resp-scroll"><table><tbody>
+<tr><td>Base entry</td></tr></tbody></table></div></main></body></html>"""
+
+
+def test_entries_are_looked_up_exactly_first(page_class, tmp_path):
+    page = page_class("Venusaur", _write_page(tmp_path, MEGA_FIRST))
+
+    # Unlike a search for the first heading containing the name in the page
+    assert "Base entry" in _text(page.flavor_html("Venusaur"))
+    assert "Mega entry" in _text(page.flavor_html("Mega"))
+    # Only the headings in main are indexed
+    assert page.entry_index.lookup("h2", "Pokédex entries") is None
+
+
+def test_lxml_parser_matches_soup_parser(file_cache):
+    variants = ["Venusaur", "Mega Venusaur"]
+    assert compare_species_pages("Venusaur", variants, VENUSAUR) == []
+
+
+def test_parser_errors_are_mismatches(file_cache, monkeypatch):
+    def fail(self, variant):
+        raise ValueError(variant)
+
+    monkeypatch.setattr(LxmlSpeciesPage, "variant", fail)
+    mismatches = compare_species_pages("Venusaur", ["Venusaur"], VENUSAUR)
+
+    assert [(m.component, m.soup) for m in mismatches] == [("error", None)]
+    assert isinstance(mismatches[0].lxml, ValueError)
+
+
+def test_lxml_parser_components(file_cache):
+    page = LxmlSpeciesPage("Venusaur", VENUSAUR).variant("Venusaur")
+    assert page.dex_entry.regional_dex_nums == {
+        "rby": 3,
+        "gsc": 233,
+        "frlg": 3,
+        "lets_go": 3,
+    }
+    assert page.moves == MOVES
+
+
+def test_technical_moves_of_the_latest_game(page_class):
+    moves = page_class("Charizard", CHARIZARD).variant("Charizard").moves
+    assert moves.tm_moves == [(1, "Hyper Beam"), (11, "Solar Beam"), (38, "Fire Blast")]
+    assert moves.tr_moves == MOVES.tr_moves
+
+
+def test_lxml_parser_matches_soup_parser_on_technical_moves(file_cache):
+    variants = ["Charizard", "Mega Charizard X"]
+    assert compare_species_pages("Charizard", variants, CHARIZARD) == []
+
+
+def _species_cache_present() -> bool:
+    if not CACHE_DIR.exists():
+        return False
+    store = gather_files._STORE
+    return (
+        store.exists(POKEDEX)
+        and next(store.pages(SPECIES_POKEDB_DIR), None) is not None
+    )
+
+
+@pytest.mark.skipif(
+    not _species_cache_present(), reason="the species pages are not cached"
+)
+def test_parsers_agree_on_every_cached_page():
+    assert compare_species_parsers() == []
+
+
+def test_parser_is_selected_by_name():
+    assert species_page_class("soup") is SpeciesPage
+    assert species_page_class("lxml") is LxmlSpeciesPage
+    with pytest.raises(ValueError):
+        species_page_class("regex")
+
+
+def test_species_page_only_parses_read_sections(venusaur):
+    soup = venusaur._soup
+
+    assert soup.select_one("nav") is None
+    assert soup.select_one("footer") is None
+    assert soup.select_one(".infocard-list-evo") is None
+    assert soup.find("br") is None
+    assert soup.select_one(".tabset-basics") is not None
+    assert soup.select_one(".tabset-moves-game") is not None
+
+
+def test_dex_entries_are_indexed_by_heading(venusaur):
+    index = venusaur.entry_index
+
+    assert set(index.tables["h3"]) == {"venusaur"}
+    assert "pokedex entries" not in index.tables["h2"]
+    assert index.unlisted["pokedex entries"] is index.tables["h3"]["venusaur"]
+    assert venusaur.flavor_html("Mega Venusaur") is index.tables["h3"]["venusaur"]
+    assert set(LxmlSpeciesPage("Venusaur", VENUSAUR).entry_index.tables["h3"]) == {
+        "venusaur"
+    }
+
+
+def test_learnsets_of_every_generation(venusaur):
+    learnsets = venusaur.learnsets
+
+    assert list(learnsets) == ["Let's Go", "Sword/Shield"]
+    assert learnsets["Let's Go"].moves == {
+        "learned_moves": [(1, "Tackle"), (9, "Vine Whip")]
+    }
+    assert venusaur.learnset is learnsets["Sword/Shield"]
+
+
+def test_species_record_holds_every_variant(page_class):
+    page = page_class("Venusaur", VENUSAUR)
+    record = extract_species_record("Venusaur", page)
+
+    assert set(record.variants) == {"VENUSAUR", "MEGA VENUSAUR"}
+    assert record.variant(None) is record.variant("venusaur")
+    assert record.variant("Mega Venusaur").moves == MOVES
+    assert record.variant("Mega Venusaur").dex_entry.flavor_text == SUNNY_ENTRY
+    with pytest.raises(ValueError):
+        record.variant("Gigantamax Venusaur")
+
+
+def test_species_record_frees_the_soup(venusaur):
+    extract_species_record("Venusaur", venusaur)
+    assert venusaur._soup.find("h2") is None
@@ -0,0 +1,102 @@
+from src.fetch.metadata import PageMetadata, metadata_path, save_metadata
+from src import file_resource
+from src.fetch.store import BlobPageStore, FilePageStore
+from src.file_resource import Owner, ResourceManager
+
+
+def make_manager(tmp_path, budget):
+    return ResourceManager(
+        FilePageStore(), budget=budget, db_path=tmp_path / "resources.sqlite3"
+    )
+
+
+def write_page(tmp_path, name, size):
+    page = tmp_path / name
+    page.write_bytes(b"x" * size)
+    return page
+
+
+def test_tracks_size_and_owner(tmp_path):
+    manager = make_manager(tmp_path, budget=1000)
+    page = write_page(tmp_path, "a.html", 10)
+
+    manager.track(page, Owner.Move)
+
+    (resource,) = manager.resources()
+    assert resource.path == page
+    assert resource.size == 10
+    assert resource.owner == Owner.Move
+    assert manager.usage() == 10
+
+
+def test_evicts_least_recently_used(tmp_path):
+    manager = make_manager(tmp_path, budget=25)
+    pages = [write_page(tmp_path, f"{i}.html", 10) for i in range(3)]
+    for page in pages:
+        manager.track(page, Owner.Species)
+    save_metadata(pages[1], PageMetadata("u"))
+
+    manager.touch(pages[0])
+    evicted = manager.enforce_budget()
+
+    assert evicted == [pages[1]]
+    assert not pages[1].exists()
+    assert not metadata_path(pages[1]).exists()
+    assert pages[0].exists() and pages[2].exists()
+    assert manager.usage() == 20
+
+
+def test_list_pages_are_never_evicted(tmp_path):
+    manager = make_manager(tmp_path, budget=0)
+    listing = write_page(tmp_path, "Pokedex.html", 10)
+    species = write_page(tmp_path, "bulbasaur.html", 10)
+    manager.track(listing, Owner.ListPage)
+    manager.track(species, Owner.Species)
+
+    assert manager.enforce_budget() == [species]
+    assert listing.exists()
+
+
+def test_touch_tracks_unknown_files(tmp_path):
+    manager = make_manager(tmp_path, budget=1000)
+    page = write_page(tmp_path, "a.html", 5)
+
+    manager.touch(page)
+    manager.touch(tmp_path / "missing.html")
+
+    assert [r.path for r in manager.resources()] == [page]
+
+
+def test_touches_are_saved_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_resource, "TOUCH_BATCH_SIZE", 3)
+    manager = make_manager(tmp_path, budget=1000)
+    pages = [write_page(tmp_path, f"{i}.html", 5) for i in range(3)]
+    manager.track(pages[0], Owner.Move)
+
+    def saved_access():
+        (when,) = manager.conn.execute("SELECT last_access FROM Resource").fetchone()
+        return when
+
+    before = saved_access()
+    manager.touch(pages[0])
+    manager.touch(pages[1])
+    assert saved_access() == before
+    assert len(manager.conn.execute("SELECT * FROM Resource").fetchall()) == 1
+
+    manager.touch(pages[2])
+    assert saved_access() > before
+    assert {r.path for r in manager.resources()} == set(pages)
+
+
+def test_shared_blobs_are_counted_once(tmp_path):
+    store = BlobPageStore(blob_dir=tmp_path / "blobs", root=tmp_path)
+    manager = ResourceManager(store, budget=0, db_path=tmp_path / "resources.sqlite3")
+    first, second = tmp_path / "move" / "a.html", tmp_path / "move" / "b.html"
+    store.write(first, "a", b"<html>same</html>")
+    store.write(second, "b", b"<html>same</html>")
+    manager.track(first, Owner.Move)
+    manager.track(second, Owner.Move)
+
+    assert manager.usage() == store.stored_size(first)
+    assert manager.enforce_budget() == [first, second]
+    assert manager.usage() == 0